@@ -2,9 +2,12 @@
 from flask import Flask, request
 from flask_cors import CORS
 from dotenv import load_dotenv
+import click
 import os
 
 from app.extensions import db, migrate, jwt
+from app.utils.sqlite_profile import load_sqlite_profile, install_sqlite_profile
+from app.services.metrics import usage_buffer
 
 def create_app():
     load_dotenv()
@@ -22,16 +25,40 @@ def create_app():
     app.config["CHAT_DEFAULT_RETENTION_DAYS"] = int(os.getenv("CHAT_DEFAULT_RETENTION_DAYS", "60"))
     app.config["CHAT_AUTOSAVE_DEFAULT"] = os.getenv("CHAT_AUTOSAVE_DEFAULT", "true").lower() == "true"
 
+    # SQLite engine profile (WAL, synchronous, mmap, cache, busy_timeout, temp_store) — see app/utils/sqlite_profile.py
+    app.config["SQLITE_PROFILE"] = load_sqlite_profile()
+
+    # Usage analytics buffer: batch UsageLog inserts instead of one commit per event
+    app.config["USAGE_LOG_SYNC"] = os.getenv("USAGE_LOG_SYNC", "false").lower() == "true"
+    app.config["USAGE_LOG_FLUSH_SIZE"] = int(os.getenv("USAGE_LOG_FLUSH_SIZE", "50"))
+    app.config["USAGE_LOG_FLUSH_SECONDS"] = float(os.getenv("USAGE_LOG_FLUSH_SECONDS", "2"))
+
+    # Task -> Outlook outbox worker (app/services/outlook_outbox.py)
+    app.config["OUTLOOK_OUTBOX_POLL_SECONDS"] = float(os.getenv("OUTLOOK_OUTBOX_POLL_SECONDS", "5"))
+    app.config["OUTLOOK_OUTBOX_MAX_ATTEMPTS"] = int(os.getenv("OUTLOOK_OUTBOX_MAX_ATTEMPTS", "8"))
+    app.config["OUTLOOK_OUTBOX_BACKOFF_BASE"] = float(os.getenv("OUTLOOK_OUTBOX_BACKOFF_BASE", "2"))
+    app.config["OUTLOOK_OUTBOX_BACKOFF_MAX"] = float(os.getenv("OUTLOOK_OUTBOX_BACKOFF_MAX", "600"))
+    app.config["OUTLOOK_OUTBOX_LEASE_SECONDS"] = float(os.getenv("OUTLOOK_OUTBOX_LEASE_SECONDS", "300"))
+
+    # /api/ai/chat: max follow-up Claude calls (tool rounds) per chat turn
+    app.config["AI_CHAT_MAX_STEPS"] = int(os.getenv("AI_CHAT_MAX_STEPS", "5"))
+
     # Init extensions
     CORS(app, 
          origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:5175"],
          supports_credentials=True)
     db.init_app(app)
+    with app.app_context():
+        install_sqlite_profile(db.engine, app.config["SQLITE_PROFILE"])
     migrate.init_app(app, db)
     jwt.init_app(app)
+    usage_buffer.init_app(app)
+    from app.services.outlook_outbox import outlook_outbox
+    outlook_outbox.init_app(app)
 
     # Import models so Alembic sees them
-    from app.models import user, journal, oauth_token, chat, notion, usage_log  # noqa: F401
+    from app.models import user, journal, journal_streak, oauth_token, chat, notion, usage_log, usage_rollup, agent_telemetry, reflection, calendar_event  # noqa: F401
+    from app.services import streaks  # noqa: F401  (registers the JournalEntry -> journal_streak listeners)
 
     # Register routes
     from app.routes.auth import auth_bp
@@ -45,6 +72,8 @@ def create_app():
     from app.routes.dashboard import dashboard_bp
     from app.routes.tasks import tasks_bp
     from app.routes.notifications import notifications_bp
+    from app.routes.search import search_bp
+    from app.agent.routes import agent_bp
 
     app.register_blueprint(auth_bp)
     app.register_blueprint(hello_bp)
@@ -57,6 +86,51 @@ def create_app():
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(tasks_bp)
     app.register_blueprint(notifications_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(agent_bp)
+
+    # Maintenance: `flask rebuild-usage-rollup [--user-id N]` backfills usage_daily_rollup from usage_logs
+    @app.cli.command("rebuild-usage-rollup")
+    @click.option("--user-id", type=int, default=None, help="Only rebuild this user's rows")
+    def rebuild_usage_rollup_cmd(user_id):
+        from app.services.rollup import rebuild_usage_rollup
+        usage_buffer.flush()
+        out = rebuild_usage_rollup(user_id)
+        click.echo(f"usage_daily_rollup rebuilt: {out}")
+
+    # Maintenance: `flask rebuild-search-index` (re)creates the FTS5 index and its triggers, then backfills it
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index_cmd():
+        from app.services.search import rebuild_search_index
+        click.echo(f"search_index rebuilt: {rebuild_search_index()}")
+
+    # Maintenance: `flask rebuild-journal-streaks [--user-id N]` recomputes journal_day / journal_streak
+    @app.cli.command("rebuild-journal-streaks")
+    @click.option("--user-id", type=int, default=None, help="Only rebuild this user's streak")
+    def rebuild_journal_streaks_cmd(user_id):
+        from app.services.streaks import rebuild_journal_streaks
+        click.echo(f"journal streaks rebuilt: {rebuild_journal_streaks(user_id)}")
+
+    # Maintenance: `flask sync-calendar --user-id N [--full]` pulls Outlook changes into calendar_event
+    @app.cli.command("sync-calendar")
+    @click.option("--user-id", type=int, required=True, help="User whose calendar to sync")
+    @click.option("--full", is_flag=True, help="Drop the stored delta link and re-read the whole window")
+    def sync_calendar_cmd(user_id, full):
+        from app.services.calendar import sync_calendar_events
+        click.echo(f"calendar synced: {sync_calendar_events(user_id, full=full)}")
+
+    # Maintenance: `flask drain-outlook-outbox` sends all due task -> Outlook changes now
+    @app.cli.command("drain-outlook-outbox")
+    def drain_outlook_outbox_cmd():
+        from app.services.outlook_outbox import outlook_outbox
+        click.echo(f"outlook outbox drained: {outlook_outbox.drain()}")
+
+    # Maintenance: `flask resync-outlook-tasks --user-id N` pushes every task of the user to Outlook via $batch
+    @app.cli.command("resync-outlook-tasks")
+    @click.option("--user-id", type=int, required=True, help="User whose tasks to resync")
+    def resync_outlook_tasks_cmd(user_id):
+        from app.services.outlook_tasks import resync_tasks_to_outlook
+        click.echo(f"outlook tasks resynced: {resync_tasks_to_outlook(user_id)}")
 
     # 🔎 log every incoming request **once**
     @app.before_request
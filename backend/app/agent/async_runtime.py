@@ -0,0 +1,113 @@
+# app/agent/async_runtime.py
+from __future__ import annotations
+import asyncio
+import functools
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from flask import current_app
+from app.agent.guard import AgentPolicy, user_scopes, rate_limit
+from app.agent.router import (
+    AGENT_TOOLS, get_anthropic_config, _claude_headers, _claude_payload,
+    _call_tool_in_app, _tool_batches, _initial_messages, _add_usage, _response_text,
+    _preflight, _record_outcome, _followup_messages,
+)
+from app.services.http_transport import AsyncHttpTransport
+from app.services.prompt_cache import record_llm_usage, USAGE_FIELDS
+from app.services.telemetry import TurnTelemetry
+
+# asyncio variant of the agent turn.
+#
+# Claude calls go through an httpx.AsyncClient, so the event loop is free while the
+# model is thinking. Everything that touches SQLAlchemy (context pack, history, tool
+# functions) stays synchronous and runs on a bounded thread pool, each call inside its
+# own app context; consecutive read-only tools are awaited together. Tools that call
+# Graph/Notion keep using the pooled sync transport from inside that pool.
+
+_db_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_ASYNC_DB_WORKERS", "8")), thread_name_prefix="agent-db")
+
+
+def _in_app(app, fn: Callable, *args, **kwargs):
+    with app.app_context():
+        return fn(*args, **kwargs)
+
+
+async def run_db(fn: Callable, *args, **kwargs):
+    """Run a blocking (DB) function on the bounded pool under a fresh app context."""
+    app = current_app._get_current_object()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_pool, functools.partial(_in_app, app, fn, *args, **kwargs))
+
+
+async def acall_claude(http: AsyncHttpTransport, messages: list[dict], tools: list[dict] = AGENT_TOOLS) -> Dict[str, Any]:
+    config = get_anthropic_config()
+    started = time.perf_counter()
+    r = await http.post(
+        f"{config['base_url']}/v1/messages",
+        headers=_claude_headers(config),
+        content=json.dumps(_claude_payload(config, messages, tools)),
+        timeout=60,
+    )
+    r.raise_for_status()
+    resp = r.json()
+    record_llm_usage("agent_async", resp.get("usage"), (time.perf_counter() - started) * 1000)
+    return resp
+
+
+async def arun_agent_turn(user_id: int, user_text: str, confirm_writes: bool = True, thread_id: int = None) -> Dict[str, Any]:
+    """Async counterpart of run_agent_turn(); returns the same final payload."""
+    config = get_anthropic_config()
+    if not config["api_key"] or not config["api_key"].startswith("sk-"):
+        return {"error": "anthropic_key_missing", "text": "❌ ANTHROPIC_API_KEY environment variable not set or invalid. Please configure your Claude API key to use the agent.", "tool_calls": []}
+
+    scopes = user_scopes(user_id)
+    policy = AgentPolicy()
+    rate_limit(f"agent:{user_id}", max_calls=60, per_seconds=60)
+
+    telemetry = TurnTelemetry(user_id, "agent_async")
+    try:
+        return await _turn_loop(user_id, user_text, confirm_writes, thread_id, scopes, policy, telemetry)
+    except Exception as e:
+        telemetry.fail(e)
+        raise
+    finally:
+        await run_db(telemetry.save)
+
+
+async def _turn_loop(user_id: int, user_text: str, confirm_writes: bool, thread_id: int | None,
+                     scopes: set[str], policy: AgentPolicy, telemetry: TurnTelemetry) -> Dict[str, Any]:
+    messages = await run_db(_initial_messages, user_id, user_text, confirm_writes, thread_id)
+
+    tool_calls = []
+    writes = 0
+    usage = {k: 0 for k in USAGE_FIELDS}
+    model = get_anthropic_config()["model"]
+    app = current_app._get_current_object()
+
+    async with AsyncHttpTransport() as http:
+        for step in range(policy.max_tool_calls):
+            started = time.perf_counter()
+            resp = await acall_claude(http, messages)
+            telemetry.llm(model, (time.perf_counter() - started) * 1000, resp.get("usage"))
+            _add_usage(usage, resp)
+            content = resp.get("content", [])
+            tool_uses = [b for b in content if b.get("type") == "tool_use"]
+            if not tool_uses:
+                return {"text": _response_text(content), "tool_calls": tool_calls, "usage": usage}
+
+            results, runnable, writes = _preflight(tool_uses, writes, policy, confirm_writes)
+            loop = asyncio.get_running_loop()
+            for batch in _tool_batches(runnable):
+                # a batch is either consecutive read-only tools or a single write
+                outcomes = await asyncio.gather(*(
+                    loop.run_in_executor(_db_pool, _call_tool_in_app, app, user_id, scopes, block) for block in batch
+                ))
+                for block, outcome in zip(batch, outcomes):
+                    _record_outcome(user_id, block, outcome, results, tool_calls, telemetry)
+
+            messages.extend(_followup_messages(content, tool_uses, results))
+
+    return {"text": "Tool loop ended (max steps reached).", "tool_calls": tool_calls, "usage": usage}
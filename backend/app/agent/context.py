@@ -1,18 +1,72 @@
 # app/agent/context.py
 from __future__ import annotations
-from typing import Dict, Any
+import os
+import threading
+import time
+from typing import Dict, Any, Iterable
 from datetime import datetime, timezone
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from app.utils.timezone import utcnow
 from app.models.journal import JournalEntry
 from app.models.task import Task
 from app.models.notification import Notification
 
 # Build a compact Context Pack (small, structured; not raw dumps)
+#
+# The data part (journals, tasks, notifications) is cached per user and keyed by a
+# data version that ORM flushes/commits touching those rows bump, so repeated turns
+# skip the DB; only the time block is rebuilt per call. The TTL bounds staleness from
+# writes made by other processes.
 
-def build_context_pack(user_id: int, include_recent_actions: bool = True) -> Dict[str, Any]:
-    # Current date/time context
+CONTEXT_TTL_SECONDS = float(os.getenv("AGENT_CONTEXT_TTL_SECONDS", "300"))
+_PACK_MODELS = (JournalEntry, Task, Notification)
+
+_versions: Dict[int, int] = {}
+_packs: Dict[int, tuple] = {}  # user_id -> (version, expires_at, data)
+_lock = threading.Lock()
+
+
+def bump_context_version(user_ids: Iterable[int]) -> None:
+    with _lock:
+        for uid in user_ids:
+            uid = int(uid)
+            _versions[uid] = _versions.get(uid, 0) + 1
+            _packs.pop(uid, None)
+
+
+def _touched_users(session) -> set[int]:
+    out = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, _PACK_MODELS) and getattr(obj, "user_id", None) is not None:
+            out.add(int(obj.user_id))
+    return out
+
+
+@event.listens_for(Session, "after_flush")
+def _context_after_flush(session, flush_context):  # noqa: ARG001
+    uids = _touched_users(session)
+    if uids:
+        bump_context_version(uids)
+        session.info.setdefault("context_pack_users", set()).update(uids)
+
+
+@event.listens_for(Session, "after_commit")
+def _context_after_commit(session):
+    # bump again once the rows are visible, so a pack rebuilt between flush and commit is not kept
+    uids = session.info.pop("context_pack_users", None)
+    if uids:
+        bump_context_version(uids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _context_after_rollback(session):
+    session.info.pop("context_pack_users", None)
+
+
+def _time_block() -> Dict[str, Any]:
     now = utcnow()
-    current_time = {
+    return {
         "current_datetime": now.isoformat(),
         "current_date": now.date().isoformat(),
         "current_time": now.time().replace(microsecond=0).isoformat(),
@@ -21,6 +75,9 @@ def build_context_pack(user_id: int, include_recent_actions: bool = True) -> Dic
         "month": now.strftime("%B"),
         "year": now.year
     }
+
+
+def _data_block(user_id: int) -> Dict[str, Any]:
     # Recent journals
     journals = JournalEntry.query.filter_by(user_id=user_id).order_by(JournalEntry.timestamp.desc()).limit(5).all()
     j_pack = [{"id": j.id, "preview": (j.content or "")[:300], "created_at": j.timestamp.isoformat()} for j in journals]
@@ -38,9 +95,25 @@ def build_context_pack(user_id: int, include_recent_actions: bool = True) -> Dic
     n_pack = [{"id": n.id, "kind": n.kind, "title": n.title} for n in notifs]
 
     return {
-        "current_time": current_time,
         "journals": j_pack, 
         "tasks": t_pack, 
         "notifications": n_pack
     }
 
+
+def build_context_pack(user_id: int, include_recent_actions: bool = True) -> Dict[str, Any]:
+    uid = int(user_id)
+    now = time.monotonic()
+    with _lock:
+        version = _versions.get(uid, 0)
+        hit = _packs.get(uid)
+    if hit and hit[0] == version and hit[1] > now:
+        data = hit[2]
+    else:
+        data = _data_block(uid)
+        with _lock:
+            # only store if nothing was written while we were reading
+            if _versions.get(uid, 0) == version:
+                _packs[uid] = (version, now + CONTEXT_TTL_SECONDS, data)
+    return {"current_time": _time_block(), **data}
+
@@ -0,0 +1,159 @@
+# app/agent/history.py
+from __future__ import annotations
+import json
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.extensions import db
+from app.models.chat import ChatThread, ChatMessage
+from app.services.http_transport import transport
+from app.services.prompt_cache import record_llm_usage
+
+# Token-budgeted conversation history.
+#
+# The newest messages are sent verbatim while they fit HISTORY_TOKEN_BUDGET; anything
+# older is folded into ChatThread.summary. Folding is incremental (old summary + the
+# newly dropped messages -> new summary) and goes down to half the budget, so it runs
+# once every few turns rather than on every turn.
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("AGENT_HISTORY_TOKEN_BUDGET", "2000"))
+MESSAGE_TOKEN_CAP = int(os.getenv("AGENT_HISTORY_MAX_MESSAGE_TOKENS", "800"))
+SUMMARY_TOKEN_CAP = int(os.getenv("AGENT_SUMMARY_MAX_TOKENS", "400"))
+HISTORY_SCAN_LIMIT = 200  # unsummarized rows loaded at once (the turn's window, or one backlog chunk)
+
+
+def estimate_tokens(text: str | None) -> int:
+    """Cheap token estimate (~4 chars per token); good enough for budgeting."""
+    return (len(text or "") + 3) // 4
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + " …[truncated]"
+
+
+def _fallback_summary(previous: str | None, msgs: List[ChatMessage]) -> str:
+    """Extractive summary used when Claude is unavailable: one clipped line per message, newest kept."""
+    lines = [l for l in (previous or "").splitlines() if l.strip()]
+    lines += [f"{m.role}: {_clip(' '.join((m.content or '').split()), 40)}" for m in msgs]
+    out: List[str] = []
+    used = 0
+    for line in reversed(lines):
+        used += estimate_tokens(line) + 1
+        if used > SUMMARY_TOKEN_CAP:
+            break
+        out.append(line)
+    return "\n".join(reversed(out))
+
+
+def _summarize(previous: str | None, msgs: List[ChatMessage]) -> str:
+    from app.agent.router import get_anthropic_config  # local import: router imports this module
+
+    config = get_anthropic_config()
+    if not config["api_key"] or not config["api_key"].startswith("sk-"):
+        return _fallback_summary(previous, msgs)
+    transcript = "\n".join(f"{m.role}: {_clip(m.content or '', 300)}" for m in msgs)
+    prompt = (
+        "Update the running summary of a conversation between a student and their study agent. "
+        "Keep facts, decisions, ids of items that were created/changed, and open requests; drop chit-chat. "
+        f"Answer with the updated summary only, at most {SUMMARY_TOKEN_CAP * 3 // 4} words.\n\n"
+        f"Current summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"
+    )
+    payload = {
+        "model": config["model"],
+        "max_tokens": SUMMARY_TOKEN_CAP,
+        "temperature": 0,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    headers = {"x-api-key": config["api_key"], "anthropic-version": "2023-06-01", "content-type": "application/json"}
+    try:
+        started = time.perf_counter()
+        r = transport.post(f"{config['base_url']}/v1/messages", headers=headers, data=json.dumps(payload), timeout=30)
+        r.raise_for_status()
+        data = r.json()
+        record_llm_usage("agent_summary", data.get("usage"), (time.perf_counter() - started) * 1000)
+        text = "".join(b.get("text", "") for b in data.get("content", []) if b.get("type") == "text").strip()
+        return text or _fallback_summary(previous, msgs)
+    except Exception as e:
+        print(f"History summary failed, using extractive fallback: {e}")
+        return _fallback_summary(previous, msgs)
+
+
+def _fold_backlog(thread: ChatThread, before_id: int) -> None:
+    """Fold unsummarized rows older than `before_id` into the summary, oldest first, a chunk at a time.
+
+    Only threads with more than HISTORY_SCAN_LIMIT unsummarized rows get here (e.g. long
+    threads from before summaries existed); afterwards summary_through_id only moves forward
+    over rows that were actually summarized.
+    """
+    while True:
+        q = ChatMessage.query.filter(
+            ChatMessage.user_id == thread.user_id,
+            ChatMessage.thread_id == thread.id,
+            ChatMessage.id < before_id,
+        )
+        if thread.summary_through_id:
+            q = q.filter(ChatMessage.id > thread.summary_through_id)
+        chunk = q.order_by(ChatMessage.id.asc()).limit(HISTORY_SCAN_LIMIT).all()
+        if not chunk:
+            return
+        thread.summary = _summarize(thread.summary, chunk)
+        thread.summary_through_id = chunk[-1].id
+        thread.summary_updated_at = datetime.utcnow()
+        db.session.commit()
+
+
+def build_history(user_id: int, thread_id: int) -> List[Dict[str, Any]]:
+    """Messages for the agent prompt: [summary] + the newest messages that fit the token budget."""
+    thread = ChatThread.query.filter_by(id=thread_id, user_id=user_id).first()
+    if not thread:
+        return []
+
+    q = ChatMessage.query.filter_by(user_id=user_id, thread_id=thread_id)
+    if thread.summary_through_id:
+        q = q.filter(ChatMessage.id > thread.summary_through_id)
+    pending = q.order_by(ChatMessage.id.desc()).limit(HISTORY_SCAN_LIMIT).all()
+    if len(pending) == HISTORY_SCAN_LIMIT:
+        # there may be older unsummarized rows outside the window: summarize them before skipping past
+        _fold_backlog(thread, before_id=pending[-1].id)
+
+    summary_tokens = estimate_tokens(thread.summary)
+    budget = max(0, HISTORY_TOKEN_BUDGET - summary_tokens)
+
+    # newest -> oldest until the budget is spent
+    sizes = [estimate_tokens(_clip(m.content or "", MESSAGE_TOKEN_CAP)) for m in pending]
+    if sum(sizes) <= budget:
+        keep = len(pending)
+    else:
+        # over budget: keep only half so the next few turns don't fold again
+        keep, used = 0, 0
+        for size in sizes:
+            if used + size > budget // 2:
+                break
+            used += size
+            keep += 1
+    tail = list(reversed(pending[:keep]))
+    folded = list(reversed(pending[keep:]))
+
+    if folded:
+        thread.summary = _summarize(thread.summary, folded)
+        thread.summary_through_id = folded[-1].id
+        thread.summary_updated_at = datetime.utcnow()
+        db.session.commit()
+
+    messages: List[Dict[str, Any]] = []
+    if thread.summary:
+        messages.append({"role": "user", "content": f"Summary of our earlier conversation:\n{thread.summary}"})
+    else:
+        # the Messages API wants the first message from the user
+        while tail and tail[0].role != "user":
+            tail.pop(0)
+    for m in tail:
+        if m.role not in ("user", "assistant"):
+            continue
+        messages.append({"role": m.role, "content": _clip(m.content or "", MESSAGE_TOKEN_CAP)})
+    return messages
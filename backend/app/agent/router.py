@@ -1,10 +1,16 @@
 # app/agent/router.py
 from __future__ import annotations
-import os, json, requests
-from typing import Dict, Any
+import os, json, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, Tuple
+from flask import current_app
 from app.agent.guard import AgentPolicy, user_scopes, rate_limit, audit_log
 from app.agent.tools import TOOL_REGISTRY, TOOL_SCHEMAS
 from app.agent.context import build_context_pack
+from app.agent.history import build_history
+from app.services.http_transport import transport
+from app.services.prompt_cache import cached_tools, record_llm_usage, system_blocks, usage_dict, with_message_breakpoint, USAGE_FIELDS
+from app.services.telemetry import TurnTelemetry
 
 def get_anthropic_config():
     """Get Anthropic configuration dynamically to ensure .env is loaded"""
@@ -42,30 +48,184 @@ SYSTEM_PROMPT = (
 )
 
 
-def call_claude(messages: list[dict], tools: list[dict]) -> Dict[str, Any]:
-    config = get_anthropic_config()
-    headers = {
+# Static request prefix, built once: tools + system carry cache_control breakpoints
+AGENT_TOOLS = cached_tools(TOOL_SCHEMAS)
+AGENT_SYSTEM = system_blocks(SYSTEM_PROMPT)
+
+
+def _claude_headers(config: Dict[str, str]) -> Dict[str, str]:
+    return {
         "x-api-key": config["api_key"],
         "anthropic-version": "2023-06-01",
         "content-type": "application/json",
     }
+
+
+def _claude_payload(config: Dict[str, str], messages: list[dict], tools: list[dict], stream: bool = False) -> Dict[str, Any]:
     payload = {
         "model": config["model"],
         "max_tokens": 1200,
         "temperature": 0.2,
-        "system": SYSTEM_PROMPT,
-        "messages": messages,
+        "system": AGENT_SYSTEM,
+        "messages": with_message_breakpoint(messages),
         "tools": tools,
     }
-    r = requests.post(f"{config['base_url']}/v1/messages", headers=headers, data=json.dumps(payload), timeout=60)
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def _claude_request(messages: list[dict], tools: list[dict], stream: bool = False):
+    config = get_anthropic_config()
+    # pooled keep-alive session: saves the TLS handshake on every step after the first
+    r = transport.post(
+        f"{config['base_url']}/v1/messages",
+        headers=_claude_headers(config),
+        data=json.dumps(_claude_payload(config, messages, tools, stream)),
+        timeout=60,
+        stream=stream,
+    )
     r.raise_for_status()
-    return r.json()
+    return r
+
+
+def call_claude(messages: list[dict], tools: list[dict] = AGENT_TOOLS) -> Dict[str, Any]:
+    started = time.perf_counter()
+    resp = _claude_request(messages, tools).json()
+    record_llm_usage("agent", resp.get("usage"), (time.perf_counter() - started) * 1000)
+    return resp
+
+
+def stream_claude(messages: list[dict], tools: list[dict] = AGENT_TOOLS) -> Iterator[Tuple[str, Any]]:
+    """Stream one Messages API call.
+
+    Yields ("text", delta) as text arrives, then ("message", resp) with the assembled
+    response in the same shape call_claude() returns.
+    """
+    started = time.perf_counter()
+    r = _claude_request(messages, tools, stream=True)
+    r.encoding = "utf-8"
+    message: Dict[str, Any] = {}
+    blocks: Dict[int, Dict[str, Any]] = {}
+    try:
+        # chunk_size=None hands over each chunk as soon as it arrives
+        for line in r.iter_lines(chunk_size=None, decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            ev = json.loads(line[5:].strip())
+            etype = ev.get("type")
+            if etype == "message_start":
+                message = dict(ev.get("message") or {})
+            elif etype == "content_block_start":
+                block = dict(ev.get("content_block") or {})
+                if block.get("type") == "tool_use":
+                    block["_json"] = ""
+                blocks[ev["index"]] = block
+            elif etype == "content_block_delta":
+                block = blocks.setdefault(ev["index"], {"type": "text", "text": ""})
+                delta = ev.get("delta") or {}
+                if delta.get("type") == "text_delta":
+                    block["text"] = block.get("text", "") + delta.get("text", "")
+                    yield "text", delta.get("text", "")
+                elif delta.get("type") == "input_json_delta":
+                    block["_json"] = block.get("_json", "") + delta.get("partial_json", "")
+            elif etype == "content_block_stop":
+                block = blocks.get(ev["index"]) or {}
+                if "_json" in block:
+                    raw = block.pop("_json")
+                    block["input"] = json.loads(raw) if raw else {}
+            elif etype == "message_delta":
+                message.update(ev.get("delta") or {})
+                if ev.get("usage"):
+                    message["usage"] = {**(message.get("usage") or {}), **ev["usage"]}
+            elif etype == "error":
+                raise RuntimeError((ev.get("error") or {}).get("message", "stream error"))
+    finally:
+        r.close()
+    message["content"] = [blocks[i] for i in sorted(blocks)]
+    record_llm_usage("agent_stream", message.get("usage"), (time.perf_counter() - started) * 1000)
+    yield "message", message
+
+
+# Tools with no side effects: consecutive calls to these run concurrently
+READ_ONLY_TOOLS = frozenset({"get_journals", "list_tasks", "list_notes", "calendar_list", "notifications_unread"})
+WRITE_TOOLS = frozenset({"create_journal", "create_task", "update_task", "calendar_create_event", "calendar_update_event", "calendar_delete_event"})
+
+_tool_pool = ThreadPoolExecutor(max_workers=int(os.getenv("AGENT_TOOL_WORKERS", "4")), thread_name_prefix="agent-tool")
+
+
+def _friendly_error(e: Exception) -> str:
+    error_msg = str(e)
+
+    # Provide more user-friendly error messages for common issues
+    if "No valid Outlook token" in error_msg:
+        error_msg = "Calendar access not configured. Please connect your Outlook account in settings."
+    elif "rate limit" in error_msg.lower():
+        error_msg = "Service temporarily busy. Please try again in a moment."
+    elif "connection" in error_msg.lower() or "timeout" in error_msg.lower():
+        error_msg = "Service temporarily unavailable. Please try again later."
+    elif "permission" in error_msg.lower() or "unauthorized" in error_msg.lower():
+        error_msg = "Access denied. Please check your account permissions."
+    return error_msg
+
+
+def _call_tool(user_id: int, scopes: set[str], block: Dict[str, Any]) -> Tuple[bool, Any, float]:
+    """Run one tool; returns (ok, result or friendly error, elapsed ms)."""
+    started = time.perf_counter()
+    try:
+        ok, value = True, TOOL_REGISTRY[block["name"]](user_id=user_id, scopes=scopes, **block.get("input", {}))
+    except Exception as e:
+        ok, value = False, _friendly_error(e)
+    return ok, value, (time.perf_counter() - started) * 1000
+
+
+def _call_tool_in_app(app, user_id: int, scopes: set[str], block: Dict[str, Any]) -> Tuple[bool, Any, float]:
+    # worker threads get their own app context, and with it their own DB session
+    with app.app_context():
+        return _call_tool(user_id, scopes, block)
+
+
+def _tool_batches(blocks: list[dict]) -> list[list[dict]]:
+    """Split into runs that keep the model's order: consecutive read-only calls share a batch, each write is alone."""
+    batches: list[list[dict]] = []
+    for block in blocks:
+        if block["name"] in READ_ONLY_TOOLS and batches and batches[-1][0]["name"] in READ_ONLY_TOOLS:
+            batches[-1].append(block)
+        else:
+            batches.append([block])
+    return batches
+
+
+def _run_tool_batch(user_id: int, scopes: set[str], batch: list[dict]) -> list[Tuple[bool, Any, float]]:
+    if len(batch) == 1:
+        return [_call_tool(user_id, scopes, batch[0])]
+    app = current_app._get_current_object()
+    futures = [_tool_pool.submit(_call_tool_in_app, app, user_id, scopes, block) for block in batch]
+    return [f.result() for f in futures]
 
 
 def run_agent_turn(user_id: int, user_text: str, confirm_writes: bool = True, thread_id: int = None) -> Dict[str, Any]:
+    """Blocking agent turn: drain iter_agent_turn() and return its final payload."""
+    final: Dict[str, Any] = {}
+    for event, data in iter_agent_turn(user_id, user_text, confirm_writes=confirm_writes, thread_id=thread_id):
+        if event == "final":
+            final = data
+    return final
+
+
+def iter_agent_turn(user_id: int, user_text: str, confirm_writes: bool = True, thread_id: int = None,
+                    stream: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Run one agent turn as a sequence of (event, data) pairs.
+
+    Events: "delta" {text} (stream=True only), "tool_start" {id, name, input},
+    "tool_result" {id, name, result | error}, and always exactly one "final"
+    {text, tool_calls, usage[, error]} last. Text streamed before a tool call is
+    intermediate; the "final" text is authoritative.
+    """
     config = get_anthropic_config()
     if not config["api_key"] or not config["api_key"].startswith("sk-"):
-        return {"error": "anthropic_key_missing", "text": "❌ ANTHROPIC_API_KEY environment variable not set or invalid. Please configure your Claude API key to use the agent.", "tool_calls": []}
+        yield "final", {"error": "anthropic_key_missing", "text": "❌ ANTHROPIC_API_KEY environment variable not set or invalid. Please configure your Claude API key to use the agent.", "tool_calls": []}
+        return
 
     scopes = user_scopes(user_id)
     policy = AgentPolicy()
@@ -73,29 +233,62 @@ def run_agent_turn(user_id: int, user_text: str, confirm_writes: bool = True, th
     # rate limit per user
     rate_limit(f"agent:{user_id}", max_calls=60, per_seconds=60)
 
+    # per-step timings and tokens, written to agent_step_log when the turn ends
+    telemetry = TurnTelemetry(user_id, "agent_stream" if stream else "agent")
+    try:
+        messages = _initial_messages(user_id, user_text, confirm_writes, thread_id)
+
+        tool_calls = []
+        writes = 0
+        usage = {k: 0 for k in USAGE_FIELDS}  # summed over every Claude call of this turn
+
+        # Tool loop (bounded)
+        for step in range(policy.max_tool_calls):
+            started = time.perf_counter()
+            if stream:
+                resp = {}
+                for kind, payload in stream_claude(messages):
+                    if kind == "text":
+                        yield "delta", {"text": payload}
+                    else:
+                        resp = payload
+            else:
+                resp = call_claude(messages)
+            telemetry.llm(config["model"], (time.perf_counter() - started) * 1000, resp.get("usage"))
+            _add_usage(usage, resp)
+            content = resp.get("content", [])
+            # Collect every tool_use block (and the text) of this response
+            tool_uses = [b for b in content if b.get("type") == "tool_use"]
+            if not tool_uses:
+                # No tool call; return final text
+                yield "final", {"text": _response_text(content), "tool_calls": tool_calls, "usage": usage}
+                return
+
+            results, runnable, writes = _preflight(tool_uses, writes, policy, confirm_writes)
+            for batch in _tool_batches(runnable):
+                for block in batch:
+                    yield "tool_start", {"id": block["id"], "name": block["name"], "input": block.get("input", {})}
+                for block, outcome in zip(batch, _run_tool_batch(user_id, scopes, batch)):
+                    yield "tool_result", _record_outcome(user_id, block, outcome, results, tool_calls, telemetry)
+
+            messages.extend(_followup_messages(content, tool_uses, results))
+
+        yield "final", {"text": "Tool loop ended (max steps reached).", "tool_calls": tool_calls, "usage": usage}
+    except Exception as e:
+        telemetry.fail(e)
+        raise
+    finally:
+        telemetry.save()
+
+
+# ---- turn helpers shared by the sync/streaming and async runtimes ----
+
+def _initial_messages(user_id: int, user_text: str, confirm_writes: bool, thread_id: int | None) -> list[dict]:
+    """History + this turn's user message (with the context pack and confirmation hints). Touches the DB."""
     context_pack = build_context_pack(user_id)
 
-    # Get conversation history if thread_id is provided
-    messages = []
-    if thread_id:
-        # Import here to avoid circular imports
-        from app.models.chat import ChatMessage
-        
-        # Get recent conversation history (last 10 messages for context)
-        recent_messages = ChatMessage.query.filter_by(
-            user_id=user_id, 
-            thread_id=thread_id
-        ).order_by(ChatMessage.created_at.desc()).limit(10).all()
-        
-        # Reverse to get chronological order
-        recent_messages = list(reversed(recent_messages))
-        
-        # Add conversation history to messages
-        for msg in recent_messages:
-            messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+    # Conversation history: rolling thread summary + the newest messages within the token budget
+    messages = build_history(user_id, thread_id) if thread_id else []
 
     # Check if this is a confirmation to a previous request
     from app.agent.conversation_utils import is_confirmation_message, is_denial_message, extract_pending_action_from_history
@@ -131,113 +324,81 @@ def run_agent_turn(user_id: int, user_text: str, confirm_writes: bool = True, th
         "role": "user", 
         "content": f"Context: {json.dumps(context_pack)}\n\nUser request: {user_text}\n\nSettings: confirm_writes={confirm_writes}{conversation_context}"
     })
+    return messages
+
+
+def _add_usage(total: Dict[str, int], resp: Dict[str, Any]) -> None:
+    step_usage = usage_dict(resp.get("usage"))
+    for k in USAGE_FIELDS:
+        total[k] += step_usage[k]
+
+
+def _response_text(content: list[dict]) -> str:
+    return "\n".join(b.get("text", "") for b in content if b.get("type") == "text")
 
-    tool_calls = []
-    writes = 0
-
-    # Tool loop (bounded)
-    for step in range(policy.max_tool_calls):
-        resp = call_claude(messages, tools=[{"name": t["name"], "description": t["description"], "input_schema": t["input_schema"]} for t in TOOL_SCHEMAS])
-        content = resp.get("content", [])
-        # Scan for tool_use blocks or final text
-        next_tool = None
-        final_text = []
-        for block in content:
-            if block.get("type") == "tool_use":
-                next_tool = block
-                break
-            if block.get("type") == "text":
-                final_text.append(block.get("text",""))
-        if not next_tool:
-            # No tool call; return final text
-            return {"text": "\n".join(final_text), "tool_calls": tool_calls}
-
-        # Execute tool
-        tool_name = next_tool["name"]
-        tool_input = next_tool.get("input", {})
-        f = TOOL_REGISTRY.get(tool_name)
-        if not f:
-            messages.append({
-                "role": "assistant", 
-                "content": [{"type": "tool_use", "id": next_tool["id"], "name": tool_name, "input": tool_input}]
-            })
-            messages.append({
-                "role": "user", 
-                "content": [{"type": "tool_result", "tool_use_id": next_tool["id"], "content": json.dumps({"error": "unknown_tool"})}]
-            })
-            continue
 
-        # Count writes
-        if tool_name in {"create_journal","create_task","update_task","calendar_create_event","calendar_update_event","calendar_delete_event"}:
+def _preflight(tool_uses: list[dict], writes: int, policy: AgentPolicy, confirm_writes: bool):
+    """Answer unknown tools and write-limit hits up front, in the model's order.
+
+    Returns (results by tool_use id, blocks to run, updated write count).
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    runnable = []
+    for block in tool_uses:
+        tool_name = block["name"]
+        if tool_name not in TOOL_REGISTRY:
+            results[block["id"]] = {"error": "unknown_tool"}
+            continue
+        if tool_name in WRITE_TOOLS:
             writes += 1
             if writes > policy.max_writes_per_turn:
-                messages.append({
-                    "role": "assistant", 
-                    "content": [{"type": "tool_use", "id": next_tool["id"], "name": tool_name, "input": tool_input}]
-                })
-                messages.append({
-                    "role": "user", 
-                    "content": [{"type": "tool_result", "tool_use_id": next_tool["id"], "content": json.dumps({"error": "write_limit_exceeded"})}]
-                })
+                results[block["id"]] = {"error": "write_limit_exceeded"}
                 continue
             if confirm_writes and writes > policy.require_confirm_threshold:
                 # Ask model to confirm with user instead of proceeding
-                messages.append({
-                    "role": "assistant", 
-                    "content": [{"type": "tool_use", "id": next_tool["id"], "name": tool_name, "input": tool_input}]
-                })
-                messages.append({
-                    "role": "user", 
-                    "content": [{"type": "tool_result", "tool_use_id": next_tool["id"], "content": json.dumps({"error": "confirmation_required"})}]
-                })
+                results[block["id"]] = {"error": "confirmation_required"}
                 continue
+        runnable.append(block)
+    return results, runnable, writes
+
+
+def _record_outcome(user_id: int, block: dict, outcome: Tuple[bool, Any, float], results: dict, tool_calls: list,
+                    telemetry: TurnTelemetry) -> Dict[str, Any]:
+    """Audit and time one tool call, store its tool_result payload, and return the tool_result event data."""
+    ok, value, ms = outcome
+    tool_name, tool_input = block["name"], block.get("input", {})
+    telemetry.tool(tool_name, ms, result=value if ok else None, error=None if ok else value)
+    if ok:
+        audit_log(user_id, tool_name, tool_input, value)
+        tool_calls.append({"name": tool_name, "input": tool_input, "result": value})
+        results[block["id"]] = value
+        return {"id": block["id"], "name": tool_name, "result": value}
+    audit_log(user_id, tool_name, tool_input, None, error=value)
+    results[block["id"]] = {
+        "error": value,
+        "tool_name": tool_name,
+        "suggestion": "The operation couldn't be completed. You may need to check your settings or try again later.",
+    }
+    return {"id": block["id"], "name": tool_name, "error": value}
 
-        try:
-            result = f(user_id=user_id, scopes=scopes, **tool_input)
-            audit_log(user_id, tool_name, tool_input, result)
-            tool_calls.append({"name": tool_name, "input": tool_input, "result": result})
-            
-            # Add assistant message with tool use
-            messages.append({
-                "role": "assistant", 
-                "content": [{"type": "tool_use", "id": next_tool["id"], "name": tool_name, "input": tool_input}]
-            })
-            
-            # Add user message with tool result
-            messages.append({
-                "role": "user", 
-                "content": [{"type": "tool_result", "tool_use_id": next_tool["id"], "content": json.dumps(result)}]
-            })
-        except Exception as e:
-            error_msg = str(e)
-            
-            # Provide more user-friendly error messages for common issues
-            if "No valid Outlook token" in error_msg:
-                error_msg = "Calendar access not configured. Please connect your Outlook account in settings."
-            elif "rate limit" in error_msg.lower():
-                error_msg = "Service temporarily busy. Please try again in a moment."
-            elif "connection" in error_msg.lower() or "timeout" in error_msg.lower():
-                error_msg = "Service temporarily unavailable. Please try again later."
-            elif "permission" in error_msg.lower() or "unauthorized" in error_msg.lower():
-                error_msg = "Access denied. Please check your account permissions."
-            
-            audit_log(user_id, tool_name, tool_input, None, error=error_msg)
-            
-            # Create a more informative error result
-            error_result = {
-                "error": error_msg,
-                "tool_name": tool_name,
-                "suggestion": "The operation couldn't be completed. You may need to check your settings or try again later."
-            }
-            
-            messages.append({
-                "role": "assistant", 
-                "content": [{"type": "tool_use", "id": next_tool["id"], "name": tool_name, "input": tool_input}]
-            })
-            messages.append({
-                "role": "user", 
-                "content": [{"type": "tool_result", "tool_use_id": next_tool["id"], "content": json.dumps(error_result)}]
-            })
-            continue
 
-    return {"text": "Tool loop ended (max steps reached).", "tool_calls": tool_calls}
+def _followup_messages(content: list[dict], tool_uses: list[dict], results: dict) -> list[dict]:
+    """One assistant message with all tool_use blocks, one user message with all results."""
+    return [
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "text", "text": b.get("text", "")} if b.get("type") == "text"
+                else {"type": "tool_use", "id": b["id"], "name": b["name"], "input": b.get("input", {})}
+                for b in content
+                if b.get("type") == "tool_use" or (b.get("type") == "text" and b.get("text"))
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "tool_result", "tool_use_id": b["id"], "content": json.dumps(results[b["id"]])}
+                for b in tool_uses
+            ],
+        },
+    ]
@@ -1,7 +1,9 @@
 # app/agent/routes.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from app.agent.router import run_agent_turn
+from app.agent.router import run_agent_turn, iter_agent_turn
+from app.agent.async_runtime import arun_agent_turn, run_db
+from app.services.telemetry import agent_telemetry_stats
 from app.extensions import db
 from app.models.chat import ChatThread, ChatMessage
 from datetime import datetime
@@ -49,7 +51,7 @@ def save_agent_message(thread_id, user_id, role, content, tools=None):
     db.session.commit()
     return message
 
-@agent_bp.route("/chat", methods=["POST"])  # streaming can be added later
+@agent_bp.route("/chat", methods=["POST"])  # streaming variant: /chat/stream
 @jwt_required()
 def agent_chat():
     uid = get_jwt_identity()
@@ -79,3 +81,89 @@ def agent_chat():
     
     return jsonify(out), 200
 
+
+@agent_bp.route("/chat/async", methods=["POST"])
+@jwt_required()
+async def agent_chat_async():
+    """Same request/response as /chat, run on the asyncio agent runtime."""
+    uid = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    message = (data.get("message") or "").strip()
+    if not message:
+        return {"msg": "message required"}, 400
+
+    confirm_writes = bool(data.get("confirm_writes", True))
+    history_enabled = current_app.config.get("CHAT_HISTORY_ENABLED", True)
+
+    thread_id = await run_db(lambda: get_or_create_agent_thread(uid).id)
+    if history_enabled:
+        await run_db(save_agent_message, thread_id, uid, "user", message)
+
+    out = await arun_agent_turn(uid, message, confirm_writes=confirm_writes, thread_id=thread_id)
+
+    if history_enabled:
+        tools = out.get("tool_calls", [])
+        await run_db(save_agent_message, thread_id, uid, "assistant", out.get("text", ""), tools if tools else None)
+
+    return jsonify(out), 200
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@agent_bp.route("/chat/stream", methods=["POST"])
+@jwt_required()
+def agent_chat_stream():
+    """Same turn as /chat, sent as Server-Sent Events.
+
+    Events: start {thread_id}, delta {text}, tool_start, tool_result, final {text, tool_calls}, error {msg}.
+    """
+    uid = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    message = (data.get("message") or "").strip()
+    if not message:
+        return {"msg": "message required"}, 400
+
+    confirm_writes = bool(data.get("confirm_writes", True))
+    history_enabled = current_app.config.get("CHAT_HISTORY_ENABLED", True)
+
+    thread = get_or_create_agent_thread(uid)
+    thread_id = thread.id
+    if history_enabled:
+        save_agent_message(thread_id, uid, "user", message)
+
+    def generate():
+        # flush headers + a first event right away so the client sees the stream open
+        yield _sse("start", {"thread_id": thread_id})
+        try:
+            for event, payload in iter_agent_turn(uid, message, confirm_writes=confirm_writes, thread_id=thread_id, stream=True):
+                if event == "final" and history_enabled:
+                    # persist before the last event so a client hanging up early can't lose it
+                    tools = payload.get("tool_calls", [])
+                    save_agent_message(thread_id, uid, "assistant", payload.get("text", ""), tools if tools else None)
+                yield _sse(event, payload)
+        except Exception as e:
+            print(f"Agent stream failed for user {uid}: {e}")
+            yield _sse("error", {"msg": "agent stream failed"})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@agent_bp.route("/telemetry", methods=["GET"])
+@jwt_required()
+def agent_telemetry():
+    """Latency/token percentiles of the caller's agent and chat turns.
+
+    Query: days (1-90, default 7), source (agent, agent_stream, agent_async, ai_chat).
+    """
+    uid = get_jwt_identity()
+    try:
+        days = max(1, min(90, int(request.args.get("days", 7))))
+    except ValueError:
+        return {"msg": "days must be an integer"}, 400
+    source = request.args.get("source") or None
+    return jsonify(agent_telemetry_stats(uid, days=days, source=source)), 200
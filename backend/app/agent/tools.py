@@ -10,6 +10,8 @@ from app.models.task import Task
 from app.models.notification import Notification
 from app.models.notion import NotionNoteCache
 from app.services.metrics import log_event
+from app.services.search import apply_text_search
+from app.utils.timezone import utcnow
 
 # Import calendar services
 from app.services.calendar import sync_calendar, create_calendar_event
@@ -22,7 +24,7 @@ def t_list_journals(user_id: int, scopes: set[str], limit: int = 10, query: str
     require_scope(scopes, "journals:read")
     q = JournalEntry.query.filter_by(user_id=user_id)
     if query:
-        q = q.filter(JournalEntry.content.ilike(f"%{query}%"))
+        q = apply_text_search(q, JournalEntry, user_id, query, "journal", [JournalEntry.content], rank=True)
     if since_iso:
         from datetime import datetime
         try:
@@ -73,14 +75,12 @@ def t_delete_journal(user_id: int, scopes: set[str], id: int) -> Dict[str, Any]:
 
 def t_list_tasks(user_id: int, scopes: set[str], status: str | None = None, q: str | None = None, due_before: str | None = None, due_after: str | None = None, limit: int = 20) -> Dict[str, Any]:
     require_scope(scopes, "tasks:read")
-    from sqlalchemy import or_
     from datetime import datetime
     query = Task.query.filter_by(user_id=user_id)
     if status in {"todo","in_progress","done"}:
         query = query.filter(Task.status == status)
     if q:
-        like = f"%{q}%"
-        query = query.filter(or_(Task.title.ilike(like), Task.description.ilike(like)))
+        query = apply_text_search(query, Task, user_id, q, "task", [Task.title, Task.description], rank=True)
     def _dt(s):
         if not s: return None
         try: return datetime.fromisoformat(s.replace("Z","+00:00"))
@@ -133,13 +133,8 @@ def t_list_notes(user_id: int, scopes: set[str], limit: int = 10, query: str | N
     require_scope(scopes, "notes:read")
     q = NotionNoteCache.query.filter_by(user_id=user_id)
     if query:
-        # Search in both title and content
-        q = q.filter(
-            db.or_(
-                NotionNoteCache.title.ilike(f"%{query}%"),
-                NotionNoteCache.content.ilike(f"%{query}%")
-            )
-        )
+        # Search in both title and content (BM25-ranked when the FTS index exists)
+        q = apply_text_search(q, NotionNoteCache, user_id, query, "note", [NotionNoteCache.title, NotionNoteCache.content], rank=True)
     rows = q.order_by(NotionNoteCache.last_edited_time.desc()).limit(max(1, min(limit, 20))).all()
     notes = [{
         "page_id": r.page_id,
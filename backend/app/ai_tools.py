@@ -6,6 +6,7 @@ from app.models.user import User
 from app.models.journal import JournalEntry
 from datetime import datetime, timedelta
 from app.services.calendar import sync_calendar, create_calendar_event
+from app.services.search import apply_text_search
 
 # ---------- Tool Schemas (Anthropic) ----------
 TOOLS: List[Dict[str, Any]] = [
@@ -69,12 +70,11 @@ TOOLS: List[Dict[str, Any]] = [
 
 def exec_list_journals(user: User, args: Dict[str, Any]) -> Dict[str, Any]:
     try:
-        q = (JournalEntry.query.filter_by(user_id=user.id)
-             .order_by(JournalEntry.timestamp.desc()))
+        q = JournalEntry.query.filter_by(user_id=user.id)
         query = args.get("query")
         if query:
-            like = f"%{query}%"
-            q = q.filter(JournalEntry.content.ilike(like))
+            q = apply_text_search(q, JournalEntry, user.id, query, "journal", [JournalEntry.content], rank=True)
+        q = q.order_by(JournalEntry.timestamp.desc())
         limit = int(args.get("limit") or 20)
         rows = q.limit(limit).all()
         return {
@@ -2,8 +2,14 @@
 # Import models so they register with SQLAlchemy
 from .user import User        # noqa: F401
 from .journal import JournalEntry  # noqa: F401
+from .journal_streak import JournalDay, JournalStreak  # noqa: F401
 from .chat import ChatThread, ChatMessage  # noqa: F401
 from .notion import NotionLink, NotionNoteCache  # noqa: F401
 from .usage_log import UsageLog  # noqa: F401
+from .usage_rollup import UsageDailyRollup  # noqa: F401
+from .agent_telemetry import AgentStepLog  # noqa: F401
+from .reflection import WeeklyReflection  # noqa: F401
+from .calendar_event import CalendarEvent, CalendarSyncState  # noqa: F401
+from .outlook_outbox import OutlookOutbox  # noqa: F401
 from .task import Task  # noqa: F401
 from .notification import Notification  # noqa: F401
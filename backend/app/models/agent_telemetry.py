@@ -0,0 +1,36 @@
+from datetime import datetime
+from app.extensions import db
+
+class AgentStepLog(db.Model):
+    """One timed unit of an agent/chat turn (see services/telemetry.py).
+
+    kind="llm": one Claude call (name = model, tokens filled in);
+    kind="tool": one tool execution (name = tool, result_bytes / error filled in);
+    kind="turn": the whole turn (name = source, step = number of LLM calls, tokens summed).
+    """
+    __tablename__ = "agent_step_log"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    turn_id = db.Column(db.String(32), nullable=False, index=True)
+    source = db.Column(db.String(32), nullable=False)  # agent, agent_stream, agent_async, ai_chat
+    kind = db.Column(db.String(8), nullable=False)
+    name = db.Column(db.String(64), nullable=False)
+    step = db.Column(db.Integer, nullable=False, default=0)
+    ms = db.Column(db.Float, nullable=False, default=0.0)
+    input_tokens = db.Column(db.Integer, nullable=False, default=0)
+    output_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cache_read_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cache_write_tokens = db.Column(db.Integer, nullable=False, default=0)
+    result_bytes = db.Column(db.Integer, nullable=True)
+    ok = db.Column(db.Boolean, nullable=False, default=True)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # stats endpoint: per kind/name over a time window
+        db.Index("ix_agent_step_log_kind_name_created", "kind", "name", "created_at"),
+        db.Index("ix_agent_step_log_user_created", "user_id", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<AgentStepLog {self.turn_id} {self.kind}:{self.name} {self.ms:.0f}ms>"
@@ -0,0 +1,53 @@
+from datetime import datetime
+from app.extensions import db
+
+class CalendarEvent(db.Model):
+    """Local copy of a user's Outlook events, kept current by Graph delta sync (see services/calendar.py)."""
+    __tablename__ = "calendar_event"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    graph_id = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(255))
+    start_at = db.Column(db.DateTime, nullable=False)  # naive UTC
+    end_at = db.Column(db.DateTime, nullable=False)
+    is_all_day = db.Column(db.Boolean, default=False, nullable=False)
+    status = db.Column(db.String(32))  # Graph showAs
+    location = db.Column(db.String(255))
+    description = db.Column(db.Text)  # Graph bodyPreview
+    html_link = db.Column(db.Text)
+    synced_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "graph_id", name="uq_calendar_event_user_graph_id"),
+        # range reads: user + start window
+        db.Index("ix_calendar_event_user_start", "user_id", "start_at"),
+    )
+
+    def to_dict(self):
+        # same shape the live Graph reads used to return; `id` is the Outlook event id
+        return {
+            "id": self.graph_id,
+            "title": self.title or "(no title)",
+            "start_time": self.start_at.isoformat(),
+            "end_time": self.end_at.isoformat(),
+            "status": self.status,
+            "html_link": self.html_link,
+            "location": self.location or "",
+            "description": self.description or "",
+            "is_all_day": bool(self.is_all_day),
+        }
+
+
+class CalendarSyncState(db.Model):
+    """Per-user delta sync position: the Graph deltaLink and the calendarView window it covers."""
+    __tablename__ = "calendar_sync_state"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    delta_link = db.Column(db.Text)
+    window_start = db.Column(db.DateTime, nullable=False)
+    window_end = db.Column(db.DateTime, nullable=False)
+    last_synced_at = db.Column(db.DateTime)
+    last_full_sync_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(255))
+
+    def __repr__(self):
+        return f"<CalendarSyncState {self.user_id} synced={self.last_synced_at}>"
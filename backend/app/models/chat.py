@@ -9,6 +9,14 @@ class ChatThread(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     retention_days = db.Column(db.Integer)
+    # rolling summary of messages with id <= summary_through_id (see agent/history.py)
+    summary = db.Column(db.Text)
+    summary_through_id = db.Column(db.Integer)
+    summary_updated_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index("ix_chat_thread_user_updated", "user_id", "updated_at"),
+    )
 
 class ChatMessage(db.Model):
     __tablename__ = 'chat_message'
@@ -20,3 +28,8 @@ class ChatMessage(db.Model):
     tools_json = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, nullable=False)
 
+    __table_args__ = (
+        # list_messages / history: thread, ordered by created_at
+        db.Index("ix_chat_message_thread_created", "thread_id", "created_at"),
+    )
+
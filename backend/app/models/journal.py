@@ -9,6 +9,11 @@ class JournalEntry(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
+    __table_args__ = (
+        # list/search/streaks: user, newest first
+        db.Index("ix_journal_entry_user_timestamp", "user_id", "timestamp"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -0,0 +1,26 @@
+from app.extensions import db
+
+class JournalDay(db.Model):
+    """Number of journal entries a user has on a given day (see services/streaks.py)."""
+    __tablename__ = "journal_day"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    entries = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "day", name="uq_journal_day_user_day"),
+    )
+
+
+class JournalStreak(db.Model):
+    """Per-user streak state: the run ending at last_day, the best run, and the number of journal days."""
+    __tablename__ = "journal_streak"
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), primary_key=True)
+    last_day = db.Column(db.Date, nullable=True)
+    current = db.Column(db.Integer, default=0, nullable=False)
+    best = db.Column(db.Integer, default=0, nullable=False)
+    days = db.Column(db.Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<JournalStreak {self.user_id} last={self.last_day} cur={self.current} best={self.best}>"
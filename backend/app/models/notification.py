@@ -24,6 +24,15 @@ class Notification(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # /unread: user + read_at IS NULL, newest first
+        db.Index("ix_notification_user_read_created", "user_id", "read_at", "created_at"),
+        # /all history: user, newest first
+        db.Index("ix_notification_user_created", "user_id", "created_at"),
+        # de-duplication is enforced by the DB, not only by the pre-check in services/notify
+        db.Index("uq_notification_user_unique_key", "user_id", "unique_key", unique=True),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
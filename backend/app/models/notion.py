@@ -19,5 +19,10 @@ class NotionNoteCache(db.Model):
     title = db.Column(db.String(512))
     url = db.Column(db.String(512))
     last_edited_time = db.Column(db.DateTime, index=True)
+    content = db.Column(db.Text)
+
+    __table_args__ = (
+        db.Index("ix_notion_note_cache_user_edited", "user_id", "last_edited_time"),
+    )
 
 
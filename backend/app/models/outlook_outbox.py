@@ -0,0 +1,31 @@
+from datetime import datetime
+from app.extensions import db
+
+class OutlookOutbox(db.Model):
+    """A pending task -> Outlook event change, written in the same transaction as the task.
+
+    op="upsert": bring the task's event in line with the task's current state (create,
+    update, or delete it if the task lost its due date); op="delete": the task is gone,
+    delete `event_id`. Drained by services/outlook_outbox.py; sent rows are deleted.
+    """
+    __tablename__ = "outlook_outbox"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    task_id = db.Column(db.Integer, nullable=False)  # no FK: delete rows outlive their task
+    op = db.Column(db.String(16), nullable=False)
+    event_id = db.Column(db.String(128))
+    status = db.Column(db.String(16), nullable=False, default="pending")  # pending | sending | dead
+    # pending: due at next_attempt_at; sending: claimed by a drainer until next_attempt_at (its lease)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # worker scan: due pending rows in id order
+        db.Index("ix_outlook_outbox_status_next", "status", "next_attempt_at"),
+        db.Index("ix_outlook_outbox_task", "task_id"),
+    )
+
+    def __repr__(self):
+        return f"<OutlookOutbox {self.id} {self.op} task={self.task_id} {self.status}>"
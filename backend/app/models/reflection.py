@@ -0,0 +1,43 @@
+from datetime import datetime
+from app.extensions import db
+
+class WeeklyReflection(db.Model):
+    """One reflection job and, once done, its stored result (see services/reflection.py).
+
+    Keyed by (user, ISO week, goals hash): a repeat request for the same week and goals
+    reuses this row instead of calling Claude again.
+    """
+    __tablename__ = "weekly_reflection"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    iso_week = db.Column(db.String(8), nullable=False)  # e.g. "2026-W42"
+    goals_hash = db.Column(db.String(16), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="pending")  # pending | running | done | error
+    prompt = db.Column(db.Text)
+    result = db.Column(db.JSON)
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "iso_week", "goals_hash", name="uq_weekly_reflection_user_week_goals"),
+    )
+
+    def to_dict(self, with_result: bool = True):
+        out = {
+            "job_id": self.id,
+            "status": self.status,
+            "week": self.iso_week,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+        if self.status == "error":
+            out["error"] = self.error
+        if with_result and self.status == "done":
+            out["prompt"] = self.prompt
+            out["result"] = self.result
+        return out
+
+    def __repr__(self):
+        return f"<WeeklyReflection {self.user_id} {self.iso_week} {self.status}>"
@@ -18,10 +18,18 @@ class Task(db.Model):
 
     source = db.Column(db.String(50), default="manual", nullable=False)  # manual | journal_extract | chat_quickadd | notion
     outlook_event_id = db.Column(db.String(128))  # reserved for Phase B (optional)
+    outlook_payload_hash = db.Column(db.String(16))  # hash of the event payload last sent to Outlook
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    __table_args__ = (
+        # list_tasks / context pack: user + status filter, ordered by due_at
+        db.Index("ix_task_user_status_due", "user_id", "status", "due_at"),
+        # reminder scans: user + due_at range (status != 'done' is a residual filter)
+        db.Index("ix_task_user_due", "user_id", "due_at"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
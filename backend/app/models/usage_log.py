@@ -9,5 +9,12 @@ class UsageLog(db.Model):
     event_metadata = db.Column(db.JSON)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True, nullable=False)
 
+    __table_args__ = (
+        # dashboard counters: user + event_type + time window
+        db.Index("ix_usage_logs_user_event_created", "user_id", "event_type", "created_at"),
+        # series/heatmap without an event filter: user + time window
+        db.Index("ix_usage_logs_user_created", "user_id", "created_at"),
+    )
+
     def __repr__(self):
         return f"<UsageLog {self.user_id} {self.event_type} {self.created_at}>"
@@ -0,0 +1,18 @@
+from app.extensions import db
+
+class UsageDailyRollup(db.Model):
+    """Per-user, per-day event counts maintained alongside UsageLog inserts (see services/rollup.py)."""
+    __tablename__ = "usage_daily_rollup"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    event_type = db.Column(db.String(64), nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        # also serves user + day-range reads (heatmap, series, totals)
+        db.UniqueConstraint("user_id", "day", "event_type", name="uq_usage_daily_rollup_user_day_event"),
+    )
+
+    def __repr__(self):
+        return f"<UsageDailyRollup {self.user_id} {self.day} {self.event_type}={self.count}>"
@@ -2,13 +2,16 @@ from __future__ import annotations
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 import json
+import time
 from datetime import datetime
 from app.models.user import User
 from app.models.chat import ChatThread, ChatMessage
 from app.extensions import db
-from app.services.ai_client import ClaudeClient
+from app.services.ai_client import ClaudeClient, MODEL
 from app.ai_tools import TOOLS, EXECUTORS
 from app.services.metrics import log_event
+from app.services.prompt_cache import cached_tools, system_blocks, usage_dict
+from app.services.telemetry import TurnTelemetry
 
 ai_bp = Blueprint("ai", __name__, url_prefix="/api/ai")
 
@@ -26,6 +29,10 @@ SYSTEM_PROMPT = (
     "Keep answers concise. If a tool returns an error, explain and suggest a fix."
 )
 
+# Built once at import; both carry cache_control breakpoints
+SYSTEM_BLOCKS = system_blocks(SYSTEM_PROMPT)
+TOOLS_PAYLOAD = cached_tools(TOOLS)
+
 def get_or_create_default_thread(user_id):
     """Get or create a default chat thread for the user."""
     # Look for an existing default thread (latest thread or one titled "Latest chat")
@@ -61,6 +68,7 @@ def save_message(thread_id, user_id, role, content, tools=None):
 @ai_bp.route("/chat", methods=["POST"])
 @jwt_required()
 def chat():
+    telemetry = None
     try:
         data = request.get_json() or {}
         user_msg = (data.get("message") or "").strip()
@@ -88,6 +96,8 @@ def chat():
         if current_app.config.get("CHAT_HISTORY_ENABLED", True):
             save_message(thread_id, user_id, "user", user_msg)
 
+        telemetry = TurnTelemetry(user_id, "ai_chat")
+
         # Force tool usage in debug/test mode
         force_tool = None
         if current_app.debug and "force_tool" in data:
@@ -98,10 +108,11 @@ def chat():
 
         # 1) Call Claude with tool definitions
         client = ClaudeClient()
+        turn_started = started = time.perf_counter()
         resp = client.chat(
-            system=SYSTEM_PROMPT,
+            system=SYSTEM_BLOCKS,
             messages=messages,
-            tools=TOOLS,
+            tools=TOOLS_PAYLOAD,
             force_tool=force_tool
         )
 
@@ -109,47 +120,62 @@ def chat():
         if current_app.debug:
             print("Claude response content:", resp.content)
 
-        # 2) If Claude requested tool calls, execute them and send back results
+        steps = [{"step": 1, "llm_ms": _ms_since(started), "stop_reason": getattr(resp, "stop_reason", None), "usage": usage_dict(getattr(resp, "usage", None)), "tools": []}]
+        telemetry.llm(MODEL, steps[-1]["llm_ms"], getattr(resp, "usage", None))
+
+        # 2) Bounded tool loop: run every tool_use of a response, send all results back in one request,
+        #    and keep going while the model asks for more tools
         tool_results = []
-        for block in resp.content:
-            if block.type == "tool_use":  # Changed from tool_calls to tool_use
+        max_steps = current_app.config.get("AI_CHAT_MAX_STEPS", 5)
+        stopped = "end_turn"
+        while True:
+            tool_uses = [b for b in resp.content if b.type == "tool_use"]
+            if not tool_uses:
+                break
+            if len(steps) > max_steps:
+                stopped = "max_steps"
+                break
+
+            results = []
+            for block in tool_uses:
                 name = block.name
                 # The input is already a dict, no need to parse it
                 args = block.input
+                t0 = time.perf_counter()
                 fn = EXECUTORS.get(name)
                 if not fn:
+                    out = {"error": "tool not implemented"}
                     tool_results.append({"tool": name, "error": "tool not implemented"})
-                    continue
-                try:
-                    out = fn(user=user, args=args)
-                except Exception as e:  # keep errors visible
-                    out = {"error": str(e)}
-                tool_results.append({"tool": name, "result": out})
-
-                # Add the assistant's tool use message to the conversation
-                messages.append({
-                    "role": "assistant",
-                    "content": [
-                        {
-                            "type": "tool_use",
-                            "id": block.id,
-                            "name": name,
-                            "input": args
-                        }
-                    ]
-                })
-
-                # Send tool result back to Claude
-                resp = client.send_tool_result(
-                    system=SYSTEM_PROMPT,
-                    messages=messages,
-                    tool_use_id=block.id,
-                    result=out,
-                    tools=TOOLS  # Keep tools attached
-                )
+                else:
+                    try:
+                        out = fn(user=user, args=args)
+                    except Exception as e:  # keep errors visible
+                        out = {"error": str(e)}
+                    tool_results.append({"tool": name, "result": out})
+                steps[-1]["tools"].append({"tool": name, "ms": _ms_since(t0)})
+                telemetry.tool(name, steps[-1]["tools"][-1]["ms"], result=out)
+                results.append({"tool_use_id": block.id, "result": out})
+
+            # The assistant turn that asked for the tools, then all results in one follow-up
+            messages.append({"role": "assistant", "content": [_block_dict(b) for b in resp.content if _keep_block(b)]})
+            started = time.perf_counter()
+            resp = client.send_tool_results(
+                system=SYSTEM_BLOCKS,
+                messages=messages,
+                results=results,
+                tools=TOOLS_PAYLOAD  # Keep tools attached
+            )
+            messages.append({"role": "user", "content": [
+                {"type": "tool_result", "tool_use_id": r["tool_use_id"], "content": json.dumps(r["result"], default=str)}
+                for r in results
+            ]})
+            steps.append({"step": len(steps) + 1, "llm_ms": _ms_since(started), "stop_reason": getattr(resp, "stop_reason", None), "usage": usage_dict(getattr(resp, "usage", None)), "tools": []})
+            telemetry.llm(MODEL, steps[-1]["llm_ms"], getattr(resp, "usage", None))
 
         # Extract final text response
         final_text = _extract_text(resp)
+        if stopped == "max_steps" and not final_text:
+            final_text = "Tool loop ended (max steps reached)."
         
         # Save assistant message to database if chat history is enabled
         if current_app.config.get("CHAT_HISTORY_ENABLED", True):
@@ -160,15 +186,39 @@ def chat():
             log_event("chat_query", {"thread_id": thread_id, "tools_used": len(tool_results)})
         except Exception:
             pass  # Non-blocking, fail silently
-        
-        return jsonify({"reply": final_text, "tools": tool_results, "thread_id": thread_id})
+
+        telemetry.save()
+        return jsonify({
+            "reply": final_text,
+            "tools": tool_results,
+            "thread_id": thread_id,
+            "timing": {"total_ms": _ms_since(turn_started), "llm_calls": len(steps), "stopped": stopped, "steps": steps},
+        })
 
     except Exception as e:
         import traceback
         traceback.print_exc()
+        if telemetry:
+            telemetry.fail(e)
+            telemetry.save()
         return jsonify({"error": str(e)}), 500
 
 
+def _ms_since(t0: float) -> float:
+    return round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _keep_block(block) -> bool:
+    # the Messages API rejects empty text blocks when they are sent back
+    return block.type == "tool_use" or (block.type == "text" and bool(getattr(block, "text", "")))
+
+
+def _block_dict(block) -> dict:
+    if block.type == "tool_use":
+        return {"type": "tool_use", "id": block.id, "name": block.name, "input": block.input}
+    return {"type": "text", "text": getattr(block, "text", "")}
+
+
 def _extract_text(message_obj) -> str:
     parts = message_obj.content
     texts = [p.text for p in parts if p.type == "text" and p.text]
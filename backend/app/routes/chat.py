@@ -4,6 +4,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
 from app.models.chat import ChatThread, ChatMessage
+from app.utils.pagination import cursor_mode_requested, keyset_page
 
 chat_bp = Blueprint('chat_bp', __name__, url_prefix='/api/chat')
 
@@ -55,19 +56,36 @@ def delete_thread(thread_id):
 @jwt_required()
 def list_messages(thread_id):
     uid = get_jwt_identity()
-    q = ChatMessage.query.filter_by(thread_id=thread_id, user_id=uid).order_by(ChatMessage.created_at.asc())
+    q = ChatMessage.query.filter_by(thread_id=thread_id, user_id=uid)
     limit = int(request.args.get('limit', 50))
-    offset = int(request.args.get('offset', 0))
-    items = q.offset(offset).limit(limit).all()
-    return jsonify([
-        {
+
+    def ser(m):
+        return {
             'id': m.id,
             'role': m.role,
             'content': m.content,
             'created_at': m.created_at.isoformat(),
             'tools': m.tools_json and json.loads(m.tools_json)
-        } for m in items
-    ])
+        }
+
+    # Opt-in keyset mode returns an object instead of the bare list
+    if cursor_mode_requested(request.args):
+        try:
+            page_out = keyset_page(
+                q,
+                [(ChatMessage.created_at, 'asc', lambda m: m.created_at), (ChatMessage.id, 'asc', lambda m: m.id)],
+                after=request.args.get('after'),
+                limit=max(1, min(limit, 200)),
+                with_total=request.args.get('with_total', 'false').lower() == 'true',
+            )
+        except ValueError as e:
+            return jsonify({'msg': str(e)}), 400
+        page_out['items'] = [ser(m) for m in page_out['items']]
+        return jsonify(page_out)
+
+    offset = int(request.args.get('offset', 0))
+    items = q.order_by(ChatMessage.created_at.asc()).offset(offset).limit(limit).all()
+    return jsonify([ser(m) for m in items])
 
 @chat_bp.route('/threads/<int:thread_id>/messages', methods=['POST'])
 @jwt_required()
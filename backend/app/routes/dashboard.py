@@ -1,11 +1,11 @@
+from collections import defaultdict
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func
 from datetime import datetime, timedelta
 
-from app.extensions import db
-from app.models.usage_log import UsageLog
 from app.services.analytics import series_usage, journal_streaks
+from app.services.rollup import rollup_days
+from app.services.totals import dashboard_totals
 
 
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/api/dashboard")
@@ -18,24 +18,12 @@ def metrics():
     now = datetime.utcnow()
     week_start = now - timedelta(days=7)
 
-    # Count journal entries this week
-    journal_count = db.session.query(func.count(UsageLog.id)).filter_by(user_id=uid, event_type="journal_create").filter(UsageLog.created_at >= week_start).scalar()
-
-    # Count calendar syncs this week
-    calendar_syncs = db.session.query(func.count(UsageLog.id)).filter_by(user_id=uid, event_type="calendar_sync").filter(UsageLog.created_at >= week_start).scalar()
-
-    # Count chat queries this week
-    chat_queries = db.session.query(func.count(UsageLog.id)).filter_by(user_id=uid, event_type="chat_query").filter(UsageLog.created_at >= week_start).scalar()
-
-    # Notes syncs
-    notes_syncs = db.session.query(func.count(UsageLog.id)).filter_by(user_id=uid, event_type="notes_sync").filter(UsageLog.created_at >= week_start).scalar()
+    # One grouped rollup query (whole days from week_start's day), cached per user
+    totals = dashboard_totals(uid, week_start)
 
     return jsonify({
         "week_start": week_start.isoformat(),
-        "journal_entries": journal_count,
-        "calendar_syncs": calendar_syncs,
-        "chat_queries": chat_queries,
-        "notes_syncs": notes_syncs,
+        **totals,
     })
 
 
@@ -87,40 +75,13 @@ def summary():
         to_dt = datetime.utcnow()
         from_dt = to_dt - timedelta(days=max(1, min(window, 60)))
 
-        # reuse the Phase‑1 counters by calling /metrics logic quickly
-        # (import locally to avoid circulars)
-        from sqlalchemy import func
-        from app.models.usage_log import UsageLog
-        journal = (
-            db.session.query(func.count(UsageLog.id))
-            .filter(UsageLog.user_id == uid, UsageLog.event_type == "journal_create", UsageLog.created_at >= from_dt)
-            .scalar()
-        )
-        chats = (
-            db.session.query(func.count(UsageLog.id))
-            .filter(UsageLog.user_id == uid, UsageLog.event_type == "chat_query", UsageLog.created_at >= from_dt)
-            .scalar()
-        )
-        cals = (
-            db.session.query(func.count(UsageLog.id))
-            .filter(UsageLog.user_id == uid, UsageLog.event_type == "calendar_sync", UsageLog.created_at >= from_dt)
-            .scalar()
-        )
-        notes = (
-            db.session.query(func.count(UsageLog.id))
-            .filter(UsageLog.user_id == uid, UsageLog.event_type == "notes_sync", UsageLog.created_at >= from_dt)
-            .scalar()
-        )
+        # reuse the Phase‑1 counters (shared totals service)
+        totals = dashboard_totals(uid, from_dt)
         streak = journal_streaks(uid)
         return {
             "from": from_dt.isoformat(),
             "to": to_dt.isoformat(),
-            "totals": {
-                "journal_entries": int(journal or 0),
-                "chat_queries": int(chats or 0),
-                "calendar_syncs": int(cals or 0),
-                "notes_syncs": int(notes or 0),
-            },
+            "totals": totals,
             "streaks": streak,
         }, 200
     except Exception as e:
@@ -128,6 +89,8 @@ def summary():
 
 
 # POST /api/dashboard/reflection { optional: user_goals }
+# 202 {job_id, status} while the reflection is generated; 200 with the stored result
+# when this week's reflection for the same goals already exists.
 @dashboard_bp.route("/reflection", methods=["POST"])
 @jwt_required()
 def reflection():
@@ -135,20 +98,32 @@ def reflection():
     body = request.get_json(silent=True) or {}
     user_goals = body.get("user_goals")
     try:
-        from app.services.reflection import generate_reflection
+        from app.services.reflection import request_reflection
         from app.services.metrics import log_event
-        
-        out = generate_reflection(uid, user_goals=user_goals)
+
+        job, created = request_reflection(uid, user_goals=user_goals)
         # Log for analytics
         try:
-            log_event("reflection_request", {"has_goals": bool(user_goals)})
+            log_event("reflection_request", {"has_goals": bool(user_goals), "cached": job.status == "done"})
         except Exception:
             pass
-        return out, 200
+        return job.to_dict(), (200 if job.status == "done" else 202)
     except Exception as e:
         return {"msg": f"reflection_error: {e}"}, 502
 
 
+# GET /api/dashboard/reflection/<job_id> -> {job_id, status, week[, prompt, result | error]}
+@dashboard_bp.route("/reflection/<int:job_id>", methods=["GET"])
+@jwt_required()
+def reflection_status(job_id):
+    from app.services.reflection import get_reflection_job
+
+    job = get_reflection_job(get_jwt_identity(), job_id)
+    if not job:
+        return {"msg": "not found"}, 404
+    return job.to_dict(), 200
+
+
 # GET /api/dashboard/heatmap?window=60&event=journal_create
 @dashboard_bp.route("/heatmap", methods=["GET"])
 @jwt_required()
@@ -161,27 +136,11 @@ def heatmap():
     to_dt = datetime.utcnow()
     from_dt = to_dt - timedelta(days=window - 1)
 
-    # SQLite-compatible date truncation
-    q = db.session.query(
-        func.date(UsageLog.created_at).label("d"),
-        func.count(UsageLog.id)
-    ).filter(
-        UsageLog.user_id == uid,
-        UsageLog.created_at >= from_dt,
-        UsageLog.created_at <= to_dt,
-    )
-    if event:
-        q = q.filter(UsageLog.event_type == event)
-    q = q.group_by("d").order_by("d")
-
-    rows = q.all()
-    # Build dense series with zeros
-    from datetime import datetime as dt
-    by_day = {}
-    for date_str, count in rows:
-        date_obj = dt.strptime(date_str, '%Y-%m-%d').date()
-        by_day[date_obj] = int(count)
-    
+    # Per-day totals from usage_daily_rollup (summed across event types unless filtered)
+    by_day = defaultdict(int)
+    for day, _et, count in rollup_days(uid, from_dt, to_dt, [event] if event else None):
+        by_day[day] += int(count)
+
     out = []
     cur = from_dt.date()
     while cur <= to_dt.date():
@@ -217,36 +176,10 @@ def export_data():
     from_dt = to_dt - timedelta(days=window - 1)
 
     # Base totals (like /summary)
-    journal = (
-        db.session.query(func.count(UsageLog.id))
-        .filter(UsageLog.user_id == uid, UsageLog.event_type == "journal_create", UsageLog.created_at >= from_dt)
-        .scalar()
-    ) or 0
-    chats = (
-        db.session.query(func.count(UsageLog.id))
-        .filter(UsageLog.user_id == uid, UsageLog.event_type == "chat_query", UsageLog.created_at >= from_dt)
-        .scalar()
-    ) or 0
-    cals = (
-        db.session.query(func.count(UsageLog.id))
-        .filter(UsageLog.user_id == uid, UsageLog.event_type == "calendar_sync", UsageLog.created_at >= from_dt)
-        .scalar()
-    ) or 0
-    notes = (
-        db.session.query(func.count(UsageLog.id))
-        .filter(UsageLog.user_id == uid, UsageLog.event_type == "notes_sync", UsageLog.created_at >= from_dt)
-        .scalar()
-    ) or 0
-
     payload = {
         "from": from_dt.isoformat(),
         "to": to_dt.isoformat(),
-        "totals": {
-            "journal_entries": int(journal),
-            "chat_queries": int(chats),
-            "calendar_syncs": int(cals),
-            "notes_syncs": int(notes),
-        },
+        "totals": dashboard_totals(uid, from_dt),
     }
 
     if "streaks" in includes:
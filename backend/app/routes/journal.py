@@ -5,6 +5,8 @@ from sqlalchemy import desc
 from app.extensions import db
 from app.models.journal import JournalEntry
 from app.services.metrics import log_event
+from app.services.search import apply_text_search
+from app.utils.pagination import cursor_mode_requested, keyset_page
 
 journal_bp = Blueprint("journal", __name__, url_prefix="/api")
 
@@ -16,11 +18,27 @@ def get_journals():
     search_query = request.args.get("q", "").strip()
 
     # Base query for current user's entries
-    query = JournalEntry.query.filter_by(user_id=get_jwt_identity())
+    uid = get_jwt_identity()
+    query = JournalEntry.query.filter_by(user_id=uid)
 
-    # Apply search if provided
+    # Apply search if provided (FTS5 index, ilike fallback)
     if search_query:
-        query = query.filter(JournalEntry.content.ilike(f"%{search_query}%"))
+        query = apply_text_search(query, JournalEntry, uid, search_query, "journal", [JournalEntry.content])
+
+    # Opt-in keyset mode: ?paginate=cursor / ?after=<cursor>, total only with ?with_total=true
+    if cursor_mode_requested(request.args):
+        try:
+            page_out = keyset_page(
+                query,
+                [(JournalEntry.timestamp, "desc", lambda e: e.timestamp), (JournalEntry.id, "desc", lambda e: e.id)],
+                after=request.args.get("after"),
+                limit=max(1, min(limit, 100)),
+                with_total=request.args.get("with_total", "false").lower() == "true",
+            )
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+        page_out["entries"] = [entry.to_dict() for entry in page_out.pop("items")]
+        return jsonify(page_out)
 
     # Order by newest first and paginate
     paginated = query.order_by(desc(JournalEntry.timestamp)).paginate(
@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from app.extensions import db
 from app.models.notification import Notification
 from app.services.notify import scan_user_tasks_for_reminders
+from app.utils.pagination import cursor_mode_requested, keyset_page
 
 notifications_bp = Blueprint("notifications", __name__, url_prefix="/api/notifications")
 
@@ -50,6 +51,20 @@ def list_all():
     uid = get_jwt_identity()
     page = max(1, int(request.args.get("page", 1)))
     page_size = min(100, max(1, int(request.args.get("page_size", 20))))
+    if cursor_mode_requested(request.args):
+        try:
+            page_out = keyset_page(
+                Notification.query.filter_by(user_id=uid),
+                [(Notification.created_at, "desc", lambda n: n.created_at), (Notification.id, "desc", lambda n: n.id)],
+                after=request.args.get("after"),
+                limit=page_size,
+                with_total=request.args.get("with_total", "false").lower() == "true",
+            )
+        except ValueError as e:
+            return {"msg": str(e)}, 400
+        page_out["items"] = [n.to_dict() for n in page_out["items"]]
+        page_out["page_size"] = page_size
+        return page_out, 200
     q = Notification.query.filter_by(user_id=uid).order_by(Notification.created_at.desc())
     items = q.paginate(page=page, per_page=page_size, error_out=False)
     return {
@@ -2,9 +2,11 @@
 from flask import Blueprint, request, jsonify, session, redirect
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta, timezone
-import os, uuid, requests
+import os, uuid
+from app.services.http_transport import transport
 from app.extensions import db
 from app.models.oauth_token import OAuthToken
+from app.services.outlook_token import token_manager
 
 outlook_bp = Blueprint("outlook_oauth", __name__, url_prefix="/api/calendar/outlook")
 
@@ -85,7 +87,7 @@ def callback():
         "redirect_uri": redirect_uri,
         "scope": SCOPES,
     }
-    resp = requests.post(TOKEN_URL, data=data, timeout=20)
+    resp = transport.post(TOKEN_URL, data=data, timeout=20)
     if resp.status_code != 200:
         return jsonify({"msg": "token exchange failed", "status": resp.status_code}), 502
     
@@ -104,6 +106,7 @@ def callback():
     existing.expiry = expiry
     existing.scopes = SCOPES
     db.session.commit()
+    token_manager.invalidate(user_id)
     
     # Clear the session data
     session.pop("oauth_state", None)
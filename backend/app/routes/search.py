@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+
+from app.models.chat import ChatMessage
+from app.services.search import KINDS, fts_enabled, search
+
+search_bp = Blueprint("search", __name__, url_prefix="/api")
+
+
+# GET /api/search?q=lab+report&types=journal,task,note,chat&limit=20
+@search_bp.route("/search", methods=["GET"])
+@jwt_required()
+def unified_search():
+    uid = int(get_jwt_identity())
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return {"msg": "q required"}, 400
+    if not fts_enabled():
+        return {"msg": "search index not available; run `flask rebuild-search-index`"}, 503
+
+    types_s = request.args.get("types")
+    kinds = [k for k in types_s.split(",") if k in KINDS] if types_s else list(KINDS)
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+
+    hits = search(uid, q, kinds=kinds, limit=limit)
+
+    # Chat hits link back to their thread
+    chat_ids = [h["id"] for h in hits if h["kind"] == "chat"]
+    if chat_ids:
+        threads = dict(
+            ChatMessage.query.with_entities(ChatMessage.id, ChatMessage.thread_id)
+            .filter(ChatMessage.id.in_(chat_ids), ChatMessage.user_id == uid)
+            .all()
+        )
+        for h in hits:
+            if h["kind"] == "chat":
+                h["thread_id"] = threads.get(h["id"])
+
+    return jsonify({"q": q, "items": hits, "count": len(hits)})
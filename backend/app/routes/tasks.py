@@ -1,12 +1,17 @@
 from datetime import datetime
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_
+from sqlalchemy import case
 
 from app.extensions import db
 from app.models.task import Task
 from app.services.metrics import log_event  # Phase 1 helper
-from app.services.outlook_tasks import ensure_task_event, delete_task_event
+from app.services.outlook_outbox import enqueue_task_sync, outlook_outbox
+from app.services.outlook_tasks import resync_tasks_to_outlook, task_sync_stats
+from app.models.outlook_outbox import OutlookOutbox
+from app.models.oauth_token import OAuthToken
+from app.services.search import apply_text_search
+from app.utils.pagination import cursor_mode_requested, keyset_page
 from app.services.task_nlp import quick_extract_task
 
 
@@ -61,23 +66,17 @@ def create_task():
         source=(data.get("source") or "manual"),
     )
     db.session.add(t)
+    db.session.flush()
+    # Outlook sync goes through the outbox, committed together with the task
+    enqueue_task_sync(t)
     db.session.commit()
+    outlook_outbox.kick()
 
     try:
         log_event("task_create", {"id": t.id, "priority": t.priority})
     except Exception:
         pass
 
-    # Outlook sync
-    try:
-        if t.due_at:
-            eid = ensure_task_event(uid, t)
-            if eid and eid != t.outlook_event_id:
-                t.outlook_event_id = eid
-                db.session.commit()
-    except Exception:
-        pass
-
     return jsonify(t.to_dict()), 201
 
 
@@ -101,8 +100,28 @@ def list_tasks():
     if due_after:
         query = query.filter(Task.due_at != None, Task.due_at >= due_after)  # noqa: E711
     if q:
-        like = f"%{q}%"
-        query = query.filter(or_(Task.title.ilike(like), Task.description.ilike(like)))
+        query = apply_text_search(query, Task, uid, q, "task", [Task.title, Task.description])
+
+    if cursor_mode_requested(request.args):
+        # Same order as below plus id as a tiebreak: undated last, soonest due first, newest first
+        try:
+            page_out = keyset_page(
+                query,
+                [
+                    (case((Task.due_at.is_(None), 1), else_=0), "asc", lambda t: 1 if t.due_at is None else 0),
+                    (Task.due_at, "asc", lambda t: t.due_at),
+                    (Task.created_at, "desc", lambda t: t.created_at),
+                    (Task.id, "desc", lambda t: t.id),
+                ],
+                after=request.args.get("after"),
+                limit=page_size,
+                with_total=request.args.get("with_total", "false").lower() == "true",
+            )
+        except ValueError as e:
+            return {"msg": str(e)}, 400
+        page_out["items"] = [t.to_dict() for t in page_out["items"]]
+        page_out["page_size"] = page_size
+        return jsonify(page_out)
 
     query = query.order_by(Task.due_at.is_(None), Task.due_at.asc(), Task.created_at.desc())
 
@@ -159,21 +178,9 @@ def update_task(task_id: int):
     if "due_at" in data:
         t.due_at = _parse_dt(data.get("due_at"))
 
+    enqueue_task_sync(t)
     db.session.commit()
-
-    try:
-        if t.due_at:
-            eid = ensure_task_event(uid, t)
-            if eid and eid != t.outlook_event_id:
-                t.outlook_event_id = eid
-                db.session.commit()
-        else:
-            delete_task_event(uid, t)
-            if t.outlook_event_id:
-                t.outlook_event_id = None
-                db.session.commit()
-    except Exception:
-        pass
+    outlook_outbox.kick()
 
     if data.keys() - {"status"}:
         try:
@@ -192,13 +199,10 @@ def delete_task(task_id: int):
     if not t:
         return {"msg": "Not found"}, 404
 
-    try:
-        delete_task_event(uid, t)
-    except Exception:
-        pass
-
+    enqueue_task_sync(t, "delete")
     db.session.delete(t)
     db.session.commit()
+    outlook_outbox.kick()
 
     try:
         log_event("task_delete", {"id": task_id})
@@ -231,22 +235,46 @@ def quickadd():
         source="chat_quickadd",
     )
     db.session.add(t)
+    db.session.flush()
+    enqueue_task_sync(t)
     db.session.commit()
+    outlook_outbox.kick()
 
     try:
-        log_event("task_create", {"id": t.id, "priority": t.priority, "source": "chat_quickadd"})
+        log_event("task_create", {"id": t.id, "priority": t.priority, "source": "chat_quickadd", "parser": cand.get("parser")})
     except Exception:
         pass
 
-    # Sync to Outlook if due_at exists
+    return {**t.to_dict(), "parser": cand.get("parser"), "confidence": cand.get("confidence")}, 201
+
+
+@tasks_bp.route("/outlook/resync", methods=["POST"])
+@jwt_required()
+def resync_outlook():
+    """Push all of the user's tasks to Outlook again, batched through Graph $batch."""
+    uid = int(get_jwt_identity())
+    if not OAuthToken.get_for_user(uid, "outlook"):
+        return {"msg": "Outlook not connected"}, 400
+    try:
+        out = resync_tasks_to_outlook(uid)
+    except Exception as e:
+        return {"msg": str(e)}, 502
     try:
-        if t.due_at:
-            eid = ensure_task_event(uid, t)
-            if eid and eid != t.outlook_event_id:
-                t.outlook_event_id = eid
-                db.session.commit()
+        log_event("task_outlook_resync", {"tasks": out["tasks"], "failed": out["failed"]})
     except Exception:
         pass
+    return jsonify(out)
 
-    return t.to_dict(), 201
 
+@tasks_bp.route("/outlook/sync-stats", methods=["GET"])
+@jwt_required()
+def outlook_sync_stats():
+    """Task -> Outlook event operations sent vs skipped as no-ops (this process), plus the user's outbox backlog."""
+    uid = int(get_jwt_identity())
+    backlog = dict(
+        db.session.query(OutlookOutbox.status, db.func.count(OutlookOutbox.id))
+        .filter(OutlookOutbox.user_id == uid)
+        .group_by(OutlookOutbox.status)
+        .all()
+    )
+    return jsonify({**task_sync_stats(), "pending": backlog.get("pending", 0) + backlog.get("sending", 0), "dead": backlog.get("dead", 0)})
@@ -1,8 +1,11 @@
 import os
 import json
+import time
 from typing import Any, Dict, List, Optional
 from anthropic import Anthropic
 
+from app.services.prompt_cache import record_llm_usage, system_blocks, with_message_breakpoint
+
 MODEL = os.getenv("CLAUDE_MODEL", "claude-3-haiku-20240307")
 MAX_TOKENS = int(os.getenv("CLAUDE_MAX_TOKENS", "1024"))
 
@@ -18,60 +21,48 @@ class ClaudeClient:
 
     def chat(
         self,
-        system: str,
+        system: str | List[Dict[str, Any]],
         messages: List[Dict[str, Any]],
         tools: List[Dict[str, Any]] | None = None,
         force_tool: Optional[str] = None
     ) -> Any:
-        """Send a messages.create request with optional tool definitions."""
+        """Send a messages.create request with optional tool definitions.
+
+        A plain-string system prompt gets a cache breakpoint; pass prebuilt blocks/tools
+        (see services/prompt_cache.py) to avoid rebuilding them per call.
+        """
         payload: Dict[str, Any] = {
             "model": MODEL,
             "max_tokens": MAX_TOKENS,
-            "system": system,
-            "messages": messages,
+            "system": system_blocks(system) if isinstance(system, str) else system,
+            "messages": with_message_breakpoint(messages),
         }
         if tools:
             payload["tools"] = tools
         if force_tool:
             payload["tool_choice"] = {"type": "tool", "name": force_tool}
 
-        return self.client.messages.create(**payload)
+        started = time.perf_counter()
+        resp = self.client.messages.create(**payload)
+        record_llm_usage("ai_chat", getattr(resp, "usage", None), (time.perf_counter() - started) * 1000)
+        return resp
 
-    def send_tool_result(
+    def send_tool_results(
         self,
         system: str,
         messages: List[Dict[str, Any]],
-        tool_use_id: str,
-        result: Any,
+        results: List[Dict[str, Any]],
         tools: List[Dict[str, Any]] | None = None,
     ) -> Any:
-        """Send a follow-up message with tool result."""
-        # Ensure result is JSON-serializable
-        if not isinstance(result, (dict, list, str, int, float, bool)):
-            result = {"result": str(result)}
-
-        # Log tool result for debugging
-        print(f"Sending tool result for {tool_use_id}: {len(str(result))} bytes")
-
-        # Add the tool result message to the conversation
-        all_messages = [
-            *messages,
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": json.dumps(result)
-                    }
-                ]
-            }
-        ]
+        """Send one follow-up carrying every tool result of the previous response.
 
-        return self.client.messages.create(
-            model=MODEL,
-            max_tokens=MAX_TOKENS,
-            system=system,
-            tools=tools,  # Keep tools attached
-            messages=all_messages
-        )
\ No newline at end of file
+        `results` is a list of {"tool_use_id": ..., "result": ...} in tool_use order.
+        """
+        content = []
+        for r in results:
+            result = r["result"]
+            # Ensure result is JSON-serializable
+            if not isinstance(result, (dict, list, str, int, float, bool)):
+                result = {"result": str(result)}
+            content.append({"type": "tool_result", "tool_use_id": r["tool_use_id"], "content": json.dumps(result, default=str)})
+        return self.chat(system=system, messages=[*messages, {"role": "user", "content": content}], tools=tools)
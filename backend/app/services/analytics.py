@@ -7,7 +7,8 @@ from sqlalchemy import func
 
 from app.extensions import db
 from app.models.usage_log import UsageLog
-from app.models.journal import JournalEntry  # assumes your model file name
+from app.services.rollup import rollup_days
+from app.services.streaks import journal_streaks  # noqa: F401  (re-exported for the dashboard routes)
 
 Bucket = Literal["day", "hour"]
 
@@ -40,43 +41,38 @@ def series_usage(
     bucket: Bucket = "day",
     events: List[str] | None = None,
 ) -> Dict:
-    """Return time‑bucket counts per event_type from UsageLog.
+    """Return time‑bucket counts per event_type (day buckets from usage_daily_rollup, hour buckets from UsageLog).
     Shape: { bucket: "day", from, to, points: [{ t:"2025-09-01", counts:{journal_create:2,...}}] }
     """
     from_dt = _dt_utc(from_dt)
     to_dt = _dt_utc(to_dt)
 
-    # SQLite-compatible date truncation
-    if bucket == "hour":
-        date_format = func.strftime('%Y-%m-%d %H:00:00', UsageLog.created_at)
-    else:  # day
-        date_format = func.date(UsageLog.created_at)
-
-    q = db.session.query(
-        UsageLog.event_type,
-        date_format.label("bucket_ts"),
-        func.count(UsageLog.id),
-    ).filter(
-        UsageLog.user_id == user_id,
-        UsageLog.created_at >= from_dt,
-        UsageLog.created_at <= to_dt,
-    ).group_by("bucket_ts", UsageLog.event_type)
-
-    if events:
-        q = q.filter(UsageLog.event_type.in_(events))
+    agg = defaultdict(dict)
+    if bucket == "day":
+        # Day buckets come from the incrementally maintained usage_daily_rollup
+        for day, et, c in rollup_days(user_id, from_dt, to_dt, events):
+            if isinstance(day, str):
+                day = datetime.strptime(day, '%Y-%m-%d').date()
+            ts = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+            agg[ts][et] = agg[ts].get(et, 0) + int(c)
+    else:
+        # Hour buckets still scan raw usage_logs (bounded by the requested window)
+        q = db.session.query(
+            UsageLog.event_type,
+            func.strftime('%Y-%m-%d %H:00:00', UsageLog.created_at).label("bucket_ts"),
+            func.count(UsageLog.id),
+        ).filter(
+            UsageLog.user_id == user_id,
+            UsageLog.created_at >= from_dt,
+            UsageLog.created_at <= to_dt,
+        ).group_by("bucket_ts", UsageLog.event_type)
 
-    rows = q.all()
+        if events:
+            q = q.filter(UsageLog.event_type.in_(events))
 
-    # index rows by timestamp
-    agg = defaultdict(dict)
-    for et, ts_str, c in rows:
-        if bucket == "hour":
-            # Parse the hour string back to datetime
+        for et, ts_str, c in q.all():
             ts = datetime.strptime(ts_str, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
-        else:
-            # Parse date and set to start of day
-            ts = datetime.strptime(str(ts_str), '%Y-%m-%d').replace(tzinfo=timezone.utc)
-        agg[ts][et] = int(c)
+            agg[ts][et] = int(c)
 
     # fill missing buckets with 0s
     buckets = []
@@ -98,44 +94,3 @@ def series_usage(
         "to": to_dt.isoformat(),
         "points": buckets,
     }
-
-
-def journal_streaks(user_id: int) -> Dict[str, int]:
-    """Compute current and best day‑streaks from JournalEntry.created_at."""
-    # Pull distinct dates with at least one entry - SQLite compatible
-    rows = (
-        db.session.query(func.date(JournalEntry.timestamp))
-        .filter(JournalEntry.user_id == user_id)
-        .group_by(func.date(JournalEntry.timestamp))
-        .order_by(func.date(JournalEntry.timestamp))
-        .all()
-    )
-    
-    if not rows:
-        return {"current": 0, "best": 0}
-    
-    # Convert date strings to date objects
-    from datetime import datetime
-    days = [datetime.strptime(r[0], '%Y-%m-%d').date() for r in rows]
-    
-    # Best streak
-    best = cur = 1
-    for i in range(1, len(days)):
-        if (days[i] - days[i - 1]).days == 1:
-            cur += 1
-        else:
-            best = max(best, cur)
-            cur = 1
-    best = max(best, cur)
-
-    # Current streak counting back from today
-    from datetime import date, timedelta as td
-    today = date.today()
-    s = set(days)
-    current = 0
-    d = today
-    while d in s:
-        current += 1
-        d = d - td(days=1)
-
-    return {"current": current, "best": int(best)}
@@ -1,98 +1,344 @@
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app.extensions import db
 from app.models.oauth_token import OAuthToken
-import requests
+from app.models.calendar_event import CalendarEvent, CalendarSyncState
+from app.services.http_transport import transport
+from app.services.outlook_token import ensure_token
 import os
+import threading
+import requests
 
 GRAPH_BASE = "https://graph.microsoft.com/v1.0"
 
-def ensure_token(token: OAuthToken) -> str | None:
-    """Refresh token if needed and return access token."""
-    if token and token.expiry:
-        # Make sure token.expiry is timezone-aware
-        expiry = token.expiry if token.expiry.tzinfo else token.expiry.replace(tzinfo=timezone.utc)
-        if expiry > datetime.now(timezone.utc) + timedelta(seconds=30):
-            return token.access_token
-
-    # refresh
-    client_id = os.getenv("OUTLOOK_CLIENT_ID")
-    client_secret = os.getenv("OUTLOOK_CLIENT_SECRET")
-    redirect_uri = os.getenv("OUTLOOK_REDIRECT_URI")
-    
-    if not client_id or not client_secret or not redirect_uri:
-        print(f"Missing environment variables: CLIENT_ID={bool(client_id)}, CLIENT_SECRET={bool(client_secret)}, REDIRECT_URI={bool(redirect_uri)}")
+# Calendar reads are served from the calendar_event table. It is filled by Graph
+# calendarView/delta over a fixed window (CALENDAR_SYNC_PAST_DAYS back,
+# CALENDAR_SYNC_AHEAD_DAYS ahead); the stored deltaLink makes later syncs pull only
+# changes. A read older than max_age refreshes in the background and answers from the
+# table right away, so Graph latency or outages only make results staler.
+SYNC_PAST_DAYS = int(os.getenv("CALENDAR_SYNC_PAST_DAYS", "7"))
+SYNC_AHEAD_DAYS = int(os.getenv("CALENDAR_SYNC_AHEAD_DAYS", "90"))
+SYNC_MAX_AGE_SECONDS = int(os.getenv("CALENDAR_SYNC_MAX_AGE_SECONDS", "300"))
+READ_MAX_DAYS = 31  # a full re-sync moves the window before it gets this close to its end
+PAGE_SIZE = int(os.getenv("CALENDAR_PAGE_SIZE", "100"))
+GRAPH_PREFER = f'odata.maxpagesize={PAGE_SIZE}, outlook.body-content-type="text"'
+# plain calendarView reads (outside the synced window) ask only for what _event_row keeps
+EVENT_SELECT = "id,subject,start,end,isAllDay,showAs,location,bodyPreview,webLink"
+
+class CalendarSyncError(Exception):
+    def __init__(self, msg: str, status_code: int = 502):
+        super().__init__(msg)
+        self.status_code = status_code
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+def _graph_dt(value: Dict[str, Any] | None) -> datetime | None:
+    # Graph sends "2026-10-18T09:00:00.0000000" in UTC (no Prefer: outlook.timezone header)
+    raw = (value or {}).get("dateTime") or (value or {}).get("date")
+    if not raw:
         return None
-        
-    if not token or not token.refresh_token:
-        print("Missing token or refresh_token")
+    return _naive_utc(datetime.fromisoformat(raw[:19]))
+
+
+def _event_row(user_id: int, evt: Dict[str, Any], now: datetime) -> Dict[str, Any] | None:
+    start, end = _graph_dt(evt.get("start")), _graph_dt(evt.get("end"))
+    if not evt.get("id") or start is None:
         return None
-        
-    data = {
-        "client_id": client_id,
-        "client_secret": client_secret,
-        "grant_type": "refresh_token",
-        "refresh_token": token.refresh_token,
-        "scope": "offline_access Calendars.ReadWrite",
-        "redirect_uri": redirect_uri,
+    return {
+        "user_id": user_id,
+        "graph_id": evt["id"],
+        "title": (evt.get("subject") or "")[:255] or None,
+        "start_at": start,
+        "end_at": end or start,
+        "is_all_day": bool(evt.get("isAllDay", False)),
+        "status": evt.get("showAs"),
+        "location": ((evt.get("location") or {}).get("displayName") or "")[:255],
+        "description": evt.get("bodyPreview"),
+        "html_link": evt.get("webLink"),
+        "synced_at": now,
     }
-    
+
+
+def store_event(user_id: int, evt: Dict[str, Any]) -> None:
+    """Upsert one Graph event (e.g. a create/update response) so reads see it before the next sync.
+
+    Best-effort: the Graph write already succeeded, so a failure here is only logged.
+    """
     try:
-        r = requests.post("https://login.microsoftonline.com/common/oauth2/v2.0/token", data=data, timeout=20)
-        if r.status_code != 200:
-            print(f"Token refresh failed with status {r.status_code}: {r.text}")
-            return None
-        j = r.json()
-        token.access_token = j.get("access_token")
-        token.refresh_token = j.get("refresh_token", token.refresh_token)
-        expires_in = int(j.get("expires_in", 0))
-        token.expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+        row = _event_row(int(user_id), evt or {}, datetime.utcnow())
+        if row is None:
+            return
+        existing = CalendarEvent.query.filter_by(user_id=row["user_id"], graph_id=row["graph_id"]).first()
+        if existing:
+            for k, v in row.items():
+                setattr(existing, k, v)
+        else:
+            db.session.add(CalendarEvent(**row))
         db.session.commit()
-        return token.access_token
     except Exception as e:
-        print(f"Exception during token refresh: {e}")
-        return None
+        db.session.rollback()
+        print(f"calendar store: could not store event for user {user_id}: {e}")
 
-def sync_calendar(user_id: int, end_dt: datetime | None = None) -> List[Dict[str, Any]]:
-    """Return upcoming events for user up to end_dt."""
+
+def forget_event(user_id: int, graph_id: str) -> None:
+    try:
+        CalendarEvent.query.filter_by(user_id=int(user_id), graph_id=graph_id).delete()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"calendar store: could not drop event for user {user_id}: {e}")
+
+
+def graph_pages(url: str, params: Dict[str, Any] | None, access: str, token: OAuthToken):
+    """Yield each page of a Graph collection, following @odata.nextLink; only one page is held at a time.
+
+    Pages are capped at CALENDAR_PAGE_SIZE items via Prefer: odata.maxpagesize, and event
+    bodies come back as text instead of HTML (calendarView/delta does not take $select).
+    """
+    headers = {"Prefer": GRAPH_PREFER}
+    while url:
+        r = transport.get(url, params=params, headers={**headers, "Authorization": f"Bearer {access}"}, timeout=20)
+        if r.status_code == 401:
+            access = ensure_token(token, rejected=access)
+            if not access:
+                raise CalendarSyncError("Failed to refresh token after 401. Please reconnect your Outlook account.", 401)
+            r = transport.get(url, params=params, headers={**headers, "Authorization": f"Bearer {access}"}, timeout=20)
+        if r.status_code == 410:
+            raise CalendarSyncError("delta token expired", 410)
+        if r.status_code != 200:
+            msg = f"Microsoft Graph API error: {r.status_code}"
+            try:
+                msg = f"Microsoft Graph API error: {r.json()['error'].get('message', 'Unknown error')}"
+            except Exception:
+                pass
+            raise CalendarSyncError(msg, 502)
+        page = r.json()
+        yield page
+        url, params = page.get("@odata.nextLink"), None
+
+
+def iter_event_rows(user_id: int, pages, now: datetime):
+    """Normalize Graph event pages lazily into (graph_id, row) pairs; row is None for a delta @removed entry."""
+    for page in pages:
+        for evt in page.get("value", []):
+            if "@removed" in evt:
+                yield evt.get("id"), None
+                continue
+            row = _event_row(user_id, evt, now)
+            if row is not None:
+                yield row["graph_id"], row
+
+
+_sync_locks: Dict[int, threading.Lock] = {}
+_sync_locks_guard = threading.Lock()
+_inflight: set[int] = set()
+_sync_pool = ThreadPoolExecutor(max_workers=int(os.getenv("CALENDAR_SYNC_WORKERS", "2")), thread_name_prefix="calendar-sync")
+
+
+def _user_lock(user_id: int) -> threading.Lock:
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(user_id, threading.Lock())
+
+
+def sync_calendar_events(user_id: int, full: bool = False) -> Dict[str, Any]:
+    """Bring calendar_event up to date for one user; returns {mode, upserted, removed}.
+
+    Uses the stored deltaLink when there is one and its window still covers the next
+    READ_MAX_DAYS; otherwise (or with full=True) starts a new delta round over a fresh
+    window and replaces the user's rows once every page has arrived.
+    """
+    uid = int(user_id)
+    token = OAuthToken.get_for_user(uid, "outlook")
+    if not token:
+        raise CalendarSyncError("No valid Outlook token", 400)
+    access = ensure_token(token)
+    if not access:
+        raise CalendarSyncError("Failed to refresh Outlook access token. Please reconnect your account.", 401)
+
+    with _user_lock(uid):
+        now = datetime.utcnow()
+        state = db.session.get(CalendarSyncState, uid)
+        if state is None or not state.delta_link or state.window_end < now + timedelta(days=READ_MAX_DAYS):
+            full = True
+        try:
+            try:
+                return _run_delta(uid, token, access, state, full, now)
+            except requests.RequestException as e:
+                raise CalendarSyncError(f"Network error when calling Microsoft Graph API: {e}", 502)
+        except CalendarSyncError as e:
+            db.session.rollback()
+            if e.status_code == 410 and not full:
+                # deltaLink expired: start over with a full round
+                return _run_delta(uid, token, access, db.session.get(CalendarSyncState, uid), True, now)
+            state = db.session.get(CalendarSyncState, uid)
+            if state is not None:
+                state.last_error = str(e)[:255]
+                db.session.commit()
+            raise
+
+
+def _run_delta(uid: int, token: OAuthToken, access: str, state: CalendarSyncState | None, full: bool, now: datetime) -> Dict[str, Any]:
+    if full:
+        window_start = now - timedelta(days=SYNC_PAST_DAYS)
+        window_end = now + timedelta(days=SYNC_AHEAD_DAYS)
+        url = f"{GRAPH_BASE}/me/calendarView/delta"
+        params = {
+            "startDateTime": window_start.isoformat() + "Z",
+            "endDateTime": window_end.isoformat() + "Z",
+        }
+    else:
+        window_start, window_end = state.window_start, state.window_end
+        url, params = state.delta_link, None
+
+    upserts: Dict[str, Dict[str, Any]] = {}
+    removed: set[str] = set()
+    cursor: Dict[str, str] = {}
+
+    def pages():
+        for page in graph_pages(url, params, access, token):
+            if page.get("@odata.deltaLink"):
+                cursor["delta_link"] = page["@odata.deltaLink"]
+            yield page
+
+    for graph_id, row in iter_event_rows(uid, pages(), now):
+        if row is None:
+            removed.add(graph_id)
+            upserts.pop(graph_id, None)
+        else:
+            upserts[graph_id] = row
+            removed.discard(graph_id)
+    delta_link = cursor.get("delta_link")
+
+    # every page is in: apply in one transaction
+    if full:
+        CalendarEvent.query.filter_by(user_id=uid).delete()
+    else:
+        ids = list(removed | set(upserts))
+        for i in range(0, len(ids), 500):
+            CalendarEvent.query.filter(CalendarEvent.user_id == uid, CalendarEvent.graph_id.in_(ids[i:i + 500])).delete(synchronize_session=False)
+    if upserts:
+        db.session.execute(CalendarEvent.__table__.insert(), list(upserts.values()))
+
+    if state is None:
+        state = CalendarSyncState(user_id=uid, window_start=window_start, window_end=window_end)
+        db.session.add(state)
+    state.delta_link = delta_link
+    state.window_start, state.window_end = window_start, window_end
+    state.last_synced_at = now
+    state.last_error = None
+    if full:
+        state.last_full_sync_at = now
+    db.session.commit()
+    return {"mode": "full" if full else "delta", "upserted": len(upserts), "removed": len(removed)}
+
+
+def _live_events(user_id: int, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Read [start, end) straight from calendarView, paged and projected; for ranges the store does not cover."""
     token = OAuthToken.get_for_user(user_id, "outlook")
-    if not token or not token.access_token:
-        return {"error": "No valid Outlook token"}
-        
-    # Get events from now until end_dt
-    start = datetime.utcnow()
-    end = end_dt or (start + timedelta(days=7))
-    
-    url = f"{GRAPH_BASE}/me/calendar/events"
+    access = ensure_token(token) if token else None
+    if not access:
+        raise CalendarSyncError("Failed to refresh Outlook access token. Please reconnect your account.", 401)
     params = {
-        "$select": "id,subject,start,end,webLink,status,location,bodyPreview,isAllDay",
-        "$filter": f"start/dateTime ge '{start.isoformat()}Z' and end/dateTime le '{end.isoformat()}Z'",
+        "startDateTime": start.isoformat() + "Z",
+        "endDateTime": end.isoformat() + "Z",
+        "$select": EVENT_SELECT,
         "$orderby": "start/dateTime",
-        "$top": 50,  # Limit results
     }
-    headers = {"Authorization": f"Bearer {token.access_token}"}
-    
     try:
-        resp = requests.get(url, params=params, headers=headers, timeout=10)
-        if resp.status_code != 200:
-            return {"error": f"Graph API error: {resp.status_code}"}
-            
-        data = resp.json()
-        events = []
-        
-        for evt in data.get("value", []):
-            events.append({
-                "id": evt["id"],
-                "title": evt["subject"],
-                "start_time": evt["start"]["dateTime"],
-                "end_time": evt["end"]["dateTime"],
-                "status": evt.get("showAs", "busy"),
-                "html_link": evt.get("webLink"),
-                "location": evt.get("location", {}).get("displayName", ""),
-                "description": evt.get("bodyPreview", ""),
-                "is_all_day": evt.get("isAllDay", False),
-            })
-        
+        rows = iter_event_rows(user_id, graph_pages(f"{GRAPH_BASE}/me/calendarView", params, access, token), datetime.utcnow())
+        return [CalendarEvent(**row).to_dict() for _graph_id, row in rows if row is not None]
+    except requests.RequestException as e:
+        raise CalendarSyncError(f"Network error when calling Microsoft Graph API: {e}", 502)
+
+
+def _sync_in_background(app, user_id: int) -> None:
+    try:
+        with app.app_context():
+            sync_calendar_events(user_id)
+    except Exception as e:
+        print(f"Background calendar sync failed for user {user_id}: {e}")
+    finally:
+        with _sync_locks_guard:
+            _inflight.discard(user_id)
+
+
+def refresh_calendar_async(user_id: int) -> bool:
+    """Queue a delta sync for this user unless one is already queued/running."""
+    uid = int(user_id)
+    with _sync_locks_guard:
+        if uid in _inflight:
+            return False
+        _inflight.add(uid)
+    _sync_pool.submit(_sync_in_background, current_app._get_current_object(), uid)
+    return True
+
+
+def calendar_events(user_id: int, start: datetime, end: datetime, max_age_seconds: int | None = None,
+                    refresh: bool = False) -> tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Events overlapping [start, end) from the local store, plus sync metadata.
+
+    The very first read (nothing stored yet) and refresh=True sync inline; otherwise
+    a store older than max_age_seconds is refreshed in the background. If an inline
+    sync fails after an earlier success, the stored events are returned with stale=True.
+    """
+    uid = int(user_id)
+    start, end = _naive_utc(start), _naive_utc(end)
+    max_age = SYNC_MAX_AGE_SECONDS if max_age_seconds is None else max_age_seconds
+    state = db.session.get(CalendarSyncState, uid)
+    meta: Dict[str, Any] = {"stale": False}
+
+    if state is None or state.last_synced_at is None or refresh:
+        try:
+            sync_calendar_events(uid)
+        except CalendarSyncError as e:
+            if state is None or state.last_synced_at is None:
+                raise
+            meta.update(stale=True, sync_error=str(e))
+        state = db.session.get(CalendarSyncState, uid)
+    elif datetime.utcnow() - state.last_synced_at > timedelta(seconds=max_age):
+        refresh_calendar_async(uid)
+        meta["stale"] = True
+
+    rows = (
+        CalendarEvent.query
+        .filter(CalendarEvent.user_id == uid, CalendarEvent.end_at > start, CalendarEvent.start_at < end)
+        .order_by(CalendarEvent.start_at.asc())
+        .all()
+    )
+    events = [r.to_dict() for r in rows]
+    meta["synced_at"] = state.last_synced_at.isoformat() if state and state.last_synced_at else None
+
+    # parts of the range outside the synced window are read live instead of silently dropped
+    outside = []
+    if state is not None and start < state.window_start:
+        outside.append((start, min(end, state.window_start)))
+    if state is not None and end > state.window_end:
+        outside.append((max(start, state.window_end), end))
+    if outside:
+        seen = {e["id"] for e in events}
+        try:
+            for lo, hi in outside:
+                events += [e for e in _live_events(uid, lo, hi) if e["id"] not in seen]
+        except CalendarSyncError as e:
+            meta.update(stale=True, sync_error=str(e))
+        events.sort(key=lambda e: e["start_time"])
+    return events, meta
+
+
+def sync_calendar(user_id: int, end_dt: datetime | None = None) -> List[Dict[str, Any]]:
+    """Return upcoming events for user up to end_dt (from the local store)."""
+    start = datetime.utcnow()
+    end = end_dt or (start + timedelta(days=7))
+    try:
+        events, _meta = calendar_events(user_id, start, end)
         return events
+    except CalendarSyncError as e:
+        return {"error": str(e)}
     except Exception as e:
         return {"error": str(e)}
 
@@ -133,13 +379,13 @@ def create_calendar_event(user_id: int, title: str, start_time: str, end_time: s
     }
     
     try:
-        r = requests.post(url, json=event_data, headers=headers, timeout=20)
+        r = transport.post(url, json=event_data, headers=headers, timeout=20)
         if r.status_code == 401:
-            access_token = ensure_token(token)
+            access_token = ensure_token(token, rejected=access_token)
             if not access_token:
                 return {"error": "Failed to refresh token after 401"}
             headers["Authorization"] = f"Bearer {access_token}"
-            r = requests.post(url, json=event_data, headers=headers, timeout=20)
+            r = transport.post(url, json=event_data, headers=headers, timeout=20)
         
         if r.status_code not in [200, 201]:
             error_msg = f"Graph API error: {r.status_code}"
@@ -152,6 +398,7 @@ def create_calendar_event(user_id: int, title: str, start_time: str, end_time: s
             return {"error": error_msg}
 
         created_event = r.json()
+        store_event(user_id, created_event)
         return {
             "id": created_event.get("id"),
             "title": created_event.get("subject"),
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import os
+import time
+from typing import Any, Dict, List
+
+import requests
+
+from app.models.oauth_token import OAuthToken
+from app.services.http_transport import transport, RETRY_STATUSES, retry_after_seconds
+from app.services.outlook_token import ensure_token
+
+GRAPH_BASE = "https://graph.microsoft.com/v1.0"
+BATCH_MAX = 20  # Graph JSON batching limit per $batch request
+# Longest Retry-After a throttled sub-request is waited for in-call; a longer one is
+# returned as the final answer and the caller retries later (the outbox with its backoff)
+RETRY_AFTER_MAX = float(os.getenv("GRAPH_BATCH_RETRY_AFTER_MAX_SECONDS", "60"))
+
+
+def graph_batch(user_id: int, ops: List[Dict[str, Any]], max_rounds: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Run Graph requests through JSON $batch, BATCH_MAX per call.
+
+    `ops` are $batch sub-requests without headers, e.g.
+    {"id": "c12", "method": "POST", "url": "/me/events", "body": {...}}; ids must be unique.
+    Returns {id: {"status": int, "body": dict | None}}. Sub-requests answered with
+    429/5xx are resent (only those) for up to `max_rounds` more rounds, after the largest
+    Retry-After they carried (up to RETRY_AFTER_MAX) or a jittered backoff. If a $batch call itself fails, nothing
+    more is sent: what earlier calls did is still returned, and every sub-request left
+    without an answer gets status 0 and the error, so callers can record partial progress.
+    Raises only when there is no usable token, i.e. before anything was sent.
+    """
+    token = OAuthToken.get_for_user(user_id, "outlook")
+    if not token:
+        raise Exception("No valid Outlook token")
+    access_token = ensure_token(token)
+    if not access_token:
+        raise Exception("Failed to refresh token")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    by_id = {op["id"]: op for op in ops}
+    pending = list(ops)
+    for attempt in range(max_rounds + 1):
+        retry: List[Dict[str, Any]] = []
+        delay = 0.0
+        for i in range(0, len(pending), BATCH_MAX):
+            chunk = pending[i:i + BATCH_MAX]
+            try:
+                responses, access_token = _post_batch(token, access_token, chunk)
+            except Exception as e:
+                print(f"graph batch: $batch call failed, {len(pending) - i + len(retry)} of {len(ops)} sub-requests not sent: {e}")
+                for op in pending[i:] + retry:
+                    results[op["id"]] = {"status": 0, "body": {"error": {"message": str(e)}}}
+                return results
+            for resp in responses:
+                status = int(resp.get("status", 0))
+                wait = retry_after_seconds(resp.get("headers")) if status in RETRY_STATUSES else None
+                if status in RETRY_STATUSES and attempt < max_rounds and (wait is None or wait <= RETRY_AFTER_MAX):
+                    retry.append(by_id[resp["id"]])
+                    delay = max(delay, transport.backoff(attempt) if wait is None else wait)
+                else:
+                    results[resp["id"]] = {"status": status, "body": resp.get("body")}
+        if not retry:
+            break
+        print(f"graph batch: retrying {len(retry)} of {len(ops)} sub-requests in {delay:.2f}s")
+        time.sleep(delay)
+        pending = retry
+    return results
+
+
+def _post_batch(token: OAuthToken, access_token: str, chunk: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], str]:
+    payload = {"requests": [
+        {**op, "headers": {"Content-Type": "application/json"}} if "body" in op else op
+        for op in chunk
+    ]}
+    url = f"{GRAPH_BASE}/$batch"
+    headers = {
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }
+
+    try:
+        r = transport.post(url, json=payload, headers=headers, timeout=30)
+        if r.status_code == 401:
+            access_token = ensure_token(token, rejected=access_token)
+            if not access_token:
+                raise Exception("Failed to refresh token after 401")
+            headers["Authorization"] = f"Bearer {access_token}"
+            r = transport.post(url, json=payload, headers=headers, timeout=30)
+
+        if r.status_code != 200:
+            error_msg = f"Graph API error: {r.status_code}"
+            try:
+                error_data = r.json()
+                if "error" in error_data:
+                    error_msg = f"Graph API error: {error_data['error'].get('message', 'Unknown error')}"
+            except:
+                pass
+            raise Exception(error_msg)
+
+        return r.json().get("responses", []), access_token
+
+    except requests.exceptions.RequestException as e:
+        raise Exception(f"Network error when calling Microsoft Graph API: {str(e)}")
@@ -0,0 +1,254 @@
+from __future__ import annotations
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Shared outbound HTTP for Microsoft Graph / login.microsoftonline.com / Notion.
+#
+# One requests.Session per host keeps TLS connections alive between calls. Idempotent
+# verbs are retried on connection errors and 429/5xx with full-jitter exponential
+# backoff; any verb is retried on 429/503 when the server sends Retry-After (the
+# request was not processed). Per-host latency is kept for `transport.stats()`.
+# AsyncHttpTransport applies the same policy on httpx.AsyncClient for asyncio callers.
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+LATENCY_SAMPLES = 200
+
+
+def retry_after_seconds(headers) -> float | None:
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP date), or None."""
+    value = (headers or {}).get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class HostStats:
+    """Thread-safe per-host request/error/retry counters and recent latency samples."""
+
+    def __init__(self):
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, host: str, elapsed_ms: float, ok: bool, retried: bool) -> None:
+        with self._lock:
+            st = self._stats.setdefault(host, {
+                "requests": 0, "errors": 0, "retries": 0, "samples": deque(maxlen=LATENCY_SAMPLES),
+            })
+            st["requests"] += 1
+            st["errors"] += 0 if ok else 1
+            st["retries"] += 1 if retried else 0
+            st["samples"].append(elapsed_ms)
+
+    def snapshot(self) -> Dict[str, dict]:
+        out = {}
+        with self._lock:
+            for host, st in self._stats.items():
+                samples = sorted(st["samples"])
+                n = len(samples)
+                out[host] = {
+                    "requests": st["requests"],
+                    "errors": st["errors"],
+                    "retries": st["retries"],
+                    "avg_ms": round(sum(samples) / n, 1) if n else 0.0,
+                    "p50_ms": round(samples[n // 2], 1) if n else 0.0,
+                    "p95_ms": round(samples[min(n - 1, int(n * 0.95))], 1) if n else 0.0,
+                    "max_ms": round(samples[-1], 1) if n else 0.0,
+                }
+        return out
+
+
+host_stats = HostStats()
+
+
+class _RetryPolicy:
+    def __init__(self, max_retries: int | None = None, backoff_base: float | None = None,
+                 backoff_max: float | None = None):
+        self.max_retries = int(os.getenv("HTTP_MAX_RETRIES", "3")) if max_retries is None else max_retries
+        self.backoff_base = float(os.getenv("HTTP_BACKOFF_BASE", "0.5")) if backoff_base is None else backoff_base
+        self.backoff_max = float(os.getenv("HTTP_BACKOFF_MAX", "8")) if backoff_max is None else backoff_max
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number `attempt` (0-based)."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, method: str, resp, attempt: int) -> float | None:
+        """Seconds to sleep before the next attempt, or None to stop. `resp` is None on a connection error."""
+        if attempt >= self.max_retries:
+            return None
+        idempotent = method in IDEMPOTENT_METHODS
+        if resp is None:
+            return self.backoff(attempt) if idempotent else None
+        if resp.status_code not in RETRY_STATUSES:
+            return None
+        retry_after = retry_after_seconds(resp.headers) if resp.status_code in (429, 503) else None
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max) + random.uniform(0, self.backoff_base)
+        return self.backoff(attempt) if idempotent else None
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-host request/error/retry counts and latency (ms) over the last LATENCY_SAMPLES attempts."""
+        return host_stats.snapshot()
+
+
+class HttpTransport(_RetryPolicy):
+    """Per-host pooled sessions with retry/backoff and latency bookkeeping.
+
+    Mirrors the `requests.get/post/...` call shape so call sites only swap the module.
+    """
+
+    def __init__(self, max_retries: int | None = None, backoff_base: float | None = None,
+                 backoff_max: float | None = None, pool_maxsize: int | None = None):
+        super().__init__(max_retries, backoff_base, backoff_max)
+        self.pool_maxsize = int(os.getenv("HTTP_POOL_MAXSIZE", "10")) if pool_maxsize is None else pool_maxsize
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    # ---- sessions ----
+    def session_for(self, url: str) -> requests.Session:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            s = self._sessions.get(key)
+            if s is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                s.mount(f"{parts.scheme}://", adapter)
+                self._sessions[key] = s
+            return s
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for s in sessions:
+            s.close()
+
+    # ---- requests API ----
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        method = method.upper()
+        kwargs.setdefault("timeout", 20)
+        session = self.session_for(url)
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                resp = session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                host_stats.record(host, (time.perf_counter() - started) * 1000, False, attempt > 0)
+                delay = self._should_retry(method, None, attempt)
+                if delay is None:
+                    raise
+                print(f"http: {method} {host} failed ({e.__class__.__name__}), retry {attempt + 1} in {delay:.2f}s")
+            else:
+                host_stats.record(host, (time.perf_counter() - started) * 1000, resp.status_code < 500, attempt > 0)
+                delay = self._should_retry(method, resp, attempt)
+                if delay is None:
+                    return resp
+                print(f"http: {method} {host} -> {resp.status_code}, retry {attempt + 1} in {delay:.2f}s")
+                resp.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def patch(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def put(self, url: str, **kwargs) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", url, **kwargs)
+
+
+transport = HttpTransport()
+
+
+class AsyncHttpTransport(_RetryPolicy):
+    """asyncio twin of HttpTransport on httpx.AsyncClient.
+
+    An AsyncClient belongs to one event loop, so use one instance per loop/turn
+    (`async with AsyncHttpTransport() as http:`); its pool is shared by every call
+    made inside. Latency goes to the same per-host stats as `transport`.
+    """
+
+    def __init__(self, max_retries: int | None = None, backoff_base: float | None = None,
+                 backoff_max: float | None = None, pool_maxsize: int | None = None):
+        super().__init__(max_retries, backoff_base, backoff_max)
+        pool_maxsize = int(os.getenv("HTTP_POOL_MAXSIZE", "10")) if pool_maxsize is None else pool_maxsize
+        self._client = httpx.AsyncClient(limits=httpx.Limits(max_keepalive_connections=pool_maxsize))
+
+    async def __aenter__(self) -> "AsyncHttpTransport":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        method = method.upper()
+        kwargs.setdefault("timeout", 20)
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                resp = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                host_stats.record(host, (time.perf_counter() - started) * 1000, False, attempt > 0)
+                delay = self._should_retry(method, None, attempt)
+                if delay is None:
+                    raise
+                print(f"http: {method} {host} failed ({e.__class__.__name__}), retry {attempt + 1} in {delay:.2f}s")
+            else:
+                host_stats.record(host, (time.perf_counter() - started) * 1000, resp.status_code < 500, attempt > 0)
+                delay = self._should_retry(method, resp, attempt)
+                if delay is None:
+                    return resp
+                print(f"http: {method} {host} -> {resp.status_code}, retry {attempt + 1} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("DELETE", url, **kwargs)
@@ -1,8 +1,105 @@
+import atexit
+import threading
+import time
+from datetime import datetime
+
 from app.extensions import db
 from app.models.usage_log import UsageLog
+from app.services.rollup import bump_daily_rollup
+from app.services.totals import invalidate_user_totals
 
 from flask_jwt_extended import get_jwt_identity
 
+
+class UsageEventBuffer:
+    """In-process buffer for UsageLog rows.
+
+    log_event() only appends to a list; a daemon thread writes the batch with one
+    multi-row INSERT once it reaches `max_size` rows or the oldest row is
+    `max_age_seconds` old. Pending rows are flushed at interpreter exit.
+    """
+
+    def __init__(self, max_size: int = 50, max_age_seconds: float = 2.0):
+        self.max_size = max_size
+        self.max_age_seconds = max_age_seconds
+        self.sync = False
+        self._app = None
+        self._rows: list[dict] = []
+        self._oldest: float | None = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._atexit_registered = False
+
+    def init_app(self, app) -> None:
+        self._app = app
+        self.max_size = app.config.get("USAGE_LOG_FLUSH_SIZE", self.max_size)
+        self.max_age_seconds = app.config.get("USAGE_LOG_FLUSH_SECONDS", self.max_age_seconds)
+        self.sync = app.config.get("USAGE_LOG_SYNC", False)
+        if not self._atexit_registered:
+            atexit.register(self.flush)
+            self._atexit_registered = True
+
+    def add(self, row: dict) -> None:
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_size
+        self._ensure_worker()
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        """Write all buffered rows in one INSERT; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+                self._oldest = None
+            if not rows or self._app is None:
+                return 0
+            try:
+                with self._app.app_context():
+                    with db.engine.begin() as conn:
+                        conn.execute(UsageLog.__table__.insert(), rows)
+                        bump_daily_rollup(conn, rows)
+                invalidate_user_totals({r["user_id"] for r in rows})
+            except Exception as e:
+                # analytics are best-effort; never let a failed batch break the worker
+                print(f"UsageEventBuffer: dropped {len(rows)} events: {e}")
+                return 0
+            return len(rows)
+
+    def _ensure_worker(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="usage-log-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(timeout=self.max_age_seconds)
+            self._wake.clear()
+            with self._lock:
+                due = bool(self._rows) and (
+                    len(self._rows) >= self.max_size
+                    or time.monotonic() - (self._oldest or 0) >= self.max_age_seconds
+                )
+            if due:
+                self.flush()
+
+
+usage_buffer = UsageEventBuffer()
+
+
 def log_event(event_type: str, metadata: dict | None = None):
     try:
         uid = get_jwt_identity()
@@ -10,6 +107,17 @@ def log_event(event_type: str, metadata: dict | None = None):
         uid = None
     if not uid:
         return
-    log = UsageLog(user_id=uid, event_type=event_type, event_metadata=metadata or {})
-    db.session.add(log)
-    db.session.commit()
+    if usage_buffer.sync or usage_buffer._app is None:
+        # synchronous mode (tests / scripts): one row, one commit
+        log = UsageLog(user_id=uid, event_type=event_type, event_metadata=metadata or {}, created_at=datetime.utcnow())
+        db.session.add(log)
+        bump_daily_rollup(db.session, [{"user_id": uid, "event_type": event_type, "created_at": log.created_at}])
+        db.session.commit()
+        invalidate_user_totals(int(uid))
+        return
+    usage_buffer.add({
+        "user_id": int(uid),
+        "event_type": event_type,
+        "event_metadata": metadata or {},
+        "created_at": datetime.utcnow(),
+    })
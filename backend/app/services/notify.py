@@ -2,6 +2,8 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Optional
 
+from sqlalchemy.exc import IntegrityError
+
 from app.extensions import db
 from app.models.notification import Notification
 from app.models.task import Task
@@ -28,7 +30,12 @@ def create_notification(*, user_id: int, kind: str, title: str, body: str = "",
         delivered_at=datetime.utcnow(),
     )
     db.session.add(n)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # lost a race on uq_notification_user_unique_key; return the row that won
+        db.session.rollback()
+        return db.session.query(Notification).filter_by(user_id=user_id, unique_key=unique_key).first()
     return n
 
 
@@ -1,4 +1,4 @@
-import requests
+from app.services.http_transport import transport
 from typing import List
 
 NOTION_API = "https://api.notion.com/v1"
@@ -21,7 +21,7 @@ class NotionClient:
 
     def whoami(self) -> dict:
         # Notion doesn't have a perfect whoami for bots; we probe via search
-        r = requests.post(f"{NOTION_API}/search", headers=self.h, json={"page_size": 1}, timeout=10)
+        r = transport.post(f"{NOTION_API}/search", headers=self.h, json={"page_size": 1}, timeout=10)
         if r.status_code in (401, 403):
             raise NotionAuthError("Invalid Notion token")
         if not r.ok:
@@ -36,7 +36,7 @@ class NotionClient:
             "page_size": max(1, min(limit, 20)),
             "sort": {"direction": "descending", "timestamp": "last_edited_time"},
         }
-        r = requests.post(f"{NOTION_API}/search", headers=self.h, json=payload, timeout=15)
+        r = transport.post(f"{NOTION_API}/search", headers=self.h, json=payload, timeout=15)
         if r.status_code in (401, 403):
             raise NotionAuthError("Invalid Notion token")
         if not r.ok:
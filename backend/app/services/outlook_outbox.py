@@ -0,0 +1,229 @@
+from __future__ import annotations
+import atexit
+import os
+import random
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import select, update
+
+from app.extensions import db
+from app.models.oauth_token import OAuthToken
+from app.models.outlook_outbox import OutlookOutbox
+from app.models.task import Task
+from app.services.outlook_tasks import sync_task_events, task_payload_unchanged, count_task_sync
+
+
+def enqueue_task_sync(t: Task, op: str = "upsert") -> OutlookOutbox | None:
+    """Stage an outbox row for this task on the current session; the caller's commit writes both.
+
+    Needs t.id, so flush a new task first. Skips changes that cannot touch Outlook, and
+    edits that leave the event payload as last sent (e.g. a status toggle).
+    """
+    if op == "upsert" and not t.due_at and not t.outlook_event_id:
+        return None
+    if op == "upsert" and task_payload_unchanged(t):
+        count_task_sync(skipped=1)
+        return None
+    if op == "delete" and not t.outlook_event_id:
+        return None
+    row = OutlookOutbox(
+        user_id=int(t.user_id),
+        task_id=t.id,
+        op=op,
+        event_id=t.outlook_event_id if op == "delete" else None,
+    )
+    db.session.add(row)
+    return row
+
+
+class OutlookOutboxWorker:
+    """Drains outlook_outbox on a daemon thread.
+
+    Routes stage a row next to the task change and call kick() after commit; the thread
+    also wakes every `poll_seconds` for retries. All due rows of one task become a single
+    Graph change built from the task's current state, so a burst of edits costs one
+    operation, and one user's changes go out together through $batch. A failed change is
+    retried with jittered exponential backoff and marked dead after `max_attempts`.
+
+    Several drainers can share the table (dev reloader, server workers, `flask
+    drain-outlook-outbox`): each one first claims its rows with a single UPDATE that moves
+    them to "sending" for `lease_seconds`, and skips tasks another drainer holds. Rows of
+    a drainer that died mid-send become claimable again when the lease runs out.
+    """
+
+    def __init__(self, poll_seconds: float = 5.0, max_attempts: int = 8,
+                 backoff_base: float = 2.0, backoff_max: float = 600.0, batch_size: int = 100,
+                 lease_seconds: float = 300.0):
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self._app = None
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = False
+        self._thread: threading.Thread | None = None
+        self._atexit_registered = False
+
+    def init_app(self, app) -> None:
+        self._app = app
+        self.poll_seconds = app.config.get("OUTLOOK_OUTBOX_POLL_SECONDS", self.poll_seconds)
+        self.max_attempts = app.config.get("OUTLOOK_OUTBOX_MAX_ATTEMPTS", self.max_attempts)
+        self.backoff_base = app.config.get("OUTLOOK_OUTBOX_BACKOFF_BASE", self.backoff_base)
+        self.backoff_max = app.config.get("OUTLOOK_OUTBOX_BACKOFF_MAX", self.backoff_max)
+        self.lease_seconds = app.config.get("OUTLOOK_OUTBOX_LEASE_SECONDS", self.lease_seconds)
+        if not self._atexit_registered:
+            atexit.register(self._shutdown)
+            self._atexit_registered = True
+        # The thread starts with the first request of a serving process, so CLI commands,
+        # the dev reloader's watcher process and a pre-fork master never run one; rows left
+        # pending by a restart go out then. The reloader's serving child starts it right away.
+        app.before_request(self._ensure_worker)
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            self._ensure_worker()
+
+    def kick(self) -> None:
+        """Wake the worker (starting it if needed) after committing outbox rows."""
+        if self._app is None:
+            return
+        self._ensure_worker()
+        self._wake.set()
+
+    def _backoff(self, attempts: int) -> timedelta:
+        seconds = min(self.backoff_max, self.backoff_base * (2 ** (attempts - 1)))
+        return timedelta(seconds=random.uniform(seconds / 2, seconds))
+
+    def drain(self) -> Dict[str, int]:
+        """Send every due change; returns counts of sent / coalesced / skipped / failed / dead / dropped."""
+        out = {"sent": 0, "coalesced": 0, "skipped": 0, "failed": 0, "dead": 0, "dropped": 0}
+        with self._drain_lock, self._app.app_context():
+            while True:
+                rows, more = self._claim()
+                by_user: "OrderedDict[int, OrderedDict[int, List[OutlookOutbox]]]" = OrderedDict()
+                for r in rows:
+                    by_user.setdefault(r.user_id, OrderedDict()).setdefault(r.task_id, []).append(r)
+                for uid, groups in by_user.items():
+                    self._send_user(uid, groups, out)
+                if not more:
+                    return out
+
+    def _claim(self) -> tuple[List[OutlookOutbox], bool]:
+        """Take up to batch_size due rows for this drainer; returns (rows, more may be due).
+
+        A "sending" row whose lease has run out counts as due. Tasks with a row under a live
+        lease are skipped, so two drainers never send the same task at once. The UPDATE
+        re-checks each row, and only the rows it actually moved are returned.
+        """
+        tbl = OutlookOutbox.__table__
+        now = datetime.utcnow()
+        is_due = (tbl.c.status.in_(("pending", "sending")), tbl.c.next_attempt_at <= now)
+        in_flight = select(tbl.c.task_id).where(tbl.c.status == "sending", tbl.c.next_attempt_at > now)
+        ids = db.session.execute(
+            select(tbl.c.id)
+            .where(*is_due, tbl.c.task_id.not_in(in_flight))
+            .order_by(tbl.c.id.asc())
+            .limit(self.batch_size)
+        ).scalars().all()
+        if not ids:
+            return [], False
+        claimed = db.session.execute(
+            update(tbl)
+            .where(tbl.c.id.in_(ids), *is_due)
+            .values(status="sending", next_attempt_at=now + timedelta(seconds=self.lease_seconds))
+            .returning(tbl.c.id)
+        ).scalars().all()
+        db.session.commit()
+        rows = OutlookOutbox.query.filter(OutlookOutbox.id.in_(claimed)).order_by(OutlookOutbox.id.asc()).all() if claimed else []
+        return rows, len(ids) == self.batch_size
+
+    def _send_user(self, uid: int, groups: Dict[int, List[OutlookOutbox]], out: Dict[str, int]) -> None:
+        if OAuthToken.get_for_user(uid, "outlook") is None:
+            # not connected (or disconnected since): nothing to mirror
+            for items in groups.values():
+                for r in items:
+                    db.session.delete(r)
+            db.session.commit()
+            out["dropped"] += sum(len(items) for items in groups.values())
+            return
+
+        tasks, stale = [], []
+        for task_id, items in groups.items():
+            t = db.session.get(Task, task_id)
+            if t is not None and t.user_id != uid:
+                t = None  # SQLite reuses ids: this is a newer task of another user
+            if t is not None:
+                tasks.append(t)
+            for event_id in dict.fromkeys(r.event_id for r in items if r.op == "delete" and r.event_id):
+                if t is None or event_id != t.outlook_event_id:
+                    stale.append((task_id, event_id))
+        try:
+            result = sync_task_events(uid, tasks, stale)
+            errors = result["errors"]
+            out["skipped"] += result["skipped"]
+        except Exception as e:
+            db.session.rollback()
+            errors = {task_id: str(e) for task_id in groups}
+
+        for task_id, items in groups.items():
+            if task_id in errors:
+                self._retry_later(task_id, items, errors[task_id], out)
+                continue
+            for r in items:
+                db.session.delete(r)
+            out["sent"] += 1
+            out["coalesced"] += len(items) - 1
+        db.session.commit()
+
+    def _retry_later(self, task_id: int, items: List[OutlookOutbox], error: str, out: Dict[str, int]) -> None:
+        attempts = max(r.attempts for r in items) + 1
+        retry_at = datetime.utcnow() + self._backoff(attempts)
+        dead = attempts >= self.max_attempts
+        for r in items:
+            r.attempts = attempts
+            r.last_error = str(error)[:255]
+            r.next_attempt_at = retry_at
+            r.status = "dead" if dead else "pending"
+        out["dead" if dead else "failed"] += 1
+        print(f"outlook outbox: task {task_id} attempt {attempts} failed: {error}")
+
+    def pending(self) -> int:
+        with self._app.app_context():
+            return OutlookOutbox.query.filter(OutlookOutbox.status.in_(("pending", "sending"))).count()
+
+    def _ensure_worker(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="outlook-outbox", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        last_error = None
+        while not self._stop:
+            try:
+                self.drain()
+                last_error = None
+            except Exception as e:
+                # keep the worker alive; rows stay pending and are retried on the next pass.
+                # Print a repeated failure once (e.g. the table is missing until `flask db upgrade`)
+                error = str(getattr(e, "orig", None) or e)  # DB errors: without the bound parameters
+                if error != last_error:
+                    print(f"outlook outbox: drain failed: {e}")
+                last_error = error
+            self._wake.wait(timeout=self.poll_seconds)
+            self._wake.clear()
+
+    def _shutdown(self) -> None:
+        self._stop = True
+        self._wake.set()
+
+
+outlook_outbox = OutlookOutboxWorker()
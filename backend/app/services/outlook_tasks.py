@@ -1,20 +1,24 @@
 # app/services/outlook_tasks.py
+import hashlib
+import json
 import os
+import threading
 from datetime import datetime, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, List
 import requests
+from sqlalchemy import or_
+from sqlalchemy.orm.exc import ObjectDeletedError, StaleDataError
 
+from app.extensions import db
 from app.models.task import Task
 from app.models.oauth_token import OAuthToken
+from app.services.http_transport import transport
+from app.services.calendar import store_event, forget_event
+from app.services.outlook_token import ensure_token
+from app.services.graph_batch import graph_batch
 
 GRAPH_BASE = "https://graph.microsoft.com/v1.0"
 
-def ensure_token(token: OAuthToken) -> str | None:
-    """Refresh token if needed and return access token."""
-    # Import the existing function from calendar service
-    from app.services.calendar import ensure_token as calendar_ensure_token
-    return calendar_ensure_token(token)
-
 def _iso(dt: datetime) -> str:
     if not dt.tzinfo:
         dt = dt.replace(tzinfo=timezone.utc)
@@ -35,6 +39,29 @@ def _event_payload_from_task(t: Task) -> Dict[str, Any]:
         "importance": "high" if t.priority == "high" else "normal",
     }
 
+def task_payload_hash(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def task_payload_unchanged(t: Task) -> bool:
+    """True if t's event exists and was last sent exactly the payload t would produce now."""
+    return bool(t.outlook_event_id and t.due_at and t.outlook_payload_hash
+                and t.outlook_payload_hash == task_payload_hash(_event_payload_from_task(t)))
+
+# process-wide counts of task -> Outlook event operations that Graph carried out, that
+# failed (error answer or never sent), and that were skipped as no-ops
+_sync_counts = {"sent": 0, "failed": 0, "skipped": 0}
+_sync_counts_lock = threading.Lock()
+
+def count_task_sync(sent: int = 0, skipped: int = 0, failed: int = 0) -> None:
+    with _sync_counts_lock:
+        _sync_counts["sent"] += sent
+        _sync_counts["failed"] += failed
+        _sync_counts["skipped"] += skipped
+
+def task_sync_stats() -> Dict[str, int]:
+    with _sync_counts_lock:
+        return dict(_sync_counts)
+
 def graph_create_event(user_id: int, payload: Dict[str, Any]) -> Optional[str]:
     """Create an event in Outlook calendar and return event ID."""
     token = OAuthToken.get_for_user(user_id, "outlook")
@@ -52,13 +79,13 @@ def graph_create_event(user_id: int, payload: Dict[str, Any]) -> Optional[str]:
     }
     
     try:
-        r = requests.post(url, json=payload, headers=headers, timeout=20)
+        r = transport.post(url, json=payload, headers=headers, timeout=20)
         if r.status_code == 401:
-            access_token = ensure_token(token)
+            access_token = ensure_token(token, rejected=access_token)
             if not access_token:
                 raise Exception("Failed to refresh token after 401")
             headers["Authorization"] = f"Bearer {access_token}"
-            r = requests.post(url, json=payload, headers=headers, timeout=20)
+            r = transport.post(url, json=payload, headers=headers, timeout=20)
         
         if r.status_code not in [200, 201]:
             error_msg = f"Graph API error: {r.status_code}"
@@ -71,6 +98,7 @@ def graph_create_event(user_id: int, payload: Dict[str, Any]) -> Optional[str]:
             raise Exception(error_msg)
 
         created_event = r.json()
+        store_event(user_id, created_event)
         return created_event.get("id")
         
     except requests.exceptions.RequestException as e:
@@ -93,13 +121,13 @@ def graph_update_event(user_id: int, event_id: str, payload: Dict[str, Any]) ->
     }
     
     try:
-        r = requests.patch(url, json=payload, headers=headers, timeout=20)
+        r = transport.patch(url, json=payload, headers=headers, timeout=20)
         if r.status_code == 401:
-            access_token = ensure_token(token)
+            access_token = ensure_token(token, rejected=access_token)
             if not access_token:
                 raise Exception("Failed to refresh token after 401")
             headers["Authorization"] = f"Bearer {access_token}"
-            r = requests.patch(url, json=payload, headers=headers, timeout=20)
+            r = transport.patch(url, json=payload, headers=headers, timeout=20)
         
         if r.status_code not in [200, 201]:
             error_msg = f"Graph API error: {r.status_code}"
@@ -110,6 +138,7 @@ def graph_update_event(user_id: int, event_id: str, payload: Dict[str, Any]) ->
             except:
                 pass
             raise Exception(error_msg)
+        store_event(user_id, r.json() if r.content else {})
             
     except requests.exceptions.RequestException as e:
         raise Exception(f"Network error when calling Microsoft Graph API: {str(e)}")
@@ -131,13 +160,13 @@ def graph_delete_event(user_id: int, event_id: str) -> None:
     }
     
     try:
-        r = requests.delete(url, headers=headers, timeout=20)
+        r = transport.delete(url, headers=headers, timeout=20)
         if r.status_code == 401:
-            access_token = ensure_token(token)
+            access_token = ensure_token(token, rejected=access_token)
             if not access_token:
                 raise Exception("Failed to refresh token after 401")
             headers["Authorization"] = f"Bearer {access_token}"
-            r = requests.delete(url, headers=headers, timeout=20)
+            r = transport.delete(url, headers=headers, timeout=20)
         
         if r.status_code not in [200, 204]:
             error_msg = f"Graph API error: {r.status_code}"
@@ -148,26 +177,131 @@ def graph_delete_event(user_id: int, event_id: str) -> None:
             except:
                 pass
             raise Exception(error_msg)
+        forget_event(user_id, event_id)
             
     except requests.exceptions.RequestException as e:
         raise Exception(f"Network error when calling Microsoft Graph API: {str(e)}")
 
-def ensure_task_event(user_id: int, t: Task) -> Optional[str]:
-    if not t.due_at:
-        return t.outlook_event_id
-    payload = _event_payload_from_task(t)
-    if t.outlook_event_id:
+def _batch_error(res: Dict[str, Any] | None) -> str:
+    if res is None:
+        return "Graph API error: no response in $batch"
+    body = res.get("body")
+    msg = (body.get("error") or {}).get("message") if isinstance(body, dict) else None
+    if not res["status"] and msg:
+        return msg  # the $batch call itself failed; msg is already the full error
+    return f"Graph API error: {msg or res['status']}"
+
+def _commit_event_id(t: Task, event_id: Optional[str], payload_hash: Optional[str]) -> bool:
+    """Save t.outlook_event_id and the hash of what was sent; False if the task was deleted in the meantime."""
+    try:
+        t.outlook_event_id = event_id
+        t.outlook_payload_hash = payload_hash
+        db.session.commit()
+        return True
+    except (StaleDataError, ObjectDeletedError):
+        db.session.rollback()
+        return False
+
+def sync_task_events(user_id: int, tasks: List[Task], stale: Iterable[tuple[int, str]] = (),
+                     force: bool = False) -> Dict[str, Any]:
+    """Bring each task's Outlook event in line with the task, 20 operations per Graph $batch call.
+
+    Due tasks get their event updated (recreated if it was removed in Outlook) or created;
+    undated tasks lose theirs; `stale` (task_id, event_id) pairs, events of deleted tasks,
+    are deleted. An update whose payload hash matches the one last sent is skipped unless
+    `force`. Event ids and payload hashes are committed per task. Returns created /
+    updated / deleted / skipped counts and {task_id: error} for the operations that failed.
+    """
+    out: Dict[str, Any] = {"created": 0, "updated": 0, "deleted": 0, "skipped": 0, "errors": {}}
+    by_id = {t.id: t for t in tasks}
+    # read before any commit (a token refresh commits too): each commit expires the tasks,
+    # and a task deleted meanwhile can't be reloaded
+    event_ids = {t.id: t.outlook_event_id for t in tasks}
+    payloads: Dict[int, Dict[str, Any]] = {}
+    hashes: Dict[int, str] = {}
+    owner: Dict[str, int] = {}
+    ops = []
+    for t in tasks:
+        if t.due_at:
+            payload = payloads[t.id] = _event_payload_from_task(t)
+            hashes[t.id] = task_payload_hash(payload)
+        if t.due_at and t.outlook_event_id:
+            if not force and t.outlook_payload_hash == hashes[t.id]:
+                out["skipped"] += 1
+                continue
+            ops.append({"id": f"u{t.id}", "method": "PATCH", "url": f"/me/events/{t.outlook_event_id}", "body": payload})
+        elif t.due_at:
+            ops.append({"id": f"c{t.id}", "method": "POST", "url": "/me/events", "body": payload})
+        elif t.outlook_event_id:
+            ops.append({"id": f"d{t.id}", "method": "DELETE", "url": f"/me/events/{t.outlook_event_id}"})
+    for i, (task_id, event_id) in enumerate(stale):
+        ops.append({"id": f"x{i}", "method": "DELETE", "url": f"/me/events/{event_id}"})
+        owner[f"x{i}"] = task_id
+    count_task_sync(skipped=out["skipped"])
+    if not ops:
+        return out
+
+    results = graph_batch(user_id, ops)
+    gone = [int(op["id"][1:]) for op in ops if op["id"][0] == "u" and (results.get(op["id"]) or {}).get("status") == 404]
+    if gone:
+        recreate = [{"id": f"c{task_id}", "method": "POST", "url": "/me/events", "body": payloads[task_id]} for task_id in gone]
         try:
-            graph_update_event(user_id, t.outlook_event_id, payload)
-            return t.outlook_event_id
-        except Exception:
-            pass
-    eid = graph_create_event(user_id, payload)
-    return eid
-
-def delete_task_event(user_id: int, t: Task) -> None:
-    if t.outlook_event_id:
+            results.update(graph_batch(user_id, recreate))
+        except Exception as e:
+            # the first round's results still get recorded below; only these tasks are retried
+            results.update({op["id"]: {"status": 0, "body": {"error": {"message": str(e)}}} for op in recreate})
+        ops += recreate
+
+    stored, forgotten, orphans = [], [], []
+    failed = 0
+    for op in ops:
+        kind, res = op["id"][0], results.get(op["id"])
+        status = (res or {}).get("status")
+        task_id = owner.get(op["id"]) or int(op["id"][1:])
+        if kind == "u" and status == 404:
+            continue  # recreated above
+        if kind == "u" and status == 200:
+            if _commit_event_id(by_id[task_id], event_ids[task_id], hashes[task_id]):
+                stored.append(res["body"])
+            out["updated"] += 1
+        elif kind == "c" and status in (200, 201):
+            eid = res["body"].get("id")
+            if _commit_event_id(by_id[task_id], eid, hashes[task_id]):
+                stored.append(res["body"])
+                out["created"] += 1
+            else:
+                orphans.append({"id": f"o{len(orphans)}", "method": "DELETE", "url": f"/me/events/{eid}"})
+        elif kind in "dx" and status in (200, 204, 404):
+            forgotten.append(op["url"].rsplit("/", 1)[-1])
+            if kind == "d":
+                _commit_event_id(by_id[task_id], None, None)
+            out["deleted"] += 1
+        else:
+            out["errors"][task_id] = _batch_error(res)
+            failed += 1
+    # by final status: a sub-request resent after 429/5xx counts once, a 404'd PATCH only as its recreate
+    count_task_sync(sent=out["created"] + out["updated"] + out["deleted"] + len(orphans), failed=failed)
+
+    if orphans:
+        # tasks deleted while their events were being created: don't leave the events behind
         try:
-            graph_delete_event(user_id, t.outlook_event_id)
-        except Exception:
-            pass
+            graph_batch(user_id, orphans)
+        except Exception as e:
+            print(f"outlook tasks: could not remove {len(orphans)} orphaned events: {e}")
+    for evt in stored:
+        store_event(user_id, evt)
+    for event_id in forgotten:
+        forget_event(user_id, event_id)
+    return out
+
+def resync_tasks_to_outlook(user_id: int) -> Dict[str, Any]:
+    """Push every task of the user to Outlook again (e.g. after reconnecting or a bulk import).
+
+    Ignores the stored payload hashes: the point is to overwrite whatever changed in Outlook.
+    """
+    tasks = Task.query.filter(
+        Task.user_id == int(user_id),
+        or_(Task.due_at.isnot(None), Task.outlook_event_id.isnot(None)),
+    ).all()
+    out = sync_task_events(int(user_id), tasks, force=True)
+    return {"tasks": len(tasks), **out, "failed": len(out["errors"])}
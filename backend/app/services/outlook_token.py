@@ -0,0 +1,138 @@
+from __future__ import annotations
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+from app.extensions import db
+from app.models.oauth_token import OAuthToken
+from app.services.http_transport import transport
+
+# The one place Outlook access tokens are read and refreshed.
+#
+# Access tokens are cached in-process per user. A token is refreshed once it is within
+# OUTLOOK_TOKEN_REFRESH_MARGIN_SECONDS of expiry, under a per-user lock, so concurrent
+# calendar reads, agent tools and task sync for one user trigger at most one POST to
+# login.microsoftonline.com. The refreshed token is written back to oauth_token through
+# the ORM. Before refreshing, the row is re-read, so a refresh done by another worker
+# process is picked up instead of repeated.
+
+TOKEN_URL = "https://login.microsoftonline.com/common/oauth2/v2.0/token"
+SCOPES = "offline_access Calendars.ReadWrite"
+
+
+def _aware(dt: datetime | None) -> datetime | None:
+    if dt is None:
+        return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class OutlookTokenManager:
+    def __init__(self, margin_seconds: int | None = None):
+        margin = int(os.getenv("OUTLOOK_TOKEN_REFRESH_MARGIN_SECONDS", "300")) if margin_seconds is None else margin_seconds
+        self.margin = timedelta(seconds=margin)
+        self._cache: Dict[int, Tuple[str, datetime]] = {}
+        self._locks: Dict[int, threading.Lock] = {}
+        self._guard = threading.Lock()
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def _lock(self, user_id: int) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(user_id, threading.Lock())
+
+    def _usable(self, access: str | None, expiry: datetime | None, rejected: str | None) -> bool:
+        return bool(access) and access != rejected and expiry is not None and expiry > datetime.now(timezone.utc) + self.margin
+
+    def access_token(self, user_id: int, rejected: str | None = None) -> str | None:
+        """A valid access token for the user, refreshing it if needed; None if not connected or refresh failed.
+
+        Pass the token Graph just answered 401 to as `rejected`: it is then refreshed even if
+        it looks unexpired, unless another caller already replaced it.
+        """
+        uid = int(user_id)
+        hit = self._cache.get(uid)
+        if hit and self._usable(hit[0], hit[1], rejected):
+            return hit[0]
+
+        with self._lock(uid):
+            hit = self._cache.get(uid)
+            if hit and self._usable(hit[0], hit[1], rejected):
+                return hit[0]
+
+            token = OAuthToken.query.filter_by(user_id=uid, provider="outlook").populate_existing().first()
+            if token is None:
+                self._cache.pop(uid, None)
+                return None
+            expiry = _aware(token.expiry)
+            if self._usable(token.access_token, expiry, rejected):
+                self._cache[uid] = (token.access_token, expiry)
+                return token.access_token
+            return self._refresh(token)
+
+    def _refresh(self, token: OAuthToken) -> str | None:
+        uid = token.user_id
+        self._cache.pop(uid, None)
+
+        client_id = os.getenv("OUTLOOK_CLIENT_ID")
+        client_secret = os.getenv("OUTLOOK_CLIENT_SECRET")
+        redirect_uri = os.getenv("OUTLOOK_REDIRECT_URI")
+
+        if not client_id or not client_secret or not redirect_uri:
+            print(f"Missing environment variables: CLIENT_ID={bool(client_id)}, CLIENT_SECRET={bool(client_secret)}, REDIRECT_URI={bool(redirect_uri)}")
+            return None
+
+        if not token.refresh_token:
+            print("Missing token or refresh_token")
+            return None
+
+        data = {
+            "client_id": client_id,
+            "client_secret": client_secret,
+            "grant_type": "refresh_token",
+            "refresh_token": token.refresh_token,
+            "scope": SCOPES,
+            "redirect_uri": redirect_uri,
+        }
+
+        self.refreshes += 1
+        try:
+            r = transport.post(TOKEN_URL, data=data, timeout=20)
+            if r.status_code != 200:
+                self.refresh_failures += 1
+                print(f"Token refresh failed with status {r.status_code}: {r.text}")
+                return None
+            j = r.json()
+            token.access_token = j.get("access_token")
+            token.refresh_token = j.get("refresh_token", token.refresh_token)
+            expires_in = int(j.get("expires_in", 0))
+            expiry = datetime.now(timezone.utc) + timedelta(seconds=expires_in)
+            token.expiry = expiry
+            access = token.access_token
+            db.session.commit()
+        except Exception as e:
+            self.refresh_failures += 1
+            db.session.rollback()
+            print(f"Exception during token refresh: {e}")
+            return None
+
+        self._cache[uid] = (access, expiry)
+        return access
+
+    def invalidate(self, user_id: int) -> None:
+        """Forget the cached token, e.g. after the user (re)connects Outlook."""
+        self._cache.pop(int(user_id), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"cached_users": len(self._cache), "refreshes": self.refreshes, "refresh_failures": self.refresh_failures}
+
+
+token_manager = OutlookTokenManager()
+
+
+def ensure_token(token: OAuthToken | None, rejected: str | None = None) -> str | None:
+    """Refresh token if needed and return access token."""
+    if token is None:
+        print("Missing token or refresh_token")
+        return None
+    return token_manager.access_token(token.user_id, rejected=rejected)
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict, List
+
+# Anthropic prompt caching helpers.
+#
+# The request prefix is cached in order tools -> system -> messages, so a breakpoint on
+# the last tool caches the tool schemas and one on the system block caches tools + system.
+# Prefixes shorter than the model's minimum (1024 tokens, 2048 on Haiku) are simply not
+# cached; the request still succeeds.
+
+PROMPT_CACHE_ENABLED = os.getenv("ANTHROPIC_PROMPT_CACHE", "true").lower() == "true"
+EPHEMERAL = {"type": "ephemeral"}
+
+USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+
+
+def system_blocks(text: str) -> List[Dict[str, Any]] | str:
+    """System prompt as a single text block with a cache breakpoint (plain string when caching is off)."""
+    if not PROMPT_CACHE_ENABLED:
+        return text
+    return [{"type": "text", "text": text, "cache_control": EPHEMERAL}]
+
+
+def cached_tools(tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of the tool schemas (name/description/input_schema only) with a breakpoint on the last one."""
+    out = [{"name": t["name"], "description": t["description"], "input_schema": t["input_schema"]} for t in tools]
+    if PROMPT_CACHE_ENABLED and out:
+        out[-1] = {**out[-1], "cache_control": EPHEMERAL}
+    return out
+
+
+def with_message_breakpoint(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copy of `messages` with a breakpoint on the last block, so the next step of a
+    multi-step tool turn reads the conversation so far from cache. Input is not mutated."""
+    if not PROMPT_CACHE_ENABLED or not messages:
+        return messages
+    last = messages[-1]
+    content = last.get("content")
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content}]
+    elif isinstance(content, list) and content:
+        blocks = [dict(b) if isinstance(b, dict) else b for b in content]
+    else:
+        return messages
+    if not isinstance(blocks[-1], dict):
+        return messages
+    blocks[-1] = {**blocks[-1], "cache_control": EPHEMERAL}
+    return [*messages[:-1], {**last, "content": blocks}]
+
+
+def usage_dict(usage: Any) -> Dict[str, int]:
+    """Normalize a Messages API `usage` (dict or SDK object) to ints for USAGE_FIELDS."""
+    if usage is None:
+        return {f: 0 for f in USAGE_FIELDS}
+    get = usage.get if isinstance(usage, dict) else (lambda k: getattr(usage, k, None))
+    return {f: int(get(f) or 0) for f in USAGE_FIELDS}
+
+
+# Per-process totals per source ("agent", "ai_chat", ...)
+_totals: Dict[str, Dict[str, float]] = {}
+_lock = threading.Lock()
+
+
+def record_llm_usage(source: str, usage: Any, elapsed_ms: float | None = None) -> Dict[str, int]:
+    """Log one call's token counts (incl. cache read/creation) and add them to the per-source totals."""
+    u = usage_dict(usage)
+    with _lock:
+        t = _totals.setdefault(source, {"calls": 0, "ms": 0.0, **{f: 0 for f in USAGE_FIELDS}})
+        t["calls"] += 1
+        t["ms"] += elapsed_ms or 0.0
+        for f in USAGE_FIELDS:
+            t[f] += u[f]
+    print(
+        f"llm[{source}] in={u['input_tokens']} cache_read={u['cache_read_input_tokens']} "
+        f"cache_write={u['cache_creation_input_tokens']} out={u['output_tokens']}"
+        + (f" {elapsed_ms:.0f}ms" if elapsed_ms is not None else "")
+    )
+    return u
+
+
+def llm_usage_totals() -> Dict[str, Dict[str, float]]:
+    """Totals per source plus the share of prompt tokens served from cache."""
+    with _lock:
+        out = {k: dict(v) for k, v in _totals.items()}
+    for t in out.values():
+        prompt = t["input_tokens"] + t["cache_read_input_tokens"] + t["cache_creation_input_tokens"]
+        t["cache_hit_ratio"] = round(t["cache_read_input_tokens"] / prompt, 3) if prompt else 0.0
+        t["avg_ms"] = round(t["ms"] / t["calls"], 1) if t["calls"] else 0.0
+    return out
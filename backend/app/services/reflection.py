@@ -1,14 +1,19 @@
 from __future__ import annotations
 import os
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 
 import requests
-from sqlalchemy import func
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
 
 from app.extensions import db
-from app.models.usage_log import UsageLog
+from app.models.reflection import WeeklyReflection
+from app.services.streaks import journal_streaks
+from app.services.totals import event_totals
 from app.models.journal import JournalEntry  # adjust import if your model path differs
 from app.models.notion import NotionNoteCache  # optional: to surface recent note titles
 
@@ -30,14 +35,8 @@ class ReflectionConfig:
 
 
 def _weekly_usage_totals(user_id: int, since: datetime) -> Dict[str, int]:
-    # Tally by event_type from UsageLog
-    rows = (
-        db.session.query(UsageLog.event_type, func.count(UsageLog.id))
-        .filter(UsageLog.user_id == user_id, UsageLog.created_at >= since)
-        .group_by(UsageLog.event_type)
-        .all()
-    )
-    out = {k: int(v) for k, v in rows}
+    # Tally by event_type (one grouped rollup query, shared with the dashboard cache)
+    out = event_totals(user_id, since)
     # Normalize expected keys
     for key in ("journal_create", "chat_query", "calendar_sync", "notes_sync"):
         out.setdefault(key, 0)
@@ -132,16 +131,19 @@ def call_claude(prompt: str, temperature: float = 0.2, max_tokens: int = 700) ->
         raise RuntimeError(f"Claude API error: {resp.status_code}: {resp.text}")
     out = resp.json()
     # Anthropic returns list of content blocks; combine text
+    blocks = out.get("content", []) if isinstance(out, dict) else []
+    text = "".join([b.get("text", "") for b in blocks if isinstance(b, dict) and b.get("type") == "text"]).strip()
+    # be forgiving about a ```json fence, but not about prose: an unparsed reply would be
+    # stored as the week's result, so it fails the job and the next request runs it again
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
     try:
-        blocks = out.get("content", [])
-        text = "".join([b.get("text", "") for b in blocks if b.get("type") == "text"]) or json.dumps(out)
-        # Try to parse JSON if model followed instruction; be forgiving
-        try:
-            return json.loads(text)
-        except Exception:
-            return {"summary": text, "prompts": [], "actions": []}
-    except Exception:
-        return {"summary": str(out), "prompts": [], "actions": []}
+        result = json.loads(text)
+    except ValueError:
+        raise RuntimeError(f"Claude reply was not JSON: {text[:120]!r}")
+    if not isinstance(result, dict):
+        raise RuntimeError(f"Claude reply was not a JSON object: {text[:120]!r}")
+    return result
 
 
 def generate_reflection(user_id: int, user_goals: str | None = None) -> Dict[str, Any]:
@@ -151,42 +153,8 @@ def generate_reflection(user_id: int, user_goals: str | None = None) -> Dict[str
 
     totals = _weekly_usage_totals(user_id, since)
 
-    # streaks from journals — compute quickly using SQLite-compatible date functions
-    rows = (
-        db.session.query(func.date(JournalEntry.timestamp))
-        .filter(JournalEntry.user_id == user_id)
-        .group_by(func.date(JournalEntry.timestamp))
-        .order_by(func.date(JournalEntry.timestamp))
-        .all()
-    )
-    
-    if not rows:
-        streaks = {"current": 0, "best": 0}
-    else:
-        # Convert date strings to date objects
-        days = [datetime.strptime(r[0], '%Y-%m-%d').date() for r in rows]
-        
-        # Calculate best streak
-        best = cur = 1
-        for i in range(1, len(days)):
-            if (days[i] - days[i - 1]).days == 1:
-                cur += 1
-            else:
-                best = max(best, cur)
-                cur = 1
-        best = max(best, cur)
-        
-        # Calculate current streak counting back from today
-        from datetime import date, timedelta as td
-        today = date.today()
-        s = set(days)
-        current = 0
-        d = today
-        while d in s:
-            current += 1
-            d = d - td(days=1)
-        
-        streaks = {"current": current, "best": int(best)}
+    # streaks from the incrementally maintained journal_streak row
+    streaks = journal_streaks(user_id)
 
     notes = _recent_note_titles(user_id, cfg.max_recent_notes)
     journals = _recent_journal_snippets(user_id, cfg.max_recent_journals)
@@ -206,3 +174,85 @@ def generate_reflection(user_id: int, user_goals: str | None = None) -> Dict[str
         "prompt": prompt,
         "result": result,
     }
+
+
+# ---- Reflection jobs ----
+# POST /api/dashboard/reflection creates (or reuses) a WeeklyReflection row and runs
+# generate_reflection() on a small worker pool; the client polls the row by id. Rows
+# are unique per (user, ISO week, goals hash), so a finished week is served from the
+# table and a double-click while a job runs returns the same job.
+
+JOB_STALE_AFTER = timedelta(seconds=int(os.getenv("REFLECTION_JOB_STALE_SECONDS", "300")))
+_job_pool = ThreadPoolExecutor(max_workers=int(os.getenv("REFLECTION_WORKERS", "2")), thread_name_prefix="reflection")
+
+
+def iso_week(now: datetime | None = None) -> str:
+    year, week, _ = (now or datetime.utcnow()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def goals_hash(user_goals: str | None) -> str:
+    normalized = " ".join((user_goals or "").split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _is_stale(job: WeeklyReflection, now: datetime) -> bool:
+    # a pending/running row whose worker died (restart, crash) would block the week forever
+    started = job.started_at or job.created_at
+    return job.status in ("pending", "running") and started is not None and now - started > JOB_STALE_AFTER
+
+
+def request_reflection(user_id: int, user_goals: str | None = None) -> tuple[WeeklyReflection, bool]:
+    """Find or start the reflection job for this week and goals.
+
+    Returns (job, created); created is False when a stored result or an in-flight job is reused.
+    """
+    uid = int(user_id)
+    now = datetime.utcnow()
+    key = {"user_id": uid, "iso_week": iso_week(now), "goals_hash": goals_hash(user_goals)}
+
+    job = WeeklyReflection.query.filter_by(**key).first()
+    if job and job.status != "error" and not _is_stale(job, now):
+        return job, False
+
+    if job is None:
+        job = WeeklyReflection(**key, status="pending", created_at=now)
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # a concurrent request created it first: use theirs
+            db.session.rollback()
+            return WeeklyReflection.query.filter_by(**key).first(), False
+    else:
+        # failed or abandoned: run it again under the same id
+        job.status, job.error, job.result, job.prompt = "pending", None, None, None
+        job.created_at, job.started_at, job.finished_at = now, None, None
+        db.session.commit()
+
+    app = current_app._get_current_object()
+    _job_pool.submit(_run_reflection_job, app, job.id, (user_goals or "").strip())
+    return job, True
+
+
+def _run_reflection_job(app, job_id: int, user_goals: str) -> None:
+    with app.app_context():
+        job = db.session.get(WeeklyReflection, job_id)
+        if job is None:
+            return
+        job.status, job.started_at = "running", datetime.utcnow()
+        db.session.commit()
+        try:
+            out = generate_reflection(job.user_id, user_goals=user_goals or None)
+            job.prompt, job.result, job.status = out["prompt"], out["result"], "done"
+        except Exception as e:
+            print(f"Reflection job {job_id} failed: {e}")
+            db.session.rollback()
+            job = db.session.get(WeeklyReflection, job_id)
+            job.status, job.error = "error", str(e)[:255]
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+def get_reflection_job(user_id: int, job_id: int) -> WeeklyReflection | None:
+    return WeeklyReflection.query.filter_by(id=job_id, user_id=int(user_id)).first()
@@ -0,0 +1,98 @@
+from __future__ import annotations
+from collections import Counter
+from datetime import date, datetime
+from typing import Dict, Iterable, List
+
+from sqlalchemy import func, insert
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+from app.models.usage_log import UsageLog
+from app.models.usage_rollup import UsageDailyRollup
+
+ROLLUP_KEY = ("user_id", "day", "event_type")
+
+
+def _upsert_stmt(dialect_name: str):
+    table = UsageDailyRollup.__table__
+    mod = postgresql if dialect_name == "postgresql" else sqlite
+    stmt = mod.insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={"count": table.c.count + stmt.excluded.count},
+    )
+
+
+def bump_daily_rollup(conn, rows: Iterable[Dict]) -> int:
+    """Add a batch of UsageLog-shaped rows to usage_daily_rollup.
+
+    `conn` is a Connection or Session already inside the transaction that inserts
+    the raw rows, so the rollup never drifts from usage_logs. Returns the number
+    of (user, day, event_type) keys touched.
+    """
+    counts = Counter()
+    for r in rows:
+        created = r.get("created_at") or datetime.utcnow()
+        counts[(int(r["user_id"]), created.date(), r["event_type"])] += 1
+    if not counts:
+        return 0
+    params = [{"user_id": u, "day": d, "event_type": e, "count": c} for (u, d, e), c in counts.items()]
+    dialect = conn.get_bind().dialect.name if hasattr(conn, "get_bind") else conn.dialect.name
+    conn.execute(_upsert_stmt(dialect), params)
+    return len(params)
+
+
+def rebuild_usage_rollup(user_id: int | None = None) -> Dict[str, int]:
+    """Recompute usage_daily_rollup from usage_logs (all users, or one user). Runs in one transaction."""
+    day_expr = func.date(UsageLog.created_at)
+    src = db.session.query(
+        UsageLog.user_id,
+        day_expr,
+        UsageLog.event_type,
+        func.count(UsageLog.id),
+    )
+    delete_q = UsageDailyRollup.query
+    if user_id is not None:
+        src = src.filter(UsageLog.user_id == user_id)
+        delete_q = delete_q.filter(UsageDailyRollup.user_id == user_id)
+    src = src.group_by(UsageLog.user_id, day_expr, UsageLog.event_type)
+
+    deleted = delete_q.delete(synchronize_session=False)
+    db.session.execute(
+        insert(UsageDailyRollup.__table__).from_select(["user_id", "day", "event_type", "count"], src)
+    )
+    db.session.commit()
+    from app.services.totals import invalidate_user_totals  # local import: totals imports this module
+    invalidate_user_totals(user_id)
+    rows = UsageDailyRollup.query
+    if user_id is not None:
+        rows = rows.filter(UsageDailyRollup.user_id == user_id)
+    return {"deleted": int(deleted or 0), "rows": rows.count()}
+
+
+# ---- Read helpers (day granularity) ----
+
+def _day(d: date | datetime) -> date:
+    return d.date() if isinstance(d, datetime) else d
+
+
+def rollup_totals_by_event(user_id: int, from_day: date | datetime, to_day: date | datetime | None = None) -> Dict[str, int]:
+    q = db.session.query(UsageDailyRollup.event_type, func.sum(UsageDailyRollup.count)).filter(
+        UsageDailyRollup.user_id == user_id,
+        UsageDailyRollup.day >= _day(from_day),
+    )
+    if to_day is not None:
+        q = q.filter(UsageDailyRollup.day <= _day(to_day))
+    return {et: int(c or 0) for et, c in q.group_by(UsageDailyRollup.event_type).all()}
+
+
+def rollup_days(user_id: int, from_day: date | datetime, to_day: date | datetime, events: List[str] | None = None) -> List[tuple]:
+    """Return (day, event_type, count) rows for the day range, ordered by day."""
+    q = db.session.query(UsageDailyRollup.day, UsageDailyRollup.event_type, UsageDailyRollup.count).filter(
+        UsageDailyRollup.user_id == user_id,
+        UsageDailyRollup.day >= _day(from_day),
+        UsageDailyRollup.day <= _day(to_day),
+    )
+    if events:
+        q = q.filter(UsageDailyRollup.event_type.in_(events))
+    return q.order_by(UsageDailyRollup.day).all()
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import re
+from typing import Any, Dict, List, Sequence
+
+from sqlalchemy import column, event, literal_column, or_, select, table, text
+
+from app.extensions import db
+
+# Unified SQLite FTS5 index over journals, tasks, Notion notes and chat messages.
+#
+# rowid = <source id> * 8 + <kind code>, so triggers can replace/delete a document
+# by rowid without scanning. `owner` holds a "u<user_id>" token and is part of every
+# MATCH, so a user's search only touches that user's postings.
+
+KIND_CODES = {"journal": 1, "task": 2, "note": 3, "chat": 4}
+KINDS = tuple(KIND_CODES)
+
+search_index = table(
+    "search_index",
+    column("rowid"),
+    column("owner"),
+    column("kind"),
+    column("ref_id"),
+    column("title"),
+    column("body"),
+)
+
+SCHEMA_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    " owner, kind UNINDEXED, ref_id UNINDEXED, title, body,"
+    " tokenize = 'porter unicode61 remove_diacritics 2')",
+]
+
+# (kind, table, code, title expr, body expr, user_id expr)
+_SOURCES = [
+    ("journal", "journal_entry", 1, "''", "{r}.content", "{r}.user_id"),
+    ("task", "task", 2, "{r}.title", "coalesce({r}.description, '')", "{r}.user_id"),
+    ("note", "notion_note_cache", 3, "coalesce({r}.title, '')", "coalesce({r}.content, '')", "{r}.user_id"),
+    ("chat", "chat_message", 4, "''", "{r}.content", "{r}.user_id"),
+]
+
+
+def _insert_sql(kind: str, code: int, title: str, body: str, uid: str, r: str) -> str:
+    return (
+        "INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES ("
+        f"{r}.id * 8 + {code}, 'u' || {uid.format(r=r)}, '{kind}', {r}.id, {title.format(r=r)}, {body.format(r=r)});"
+    )
+
+
+for _kind, _tbl, _code, _title, _body, _uid in _SOURCES:
+    SCHEMA_SQL += [
+        f"CREATE TRIGGER IF NOT EXISTS {_tbl}_search_ai AFTER INSERT ON {_tbl} BEGIN "
+        f"{_insert_sql(_kind, _code, _title, _body, _uid, 'new')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {_tbl}_search_au AFTER UPDATE ON {_tbl} BEGIN "
+        f"DELETE FROM search_index WHERE rowid = old.id * 8 + {_code}; "
+        f"{_insert_sql(_kind, _code, _title, _body, _uid, 'new')} END",
+        f"CREATE TRIGGER IF NOT EXISTS {_tbl}_search_ad AFTER DELETE ON {_tbl} BEGIN "
+        f"DELETE FROM search_index WHERE rowid = old.id * 8 + {_code}; END",
+    ]
+
+# Deleting a thread leaves its messages behind unless FK cascades are on; drop them from the index either way
+SCHEMA_SQL.append(
+    "CREATE TRIGGER IF NOT EXISTS chat_thread_search_ad AFTER DELETE ON chat_thread BEGIN "
+    "DELETE FROM search_index WHERE rowid IN (SELECT id * 8 + 4 FROM chat_message WHERE thread_id = old.id); END"
+)
+
+DROP_SQL = ["DROP TRIGGER IF EXISTS chat_thread_search_ad"] + [
+    f"DROP TRIGGER IF EXISTS {tbl}_search_{sfx}" for _k, tbl, *_ in _SOURCES for sfx in ("ai", "au", "ad")
+] + ["DROP TABLE IF EXISTS search_index"]
+
+
+def create_search_schema(conn) -> bool:
+    """Create the FTS5 table + sync triggers (idempotent). Returns False on non-SQLite engines."""
+    if conn.dialect.name != "sqlite":
+        return False
+    for stmt in SCHEMA_SQL:
+        conn.exec_driver_sql(stmt)
+    return True
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_search_schema_after_create_all(target, connection, **kw):  # noqa: ARG001
+    create_search_schema(connection)
+
+
+def backfill_statements() -> List[tuple]:
+    """(kind, INSERT ... SELECT) pairs that index every existing source row."""
+    out = []
+    for kind, tbl, code, title, body, uid in _SOURCES:
+        r = "src"
+        out.append((kind,
+            "INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) "
+            f"SELECT {r}.id * 8 + {code}, 'u' || {uid.format(r=r)}, '{kind}', {r}.id, "
+            f"{title.format(r=r)}, {body.format(r=r)} FROM {tbl} AS {r}"
+        ))
+    return out
+
+
+def rebuild_search_index() -> Dict[str, int]:
+    """(Re)create the schema and repopulate the index from the source tables."""
+    conn = db.session.connection()
+    if not create_search_schema(conn):
+        return {}
+    conn.exec_driver_sql("DELETE FROM search_index")
+    out = {kind: conn.exec_driver_sql(sql).rowcount for kind, sql in backfill_statements()}
+    db.session.commit()
+    _fts_ready.clear()
+    return out
+
+
+_fts_ready: Dict[str, bool] = {}
+
+
+def fts_enabled() -> bool:
+    """True when the bound engine is SQLite and search_index exists (cached per engine URL)."""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _fts_ready:
+        if engine.dialect.name != "sqlite":
+            _fts_ready[key] = False
+        else:
+            row = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_index'")
+            ).first()
+            _fts_ready[key] = row is not None
+    return _fts_ready[key]
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match(user_id: int, q: str) -> str | None:
+    """Turn free text into a safe FTS5 query: owner token AND every word as a prefix term."""
+    tokens = _TOKEN_RE.findall(q or "")
+    if not tokens:
+        return None
+    terms = " ".join(f'"{t}"*' for t in tokens[:16])
+    return f'owner:"u{int(user_id)}" AND {{title body}}:({terms})'
+
+
+def _match_clause(match: str):
+    return literal_column("search_index").op("MATCH")(match)
+
+
+def apply_text_search(query, model, user_id: int, q: str, kind: str, like_columns: Sequence[Any], rank: bool = False):
+    """Filter an ORM query on `model` to rows matching q.
+
+    Uses the FTS5 index when available (optionally ordering by BM25 ahead of any
+    later order_by), otherwise falls back to the old ilike('%q%') scan.
+    """
+    match = build_match(user_id, q) if fts_enabled() else None
+    if not match:
+        like = f"%{q}%"
+        return query.filter(or_(*[c.ilike(like) for c in like_columns]))
+    if not rank:
+        sub = select(search_index.c.ref_id).where(_match_clause(match), search_index.c.kind == kind)
+        return query.filter(model.id.in_(sub))
+    hits = (
+        select(
+            search_index.c.ref_id.label("ref_id"),
+            literal_column("bm25(search_index, 0, 0, 0, 4.0, 1.0)").label("rank"),
+        )
+        .where(_match_clause(match), search_index.c.kind == kind)
+        .subquery()
+    )
+    return query.join(hits, model.id == hits.c.ref_id).order_by(hits.c.rank)
+
+
+def search(user_id: int, q: str, kinds: Sequence[str] | None = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """BM25-ranked hits across kinds with highlighted title and body snippet."""
+    match = build_match(user_id, q)
+    if not match:
+        return []
+    kinds = [k for k in (kinds or KINDS) if k in KIND_CODES]
+    if not kinds:
+        return []
+    stmt = text(
+        "SELECT kind, ref_id,"
+        " highlight(search_index, 3, '<mark>', '</mark>') AS title,"
+        " snippet(search_index, 4, '<mark>', '</mark>', '…', 16) AS snippet,"
+        " bm25(search_index, 0, 0, 0, 4.0, 1.0) AS score"
+        " FROM search_index WHERE search_index MATCH :m"
+        f" AND kind IN ({', '.join(repr(k) for k in kinds)})"
+        " ORDER BY score LIMIT :lim"
+    )
+    rows = db.session.execute(stmt, {"m": match, "lim": int(limit)}).all()
+    return [
+        {"kind": kind, "id": int(ref_id), "title": title or "", "snippet": snippet or "", "score": -float(score)}
+        for kind, ref_id, title, snippet, score in rows
+    ]
@@ -0,0 +1,162 @@
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+from app.models.journal import JournalEntry
+from app.models.journal_streak import JournalDay, JournalStreak
+
+# Journal streaks kept incrementally: journal_day holds entries-per-day, journal_streak
+# holds (last_day, current, best, days) per user. Both are written by mapper events in
+# the same transaction as the JournalEntry change. Appending a new latest day is O(1);
+# only back-dated entries and removing a day's last entry rescan journal_day.
+
+_day_t = JournalDay.__table__
+_streak_t = JournalStreak.__table__
+
+
+def _entry_day(ts) -> date:
+    return (ts or datetime.utcnow()).date()
+
+
+def _runs(days: List[date]) -> Tuple[int, int]:
+    """(run ending at the last day, best run) for sorted distinct days."""
+    best = cur = 0
+    prev = None
+    for d in days:
+        cur = cur + 1 if prev is not None and (d - prev).days == 1 else 1
+        best = max(best, cur)
+        prev = d
+    return cur, best
+
+
+def _upsert(conn, table):
+    return (postgresql if conn.dialect.name == "postgresql" else sqlite).insert(table)
+
+
+def _write_streak(conn, user_id: int, values: Dict) -> None:
+    stmt = _upsert(conn, _streak_t).values(user_id=user_id, **values)
+    conn.execute(stmt.on_conflict_do_update(index_elements=[_streak_t.c.user_id], set_=values))
+
+
+def _recompute(conn, user_id: int) -> None:
+    days = [r[0] for r in conn.execute(
+        select(_day_t.c.day).where(_day_t.c.user_id == user_id).order_by(_day_t.c.day)
+    )]
+    current, best = _runs(days)
+    _write_streak(conn, user_id, {
+        "last_day": days[-1] if days else None,
+        "current": current,
+        "best": best,
+        "days": len(days),
+    })
+
+
+def _add_entry(conn, user_id: int, day: date) -> None:
+    # one upsert, so two first-entries-of-the-day can't both try to insert the day row
+    stmt = _upsert(conn, _day_t).values(user_id=user_id, day=day, entries=1)
+    entries = conn.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[_day_t.c.user_id, _day_t.c.day],
+            set_={"entries": _day_t.c.entries + 1},
+        ).returning(_day_t.c.entries)
+    ).scalar_one()
+    if entries > 1:
+        return  # day already counted: streaks unchanged
+
+    st = conn.execute(select(_streak_t).where(_streak_t.c.user_id == user_id)).mappings().first()
+    if st is None or st["last_day"] is None:
+        _write_streak(conn, user_id, {"last_day": day, "current": 1, "best": max(1, (st or {}).get("best") or 0), "days": 1})
+        return
+    if day < st["last_day"]:
+        # back-dated entry may bridge two runs
+        _recompute(conn, user_id)
+        return
+    current = st["current"] + 1 if day - st["last_day"] == timedelta(days=1) else 1
+    _write_streak(conn, user_id, {
+        "last_day": day,
+        "current": current,
+        "best": max(st["best"], current),
+        "days": st["days"] + 1,
+    })
+
+
+def _remove_entry(conn, user_id: int, day: date) -> None:
+    row = conn.execute(
+        select(_day_t.c.id, _day_t.c.entries).where(_day_t.c.user_id == user_id, _day_t.c.day == day)
+    ).first()
+    if row is None:
+        return
+    if row[1] > 1:
+        conn.execute(update(_day_t).where(_day_t.c.id == row[0]).values(entries=_day_t.c.entries - 1))
+        return
+    # that was the day's only entry: the day leaves the set and runs may split
+    conn.execute(delete(_day_t).where(_day_t.c.id == row[0]))
+    _recompute(conn, user_id)
+
+
+@event.listens_for(JournalEntry, "after_insert")
+def _journal_after_insert(mapper, connection, target):  # noqa: ARG001
+    _add_entry(connection, int(target.user_id), _entry_day(target.timestamp))
+
+
+@event.listens_for(JournalEntry, "after_delete")
+def _journal_after_delete(mapper, connection, target):  # noqa: ARG001
+    _remove_entry(connection, int(target.user_id), _entry_day(target.timestamp))
+
+
+@event.listens_for(JournalEntry, "after_update")
+def _journal_after_update(mapper, connection, target):  # noqa: ARG001
+    state = inspect(target)
+    ts_hist = state.attrs.timestamp.history
+    uid_hist = state.attrs.user_id.history
+    if not ts_hist.has_changes() and not uid_hist.has_changes():
+        return
+    old_ts = ts_hist.deleted[0] if ts_hist.deleted else target.timestamp
+    old_uid = uid_hist.deleted[0] if uid_hist.deleted else target.user_id
+    old = (int(old_uid), _entry_day(old_ts))
+    new = (int(target.user_id), _entry_day(target.timestamp))
+    if old != new:
+        _remove_entry(connection, *old)
+        _add_entry(connection, *new)
+
+
+def rebuild_journal_streaks(user_id: int | None = None) -> Dict[str, int]:
+    """Recompute journal_day and journal_streak from journal_entry (all users, or one user)."""
+    day_expr = func.date(JournalEntry.timestamp)
+    src = db.session.query(JournalEntry.user_id, day_expr, func.count(JournalEntry.id))
+    del_days = delete(_day_t)
+    del_streaks = delete(_streak_t)
+    if user_id is not None:
+        src = src.filter(JournalEntry.user_id == user_id)
+        del_days = del_days.where(_day_t.c.user_id == user_id)
+        del_streaks = del_streaks.where(_streak_t.c.user_id == user_id)
+    src = src.group_by(JournalEntry.user_id, day_expr)
+
+    db.session.execute(del_days)
+    db.session.execute(del_streaks)
+    db.session.execute(insert(_day_t).from_select(["user_id", "day", "entries"], src))
+
+    conn = db.session.connection()
+    users = [user_id] if user_id is not None else [
+        r[0] for r in conn.execute(select(_day_t.c.user_id).distinct())
+    ]
+    for uid in users:
+        _recompute(conn, int(uid))
+    db.session.commit()
+    return {"users": len(users), "days": db.session.query(func.count(JournalDay.id)).scalar() or 0}
+
+
+def journal_streaks(user_id: int) -> Dict[str, int]:
+    """Current and best journal day-streaks from the stored state (one primary-key lookup)."""
+    row = db.session.execute(
+        select(_streak_t.c.last_day, _streak_t.c.current, _streak_t.c.best).where(_streak_t.c.user_id == int(user_id))
+    ).first()
+    if row is None:
+        return {"current": 0, "best": 0}
+    last_day, current, best = row
+    # the stored run only counts while it reaches today
+    return {"current": int(current) if last_day == date.today() else 0, "best": int(best)}
@@ -1,6 +1,7 @@
 # app/services/task_nlp.py
-import os, json, requests
-from datetime import datetime, timezone, timedelta
+import os, re, json, requests
+import calendar
+from datetime import date, datetime, time, timezone, timedelta
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-3-haiku-20240307")
@@ -21,12 +22,32 @@ For dates without a year specified, assume the current year {{YEAR}}.
 If no clear due date, set due_at to empty.
 Text: <<<{{TEXT}}>>>"""
 
+# Rule-based parses at or above this confidence are used as-is; below it Claude is asked
+RULES_MIN_CONFIDENCE = float(os.getenv("QUICKADD_RULES_MIN_CONFIDENCE", "0.7"))
+# A year-less date further back than this means the next year's ("jan 5" typed in October);
+# a more recent one is left as-is and the parse is handed to Claude
+ROLL_FORWARD_AFTER_DAYS = 60
+
+
 def quick_extract_task(text: str):
-    if not ANTHROPIC_API_KEY:
-        raise RuntimeError("ANTHROPIC_API_KEY not set")
-    
-    # Get current date context
+    """Title/priority/due_at for a quick-add line.
+
+    The local parser handles the common shapes ("finish lab report tomorrow 5pm high
+    priority") in well under a millisecond; Claude is only called when its confidence
+    is low. Without an API key, or if Claude fails, the local parse is returned.
+    """
     now = datetime.now(timezone.utc)
+    cand = parse_task_text(text, now)
+    if cand["confidence"] >= RULES_MIN_CONFIDENCE or not ANTHROPIC_API_KEY:
+        return {**cand, "parser": "rules"}
+    try:
+        return {**_llm_extract_task(text, now), "confidence": cand["confidence"], "parser": "llm"}
+    except Exception as e:
+        print(f"Quick-add LLM fallback failed, using rule parse: {e}")
+        return {**cand, "parser": "rules"}
+
+
+def _llm_extract_task(text: str, now: datetime):
     today_str = now.strftime("%A, %B %d, %Y")  # e.g., "Monday, September 15, 2025"
     year_str = str(now.year)
     
@@ -91,3 +112,288 @@ def _fix_date_year(date_str: str, current_time: datetime) -> str:
     except Exception:
         # If anything goes wrong, return original
         return date_str
+
+
+# ---- Rule-based parser ----
+# Each recognised phrase is blanked out of a working copy of the text (same length, so
+# later patterns can't re-match it); what is left becomes the title. Times are UTC like
+# the rest of the app, and a date without a time is due at the end of that day.
+
+_WEEKDAYS = {"monday": 0, "tuesday": 1, "wednesday": 2, "thursday": 3, "friday": 4, "saturday": 5, "sunday": 6}
+_WEEKDAY_ABBR = {"mon": 0, "tue": 1, "tues": 1, "wed": 2, "thu": 3, "thur": 3, "thurs": 3, "fri": 4, "sat": 5, "sun": 6}
+_MONTHS = {m.lower(): i for i, m in enumerate(calendar.month_name) if m}
+_MONTHS.update({m.lower(): i for i, m in enumerate(calendar.month_abbr) if m})
+_MONTHS["sept"] = 9
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10}
+
+_MONTH_RE = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_WEEKDAY_RE = "|".join(_WEEKDAYS)
+_WEEKDAY_ABBR_RE = "|".join(sorted(_WEEKDAY_ABBR, key=len, reverse=True))
+_PREP = r"(?:(?:due|by|on|before|until|for|at|@)\s+)?"
+
+END_OF_DAY = time(23, 59)
+_PART_OF_DAY = {"morning": time(9, 0), "afternoon": time(15, 0), "evening": time(18, 0), "tonight": time(20, 0)}
+
+_PRIORITY_PATTERNS = [
+    ("high", re.compile(r"\b(?:high|top)[\s-]+priority\b|\bpriority\s*[:=]?\s*high\b|\bp1\b|\burgent(?:ly)?\b|\basap\b|!{2,}", re.I)),
+    ("low", re.compile(r"\blow[\s-]+priority\b|\bpriority\s*[:=]?\s*low\b|\bp3\b|\bno rush\b|\bwhenever\b|\bsomeday\b", re.I)),
+    ("medium", re.compile(r"\b(?:medium|normal)[\s-]+priority\b|\bpriority\s*[:=]?\s*(?:medium|normal)\b|\bp2\b", re.I)),
+]
+# signals that are kept in the title but still raise the priority
+_HIGH_HINT = re.compile(r"\b(?:important|critical)\b", re.I)
+
+_LEAD_IN = re.compile(
+    r"^\s*(?:(?:please\s+)?remind me to|don'?t forget to|remember to|i (?:need|have) to|need to|have to|"
+    r"todo|to-?do|task|reminder)\s*[:\-]?\s+", re.I)
+_EDGE_WORDS = {"by", "on", "at", "due", "before", "until", "for", "this", "next", "in", "the", "and", "-", "@"}
+_LEFTOVER_TEMPORAL = re.compile(
+    rf"\b(?:{_MONTH_RE}|{_WEEKDAY_RE}|today|tonight|tomorrow|week|weekend|month|o'?clock|noon|midnight|"
+    r"morning|afternoon|evening|deadline|ago|later|soon|sometime|spring|summer|fall|autumn|winter|am|pm)\b|\b\d{1,2}(?::\d{2})\b|\b\d{1,2}(?:st|nd|rd|th)\b",
+    re.I)
+
+
+def _next_weekday(today: date, weekday: int) -> date:
+    """Next `weekday` strictly after today."""
+    return today + timedelta(days=(weekday - today.weekday() - 1) % 7 + 1)
+
+
+def _add_months(d: date, months: int) -> date:
+    month = d.month - 1 + months
+    year = d.year + month // 12
+    month = month % 12 + 1
+    return date(year, month, min(d.day, calendar.monthrange(year, month)[1]))
+
+
+def _explicit_date(year: int | None, month: int, day: int, now: datetime) -> date | None:
+    try:
+        d = date(year or now.year, month, day)
+    except ValueError:
+        return None
+    if year is None and d < now.date() - timedelta(days=ROLL_FORWARD_AFTER_DAYS):
+        # "jan 5" / "1/5" carry no year: a day long gone this year means the next one
+        try:
+            d = d.replace(year=d.year + 1)
+        except ValueError:
+            return None  # feb 29 with no leap year ahead: leave it for the fallback
+    return d
+
+
+def _hour(h: int, meridiem: str | None) -> int | None:
+    if meridiem:
+        if not 1 <= h <= 12:
+            return None
+        h = h % 12
+        return h + 12 if meridiem.lower().startswith("p") else h
+    return h if 0 <= h <= 23 else None
+
+
+def _has_title_words(s: str) -> bool:
+    return any(re.search(r"\w", w) and w.lower().strip(",:;.-!") not in _EDGE_WORDS for w in s.split())
+
+
+def parse_task_text(text: str, now: datetime | None = None) -> dict:
+    """Deterministic quick-add parse: {title, priority, due_at, confidence}.
+
+    Understands today/tonight/tomorrow, "day after tomorrow", weekdays ("friday",
+    "next fri"), "in 3 days", "next week", "this weekend", "end of week/month",
+    month-name and numeric dates, times (5pm, 17:30, noon, "in the morning") and
+    priority phrases. Confidence drops when something date-like is left in the
+    title, when a phrase was cut from the middle of it, when a date is already past,
+    when the text is long, or when a phrase was ambiguous.
+    """
+    now = now or datetime.now(timezone.utc)
+    today = now.date()
+    work = text[:1000]
+    dates: list[date] = []
+    times: list[time] = []
+    priority = None
+    penalty = 0.0
+    cuts: list[tuple[int, int]] = []
+
+    def blank(m: re.Match) -> None:
+        nonlocal work
+        cuts.append((m.start(), m.end()))
+        work = work[:m.start()] + " " * (m.end() - m.start()) + work[m.end():]
+
+    def scan(pattern: str, handle) -> None:
+        for m in list(re.finditer(pattern, work, re.I)):
+            if handle(m) is not False:
+                blank(m)
+
+    # -- priority
+    for level, pattern in _PRIORITY_PATTERNS:
+        for m in list(pattern.finditer(work)):
+            priority = priority or level
+            blank(m)
+    if priority is None and _HIGH_HINT.search(work):
+        priority = "high"
+
+    # -- dates with a year or month name
+    def iso_date(m):
+        d = _explicit_date(int(m.group(1)), int(m.group(2)), int(m.group(3)), now)
+        if d is None:
+            return False
+        dates.append(d)
+    scan(_PREP + r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", iso_date)
+
+    def month_day(m):
+        d = _explicit_date(int(m.group(3)) if m.group(3) else None, _MONTHS[m.group(1).lower()], int(m.group(2)), now)
+        if d is None:
+            return False
+        dates.append(d)
+    scan(_PREP + rf"\b({_MONTH_RE})\.?\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}})\b)?", month_day)
+
+    def day_month(m):
+        d = _explicit_date(int(m.group(3)) if m.group(3) else None, _MONTHS[m.group(2).lower()], int(m.group(1)), now)
+        if d is None:
+            return False
+        dates.append(d)
+    scan(_PREP + rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?({_MONTH_RE})\b\.?(?:,?\s+(\d{{4}})\b)?", day_month)
+
+    def slash_date(m):
+        nonlocal penalty
+        year = int(m.group(3)) if m.group(3) else None
+        if year is not None and year < 100:
+            year += 2000
+        d = _explicit_date(year, int(m.group(1)), int(m.group(2)), now)  # month/day, as the UI shows dates
+        if d is None:
+            return False
+        penalty += 0.15  # could be day/month
+        dates.append(d)
+    scan(_PREP + r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b", slash_date)
+
+    # -- relative dates
+    def day_after_tomorrow(m):
+        dates.append(today + timedelta(days=2))
+    scan(_PREP + r"\b(?:the\s+)?day after (?:tomorrow|tmrw?)\b", day_after_tomorrow)
+
+    def relative_day(m):
+        word = m.group(1).lower()
+        if word == "tonight":
+            dates.append(today)
+            times.append(_PART_OF_DAY["tonight"])
+        else:
+            dates.append(today if word == "today" else today + timedelta(days=1))
+    scan(_PREP + r"\b(today|tonight|tomorrow|tmrw|tmr|tomorow)\b", relative_day)
+
+    def in_n(m):
+        raw = m.group(1).lower()
+        n = _NUMBER_WORDS.get(raw) or int(raw)
+        unit = m.group(2).lower()
+        if unit.startswith("day"):
+            dates.append(today + timedelta(days=n))
+        elif unit.startswith("week"):
+            dates.append(today + timedelta(weeks=n))
+        else:
+            dates.append(_add_months(today, n))
+    scan(r"\bin\s+(\d{1,3}|" + "|".join(_NUMBER_WORDS) + r")\s+(days?|weeks?|months?)\b", in_n)
+
+    def end_of(m):
+        unit = (m.group(1) or m.group(2)).lower()
+        if unit in ("week", "eow"):
+            dates.append(today if today.weekday() >= 4 else _next_weekday(today, 4))  # friday
+        else:
+            dates.append(date(today.year, today.month, calendar.monthrange(today.year, today.month)[1]))
+    scan(_PREP + r"\b(?:(?:the\s+)?end of (?:the\s+|this\s+)?(week|month)|(eow|eom))\b", end_of)
+
+    def this_next_span(m):
+        which, unit = m.group(1).lower(), m.group(2).lower()
+        monday = today - timedelta(days=today.weekday())
+        if unit == "week":
+            dates.append(monday + timedelta(weeks=1) if which == "next" else (today if today.weekday() >= 4 else monday + timedelta(days=4)))
+        elif unit == "weekend":
+            saturday = monday + timedelta(days=5)
+            dates.append(saturday + timedelta(weeks=1) if which == "next" else max(saturday, today))
+        else:
+            dates.append(_add_months(today.replace(day=1), 1) if which == "next" else today)
+            if which == "this":
+                return False  # "this month" gives no real day; leave it for the confidence check
+    scan(_PREP + r"\b(next|this)\s+(week|weekend|month)\b", this_next_span)
+
+    def weekday(which, name):
+        which = (which or "").lower()
+        name = name.lower()
+        wd = _WEEKDAYS.get(name, _WEEKDAY_ABBR.get(name))
+        if which == "next":
+            # the weekday in next calendar week
+            dates.append(today - timedelta(days=today.weekday()) + timedelta(weeks=1, days=wd))
+        else:
+            dates.append(_next_weekday(today, wd))
+    scan(_PREP + rf"\b(?:(next|this|coming)\s+)?({_WEEKDAY_RE})s?\b", lambda m: weekday(m.group(1), m.group(2)))
+    # abbreviations only after a preposition or next/this, so "sun" or "sat" in a title survive
+    scan(rf"\b(?:(?:due|by|on|before|until)\s+(?:(next|this)\s+)?|(next|this)\s+)({_WEEKDAY_ABBR_RE})\b\.?",
+         lambda m: weekday(m.group(1) or m.group(2), m.group(3)))
+
+    # -- times
+    def clock_12(m):
+        h = _hour(int(m.group(1)), m.group(3))
+        if h is None:
+            return False
+        times.append(time(h, int(m.group(2) or 0)))
+    scan(_PREP + r"\b(\d{1,2})(?::([0-5]\d))?\s*([ap])\.?m\.?(?![a-z])", clock_12)
+
+    def clock_24(m):
+        times.append(time(int(m.group(1)), int(m.group(2))))
+    scan(_PREP + r"\b([01]?\d|2[0-3]):([0-5]\d)\b", clock_24)
+
+    def named_time(m):
+        word = m.group(1).lower()
+        times.append(time(12, 0) if word in ("noon", "midday") else time(23, 59) if word == "midnight" else END_OF_DAY)
+    scan(_PREP + r"\b(noon|midday|midnight|eod|cob|end of (?:the )?day|close of business)\b", named_time)
+
+    def part_of_day(m):
+        times.append(_PART_OF_DAY[m.group(1).lower()])
+    scan(r"\b(?:in the|this)\s+(morning|afternoon|evening)\b", part_of_day)
+
+    def bare_hour(m):
+        nonlocal penalty
+        h = int(m.group(1))
+        if not 1 <= h <= 12:
+            return False
+        penalty += 0.15  # "at 5": guess the waking-hours reading
+        times.append(time(h if 8 <= h <= 11 else (h % 12) + 12 if h < 12 else 12, 0))
+    scan(r"\b(?:at|@)\s*(\d{1,2})\b(?!\s*(?:[:/]|%|st|nd|rd|th))", bare_hour)
+
+    # -- resolve
+    if len(set(dates)) > 1:
+        penalty += 0.4
+    if len(set(times)) > 1:
+        penalty += 0.3
+    if dates and dates[0] < today:
+        penalty += 0.4  # a day already past: a typo, last year's date, or next year's? Claude decides
+    due = None
+    if dates or times:
+        day = dates[0] if dates else today
+        at = times[0] if times else END_OF_DAY
+        due = datetime.combine(day, at)
+        if not dates and due <= now.replace(tzinfo=None):
+            due += timedelta(days=1)  # "at 5pm" once 5pm has passed means tomorrow
+
+    # -- title
+    title = _LEAD_IN.sub("", " ".join(work.split()))
+    words = title.split()
+    while words and (words[0].lower().strip(",:;") in _EDGE_WORDS or not words[0].strip(",:;.-!")):
+        words.pop(0)
+    while words and (words[-1].lower().strip(",:;.") in _EDGE_WORDS or not words[-1].strip(",:;.-!")):
+        words.pop()
+    title = " ".join(words).strip(" ,;:-")
+    title = title[:1].upper() + title[1:]
+
+    confidence = 1.0 - penalty
+    if _LEFTOVER_TEMPORAL.search(title):
+        confidence -= 0.4  # a date/time phrase we did not understand
+    if len(text) > 120 or "\n" in text.strip() or re.search(r"[.?!]\s+\S", text.strip()):
+        confidence -= 0.3  # long / multi-sentence: Claude writes the better title
+    if len(words) > 12:
+        confidence -= 0.2
+    if any(_has_title_words(work[:a]) and _has_title_words(work[b:]) for a, b in cuts):
+        confidence -= 0.35  # a phrase was cut out of the middle ("slides for monday 9am meeting")
+    if len(title) < 2:
+        confidence = 0.0
+
+    return {
+        "title": (title or text.strip() or "Untitled task")[:100],
+        "priority": priority or "medium",
+        "due_at": due.isoformat() if due else "",
+        "confidence": round(max(0.0, min(1.0, confidence)), 2),
+    }
@@ -0,0 +1,178 @@
+from __future__ import annotations
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from app.extensions import db
+from app.models.agent_telemetry import AgentStepLog
+from app.services.prompt_cache import usage_dict
+
+# Per-step telemetry for agent (/api/agent/chat*) and chat (/api/ai/chat) turns.
+#
+# A TurnTelemetry collects one row per Claude call and per tool execution while the
+# turn runs, and save() writes them plus a summary "turn" row with one multi-row INSERT
+# at the end, so a turn costs a single extra write. Recording is best-effort.
+
+TELEMETRY_ENABLED = os.getenv("AGENT_TELEMETRY_ENABLED", "true").lower() == "true"
+
+
+def _result_error(result: Any) -> str | None:
+    # tools report most failures as {"error": ...} instead of raising
+    if isinstance(result, dict) and result.get("error"):
+        return str(result["error"])[:255]
+    return None
+
+
+class TurnTelemetry:
+    def __init__(self, user_id: int, source: str):
+        self.user_id = int(user_id)
+        self.source = source
+        self.turn_id = uuid.uuid4().hex
+        self.llm_calls = 0
+        self.error: str | None = None
+        self._started = time.perf_counter()
+        self._rows: List[Dict[str, Any]] = []
+        self._saved = False
+
+    def _row(self, kind: str, name: str, step: int, ms: float, **extra) -> Dict[str, Any]:
+        row = {
+            "user_id": self.user_id, "turn_id": self.turn_id, "source": self.source,
+            "kind": kind, "name": (name or "?")[:64], "step": step, "ms": round(ms, 1),
+            "input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0,
+            "result_bytes": None, "ok": True, "error": None, "created_at": datetime.utcnow(),
+        }
+        row.update(extra)
+        return row
+
+    def llm(self, model: str, ms: float, usage: Any) -> int:
+        """Record one Claude call; returns its step number (1-based)."""
+        self.llm_calls += 1
+        u = usage_dict(usage)
+        self._rows.append(self._row(
+            "llm", model, self.llm_calls, ms,
+            input_tokens=u["input_tokens"], output_tokens=u["output_tokens"],
+            cache_read_tokens=u["cache_read_input_tokens"], cache_write_tokens=u["cache_creation_input_tokens"],
+        ))
+        return self.llm_calls
+
+    def tool(self, name: str, ms: float, result: Any = None, error: str | None = None) -> None:
+        """Record one tool execution, attributed to the latest Claude call."""
+        error = error or _result_error(result)
+        size = len(json.dumps(result, default=str)) if result is not None else None
+        self._rows.append(self._row(
+            "tool", name, self.llm_calls, ms,
+            result_bytes=size, ok=error is None, error=error[:255] if error else None,
+        ))
+
+    def fail(self, error: Any) -> None:
+        self.error = str(error)[:255]
+
+    def save(self) -> None:
+        """Write the collected rows plus the turn summary. Safe to call more than once."""
+        if self._saved or not TELEMETRY_ENABLED:
+            return
+        self._saved = True
+        llm_rows = [r for r in self._rows if r["kind"] == "llm"]
+        turn = self._row(
+            "turn", self.source, self.llm_calls, (time.perf_counter() - self._started) * 1000,
+            ok=self.error is None, error=self.error,
+            **{k: sum(r[k] for r in llm_rows) for k in ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")},
+        )
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(AgentStepLog.__table__.insert(), [*self._rows, turn])
+        except Exception as e:
+            print(f"Agent telemetry: dropped turn {self.turn_id}: {e}")
+
+
+def _pct(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not samples:
+        return 0.0
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))], 1)
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {"p50": _pct(samples, 0.5), "p95": _pct(samples, 0.95), "max": round(samples[-1], 1) if samples else 0.0}
+
+
+def agent_telemetry_stats(user_id: int, days: int = 7, source: str | None = None) -> Dict[str, Any]:
+    """p50/p95 latency per tool, per LLM step and per turn length (number of LLM calls)."""
+    since = datetime.utcnow() - timedelta(days=days)
+    q = AgentStepLog.query.filter(AgentStepLog.user_id == int(user_id), AgentStepLog.created_at >= since)
+    if source:
+        q = q.filter(AgentStepLog.source == source)
+    rows = q.with_entities(
+        AgentStepLog.kind, AgentStepLog.name, AgentStepLog.step, AgentStepLog.ms, AgentStepLog.ok,
+        AgentStepLog.result_bytes, AgentStepLog.input_tokens, AgentStepLog.output_tokens,
+        AgentStepLog.cache_read_tokens, AgentStepLog.cache_write_tokens,
+        AgentStepLog.turn_id, AgentStepLog.source, AgentStepLog.created_at,
+    ).all()
+
+    tools: Dict[str, List] = defaultdict(list)
+    steps: Dict[int, List] = defaultdict(list)
+    turns: Dict[int, List] = defaultdict(list)
+    for r in rows:
+        prompt = r.input_tokens + r.cache_read_tokens + r.cache_write_tokens
+        if r.kind == "tool":
+            tools[r.name].append(r)
+        elif r.kind == "llm":
+            steps[r.step].append((r.ms, prompt, r.output_tokens))
+        elif r.kind == "turn":
+            turns[r.step].append(r)
+
+    tool_stats = []
+    for name, items in tools.items():
+        sizes = [r.result_bytes for r in items if r.result_bytes is not None]
+        tool_stats.append({
+            "tool": name,
+            "calls": len(items),
+            "errors": sum(1 for r in items if not r.ok),
+            **{f"{k}_ms": v for k, v in _summary([r.ms for r in items]).items()},
+            "avg_result_bytes": round(sum(sizes) / len(sizes)) if sizes else 0,
+        })
+    tool_stats.sort(key=lambda t: t["p95_ms"], reverse=True)
+
+    step_stats = [{
+        "step": step,
+        "calls": len(items),
+        **{f"{k}_ms": v for k, v in _summary([i[0] for i in items]).items()},
+        "p50_prompt_tokens": _pct(sorted(i[1] for i in items), 0.5),
+        "p95_prompt_tokens": _pct(sorted(i[1] for i in items), 0.95),
+        "avg_output_tokens": round(sum(i[2] for i in items) / len(items)),
+    } for step, items in sorted(steps.items())]
+
+    all_turns = [r for items in turns.values() for r in items]
+    turn_stats = [{
+        "llm_calls": n,
+        "turns": len(items),
+        "errors": sum(1 for r in items if not r.ok),
+        **{f"{k}_ms": v for k, v in _summary([r.ms for r in items]).items()},
+        **{f"{k}_tokens": v for k, v in _summary([r.input_tokens + r.cache_read_tokens + r.cache_write_tokens + r.output_tokens for r in items]).items()},
+    } for n, items in sorted(turns.items())]
+
+    heaviest = sorted(all_turns, key=lambda r: r.input_tokens + r.cache_read_tokens + r.cache_write_tokens + r.output_tokens, reverse=True)[:10]
+    return {
+        "days": days,
+        "source": source,
+        "turns": len(all_turns),
+        "tools": tool_stats,
+        "llm_steps": step_stats,
+        "by_llm_calls": turn_stats,
+        "top_token_turns": [{
+            "turn_id": r.turn_id,
+            "source": r.source,
+            "llm_calls": r.step,
+            "ms": r.ms,
+            "input_tokens": r.input_tokens,
+            "cache_read_tokens": r.cache_read_tokens,
+            "cache_write_tokens": r.cache_write_tokens,
+            "output_tokens": r.output_tokens,
+            "created_at": r.created_at.isoformat(),
+        } for r in heaviest],
+    }
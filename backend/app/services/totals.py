@@ -0,0 +1,63 @@
+from __future__ import annotations
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, Tuple
+
+from app.services.rollup import rollup_totals_by_event
+
+# Dashboard total label -> UsageLog.event_type
+TOTAL_EVENTS = {
+    "journal_entries": "journal_create",
+    "chat_queries": "chat_query",
+    "calendar_syncs": "calendar_sync",
+    "notes_syncs": "notes_sync",
+}
+
+TOTALS_TTL_SECONDS = float(os.getenv("DASHBOARD_TOTALS_TTL_SECONDS", "30"))
+
+# Simple in‑memory cache (per process): user_id -> {(from_day, to_day): (expires_at, totals)}
+_cache: Dict[int, Dict[Tuple[date, date | None], Tuple[float, Dict[str, int]]]] = {}
+_lock = threading.Lock()
+
+
+def _day(d: date | datetime | None) -> date | None:
+    if d is None:
+        return None
+    return d.date() if isinstance(d, datetime) else d
+
+
+def event_totals(user_id: int, from_dt: date | datetime, to_dt: date | datetime | None = None) -> Dict[str, int]:
+    """Counts per event_type for the day window, in one GROUP BY query, cached per user for a short TTL."""
+    uid = int(user_id)
+    key = (_day(from_dt), _day(to_dt))
+    now = time.monotonic()
+    with _lock:
+        hit = _cache.get(uid, {}).get(key)
+        if hit and hit[0] > now:
+            return dict(hit[1])
+
+    totals = rollup_totals_by_event(uid, key[0], key[1])
+
+    with _lock:
+        _cache.setdefault(uid, {})[key] = (now + TOTALS_TTL_SECONDS, totals)
+    return dict(totals)
+
+
+def dashboard_totals(user_id: int, from_dt: date | datetime, to_dt: date | datetime | None = None) -> Dict[str, int]:
+    """The four dashboard counters (journal_entries, chat_queries, calendar_syncs, notes_syncs)."""
+    by_event = event_totals(user_id, from_dt, to_dt)
+    return {label: int(by_event.get(et, 0)) for label, et in TOTAL_EVENTS.items()}
+
+
+def invalidate_user_totals(user_ids: Iterable[int] | int | None = None) -> None:
+    """Drop cached totals for the given user(s); None clears everything."""
+    with _lock:
+        if user_ids is None:
+            _cache.clear()
+            return
+        if isinstance(user_ids, int):
+            user_ids = [user_ids]
+        for uid in user_ids:
+            _cache.pop(int(uid), None)
@@ -0,0 +1,85 @@
+# Keyset (cursor) pagination helpers shared by the list endpoints
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+# (sort expression, "asc" | "desc", row -> cursor value)
+KeysetKey = Tuple[Any, str, Callable[[Any], Any]]
+
+
+def _enc_value(v):
+    if isinstance(v, datetime):
+        return {"dt": v.isoformat()}
+    if isinstance(v, bool):
+        return int(v)
+    return v
+
+
+def _dec_value(v):
+    if isinstance(v, dict) and "dt" in v:
+        return datetime.fromisoformat(v["dt"])
+    return v
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_enc_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """Decode an opaque cursor; raises ValueError on anything malformed."""
+    try:
+        pad = "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode((cursor + pad).encode()).decode())
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("invalid cursor")
+    return [_dec_value(v) for v in values]
+
+
+def cursor_mode_requested(args) -> bool:
+    """Cursor mode is opt-in: ?paginate=cursor for the first page, ?after=<cursor> for the rest."""
+    return args.get("paginate") == "cursor" or bool(args.get("after"))
+
+
+def _after_clause(keys: Sequence[KeysetKey], values: Sequence[Any]):
+    """Rows strictly after `values` in the (k1, k2, ...) lexicographic order.
+
+    A None cursor value means "the NULL group" for that column: equality becomes
+    IS NULL and there is no strict term for it (every row in the group ties).
+    """
+    terms = []
+    for i, (expr, direction, _get) in enumerate(keys):
+        v = values[i]
+        eqs = [(k[0].is_(None) if values[j] is None else k[0] == values[j]) for j, k in enumerate(keys[:i])]
+        if v is None:
+            continue
+        strict = expr > v if direction == "asc" else expr < v
+        terms.append(and_(*eqs, strict) if eqs else strict)
+    return or_(*terms)
+
+
+def keyset_page(query, keys: Sequence[KeysetKey], after: str | None, limit: int, with_total: bool = False) -> dict:
+    """Return one page in keyset order: O(page) per request, stable under concurrent inserts.
+
+    The last key must be unique (the primary key) so the order is total.
+    """
+    total = query.order_by(None).count() if with_total else None
+    if after:
+        values = decode_cursor(after)
+        if len(values) != len(keys):
+            raise ValueError("invalid cursor")
+        query = query.filter(_after_clause(keys, values))
+    query = query.order_by(None).order_by(*[e.asc() if d == "asc" else e.desc() for e, d, _ in keys])
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor([get(rows[-1]) for _e, _d, get in keys]) if has_more and rows else None
+    out = {"items": rows, "next_cursor": next_cursor, "has_more": has_more}
+    if with_total:
+        out["total"] = total
+    return out
@@ -0,0 +1,57 @@
+# SQLite engine profile (WAL, mmap, busy_timeout) applied on every new DB-API connection
+import os
+from typing import Dict, Any
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+VALID_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+VALID_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+VALID_TEMP_STORE = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def load_sqlite_profile() -> Dict[str, Any]:
+    """Read the SQLite pragma profile from environment variables (with production defaults)."""
+    return {
+        "enabled": os.getenv("SQLITE_PROFILE_ENABLED", "true").lower() == "true",
+        "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper(),
+        "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper(),
+        "busy_timeout_ms": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        # negative cache_size is KiB (so -65536 == 64 MiB page cache per connection)
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+        "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY").upper(),
+    }
+
+
+def apply_sqlite_pragmas(dbapi_conn, profile: Dict[str, Any]) -> None:
+    """Run the profile's PRAGMA statements on a raw sqlite3 connection."""
+    journal_mode = profile["journal_mode"] if profile["journal_mode"] in VALID_JOURNAL_MODES else "WAL"
+    synchronous = profile["synchronous"] if profile["synchronous"] in VALID_SYNCHRONOUS else "NORMAL"
+    temp_store = profile["temp_store"] if profile["temp_store"] in VALID_TEMP_STORE else "MEMORY"
+
+    cur = dbapi_conn.cursor()
+    try:
+        # busy_timeout first so the journal_mode switch itself waits on a locked file
+        cur.execute(f"PRAGMA busy_timeout={int(profile['busy_timeout_ms'])}")
+        cur.execute(f"PRAGMA journal_mode={journal_mode}")
+        cur.execute(f"PRAGMA synchronous={synchronous}")
+        cur.execute(f"PRAGMA mmap_size={int(profile['mmap_size'])}")
+        cur.execute(f"PRAGMA cache_size={int(profile['cache_size'])}")
+        cur.execute(f"PRAGMA temp_store={temp_store}")
+    finally:
+        cur.close()
+
+
+def install_sqlite_profile(engine: Engine, profile: Dict[str, Any] | None = None) -> bool:
+    """Register a connect listener on `engine` that applies the profile. No-op for non-SQLite engines."""
+    if engine.dialect.name != "sqlite":
+        return False
+    profile = profile or load_sqlite_profile()
+    if not profile.get("enabled", True):
+        return False
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, connection_record):  # noqa: ARG001
+        apply_sqlite_pragmas(dbapi_conn, profile)
+
+    return True
@@ -18,6 +18,7 @@ from app.models.user import User
 from app.models.journal import JournalEntry
 from app.models.chat import ChatThread, ChatMessage
 from app.models.usage_log import UsageLog
+from app.services.rollup import rebuild_usage_rollup
 
 def create_user_data(email, password):
     """Create realistic data for a user."""
@@ -48,6 +49,9 @@ def create_user_data(email, password):
         create_usage_logs(user.id)
         
         db.session.commit()
+
+        # Usage logs were inserted directly, so refresh the dashboard rollup for this user
+        rebuild_usage_rollup(user.id)
         print("✅ All data created successfully!")
 
 def create_journal_entries(user_id):
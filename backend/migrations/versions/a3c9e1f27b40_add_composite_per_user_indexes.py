@@ -0,0 +1,75 @@
+"""add composite per-user indexes
+
+Revision ID: a3c9e1f27b40
+Revises: fdd0621c3eb9
+Create Date: 2026-10-17 09:12:04.118220
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e1f27b40'
+down_revision = 'fdd0621c3eb9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.create_index('ix_task_user_status_due', ['user_id', 'status', 'due_at'], unique=False)
+        batch_op.create_index('ix_task_user_due', ['user_id', 'due_at'], unique=False)
+
+    with op.batch_alter_table('usage_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_usage_logs_user_event_created', ['user_id', 'event_type', 'created_at'], unique=False)
+        batch_op.create_index('ix_usage_logs_user_created', ['user_id', 'created_at'], unique=False)
+
+    # Drop duplicate (user_id, unique_key) rows (keep the oldest) so the unique index can be built
+    op.execute(
+        "DELETE FROM notification WHERE unique_key IS NOT NULL AND id NOT IN ("
+        " SELECT MIN(id) FROM notification WHERE unique_key IS NOT NULL GROUP BY user_id, unique_key)"
+    )
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.create_index('ix_notification_user_read_created', ['user_id', 'read_at', 'created_at'], unique=False)
+        batch_op.create_index('ix_notification_user_created', ['user_id', 'created_at'], unique=False)
+        batch_op.create_index('uq_notification_user_unique_key', ['user_id', 'unique_key'], unique=True)
+
+    with op.batch_alter_table('journal_entry', schema=None) as batch_op:
+        batch_op.create_index('ix_journal_entry_user_timestamp', ['user_id', 'timestamp'], unique=False)
+
+    with op.batch_alter_table('chat_thread', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_thread_user_updated', ['user_id', 'updated_at'], unique=False)
+
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_message_thread_created', ['thread_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('notion_note_cache', schema=None) as batch_op:
+        batch_op.create_index('ix_notion_note_cache_user_edited', ['user_id', 'last_edited_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notion_note_cache', schema=None) as batch_op:
+        batch_op.drop_index('ix_notion_note_cache_user_edited')
+
+    with op.batch_alter_table('chat_message', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_message_thread_created')
+
+    with op.batch_alter_table('chat_thread', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_thread_user_updated')
+
+    with op.batch_alter_table('journal_entry', schema=None) as batch_op:
+        batch_op.drop_index('ix_journal_entry_user_timestamp')
+
+    with op.batch_alter_table('notification', schema=None) as batch_op:
+        batch_op.drop_index('uq_notification_user_unique_key')
+        batch_op.drop_index('ix_notification_user_created')
+        batch_op.drop_index('ix_notification_user_read_created')
+
+    with op.batch_alter_table('usage_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_usage_logs_user_created')
+        batch_op.drop_index('ix_usage_logs_user_event_created')
+
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_index('ix_task_user_due')
+        batch_op.drop_index('ix_task_user_status_due')
@@ -0,0 +1,39 @@
+"""add weekly_reflection
+
+Revision ID: a6c3e9f1b247
+Revises: f4b2d8a6c131
+Create Date: 2026-10-17 17:55:03.481297
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c3e9f1b247'
+down_revision = 'f4b2d8a6c131'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('weekly_reflection',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('iso_week', sa.String(length=8), nullable=False),
+    sa.Column('goals_hash', sa.String(length=16), nullable=False),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('prompt', sa.Text(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'iso_week', 'goals_hash', name='uq_weekly_reflection_user_week_goals')
+    )
+
+
+def downgrade():
+    op.drop_table('weekly_reflection')
@@ -0,0 +1,40 @@
+"""add usage_daily_rollup
+
+Revision ID: b7d41c0e9a52
+Revises: a3c9e1f27b40
+Create Date: 2026-10-17 10:03:51.702114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41c0e9a52'
+down_revision = 'a3c9e1f27b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('usage_daily_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('event_type', sa.String(length=64), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'day', 'event_type', name='uq_usage_daily_rollup_user_day_event')
+    )
+
+    # Backfill from existing usage_logs (same as `flask rebuild-usage-rollup`)
+    op.execute(
+        "INSERT INTO usage_daily_rollup (user_id, day, event_type, count) "
+        "SELECT user_id, date(created_at), event_type, COUNT(id) FROM usage_logs "
+        "GROUP BY user_id, date(created_at), event_type"
+    )
+
+
+def downgrade():
+    op.drop_table('usage_daily_rollup')
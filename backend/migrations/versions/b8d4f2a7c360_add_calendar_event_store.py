@@ -0,0 +1,58 @@
+"""add calendar_event and calendar_sync_state
+
+Revision ID: b8d4f2a7c360
+Revises: a6c3e9f1b247
+Create Date: 2026-10-17 18:42:19.906214
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d4f2a7c360'
+down_revision = 'a6c3e9f1b247'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('calendar_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('graph_id', sa.String(length=255), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=True),
+    sa.Column('start_at', sa.DateTime(), nullable=False),
+    sa.Column('end_at', sa.DateTime(), nullable=False),
+    sa.Column('is_all_day', sa.Boolean(), nullable=False),
+    sa.Column('status', sa.String(length=32), nullable=True),
+    sa.Column('location', sa.String(length=255), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('html_link', sa.Text(), nullable=True),
+    sa.Column('synced_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'graph_id', name='uq_calendar_event_user_graph_id')
+    )
+    with op.batch_alter_table('calendar_event', schema=None) as batch_op:
+        batch_op.create_index('ix_calendar_event_user_start', ['user_id', 'start_at'], unique=False)
+
+    op.create_table('calendar_sync_state',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('delta_link', sa.Text(), nullable=True),
+    sa.Column('window_start', sa.DateTime(), nullable=False),
+    sa.Column('window_end', sa.DateTime(), nullable=False),
+    sa.Column('last_synced_at', sa.DateTime(), nullable=True),
+    sa.Column('last_full_sync_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('calendar_sync_state')
+    with op.batch_alter_table('calendar_event', schema=None) as batch_op:
+        batch_op.drop_index('ix_calendar_event_user_start')
+
+    op.drop_table('calendar_event')
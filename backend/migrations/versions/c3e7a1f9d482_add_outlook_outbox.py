@@ -0,0 +1,44 @@
+"""add outlook_outbox
+
+Revision ID: c3e7a1f9d482
+Revises: b8d4f2a7c360
+Create Date: 2026-10-17 19:20:47.115630
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7a1f9d482'
+down_revision = 'b8d4f2a7c360'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('outlook_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=16), nullable=False),
+    sa.Column('event_id', sa.String(length=128), nullable=True),
+    sa.Column('status', sa.String(length=16), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('last_error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('outlook_outbox', schema=None) as batch_op:
+        batch_op.create_index('ix_outlook_outbox_status_next', ['status', 'next_attempt_at'], unique=False)
+        batch_op.create_index('ix_outlook_outbox_task', ['task_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outlook_outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_outlook_outbox_task')
+        batch_op.drop_index('ix_outlook_outbox_status_next')
+
+    op.drop_table('outlook_outbox')
@@ -0,0 +1,74 @@
+"""add fts5 search_index with sync triggers
+
+Revision ID: c5e8f3a1d604
+Revises: b7d41c0e9a52
+Create Date: 2026-10-17 11:40:22.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5e8f3a1d604'
+down_revision = 'b7d41c0e9a52'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of services/search.py SCHEMA_SQL / backfill_statements() / DROP_SQL as of this revision;
+# later changes to the search schema need their own migration.
+SCHEMA_SQL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5( owner, kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize = 'porter unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS journal_entry_search_ai AFTER INSERT ON journal_entry BEGIN INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 1, 'u' || new.user_id, 'journal', new.id, '', new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS journal_entry_search_au AFTER UPDATE ON journal_entry BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 1; INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 1, 'u' || new.user_id, 'journal', new.id, '', new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS journal_entry_search_ad AFTER DELETE ON journal_entry BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS task_search_ai AFTER INSERT ON task BEGIN INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 2, 'u' || new.user_id, 'task', new.id, new.title, coalesce(new.description, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS task_search_au AFTER UPDATE ON task BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 2; INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 2, 'u' || new.user_id, 'task', new.id, new.title, coalesce(new.description, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS task_search_ad AFTER DELETE ON task BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 2; END",
+    "CREATE TRIGGER IF NOT EXISTS notion_note_cache_search_ai AFTER INSERT ON notion_note_cache BEGIN INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 3, 'u' || new.user_id, 'note', new.id, coalesce(new.title, ''), coalesce(new.content, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS notion_note_cache_search_au AFTER UPDATE ON notion_note_cache BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 3; INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 3, 'u' || new.user_id, 'note', new.id, coalesce(new.title, ''), coalesce(new.content, '')); END",
+    "CREATE TRIGGER IF NOT EXISTS notion_note_cache_search_ad AFTER DELETE ON notion_note_cache BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 3; END",
+    "CREATE TRIGGER IF NOT EXISTS chat_message_search_ai AFTER INSERT ON chat_message BEGIN INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 4, 'u' || new.user_id, 'chat', new.id, '', new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_message_search_au AFTER UPDATE ON chat_message BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 4; INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) VALUES (new.id * 8 + 4, 'u' || new.user_id, 'chat', new.id, '', new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_message_search_ad AFTER DELETE ON chat_message BEGIN DELETE FROM search_index WHERE rowid = old.id * 8 + 4; END",
+    "CREATE TRIGGER IF NOT EXISTS chat_thread_search_ad AFTER DELETE ON chat_thread BEGIN DELETE FROM search_index WHERE rowid IN (SELECT id * 8 + 4 FROM chat_message WHERE thread_id = old.id); END",
+]
+
+BACKFILL_SQL = [
+    "INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) SELECT src.id * 8 + 1, 'u' || src.user_id, 'journal', src.id, '', src.content FROM journal_entry AS src",
+    "INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) SELECT src.id * 8 + 2, 'u' || src.user_id, 'task', src.id, src.title, coalesce(src.description, '') FROM task AS src",
+    "INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) SELECT src.id * 8 + 3, 'u' || src.user_id, 'note', src.id, coalesce(src.title, ''), coalesce(src.content, '') FROM notion_note_cache AS src",
+    "INSERT INTO search_index(rowid, owner, kind, ref_id, title, body) SELECT src.id * 8 + 4, 'u' || src.user_id, 'chat', src.id, '', src.content FROM chat_message AS src",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS chat_thread_search_ad",
+    "DROP TRIGGER IF EXISTS journal_entry_search_ai",
+    "DROP TRIGGER IF EXISTS journal_entry_search_au",
+    "DROP TRIGGER IF EXISTS journal_entry_search_ad",
+    "DROP TRIGGER IF EXISTS task_search_ai",
+    "DROP TRIGGER IF EXISTS task_search_au",
+    "DROP TRIGGER IF EXISTS task_search_ad",
+    "DROP TRIGGER IF EXISTS notion_note_cache_search_ai",
+    "DROP TRIGGER IF EXISTS notion_note_cache_search_au",
+    "DROP TRIGGER IF EXISTS notion_note_cache_search_ad",
+    "DROP TRIGGER IF EXISTS chat_message_search_ai",
+    "DROP TRIGGER IF EXISTS chat_message_search_au",
+    "DROP TRIGGER IF EXISTS chat_message_search_ad",
+    "DROP TABLE IF EXISTS search_index",
+]
+
+
+def upgrade():
+    # FTS5 is SQLite-only; other engines keep the ilike fallback in services/search.py
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for stmt in SCHEMA_SQL + BACKFILL_SQL:
+        op.execute(stmt)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for stmt in DROP_SQL:
+        op.execute(stmt)
@@ -0,0 +1,69 @@
+"""add journal_day / journal_streak
+
+Revision ID: d2a7b4e6c915
+Revises: c5e8f3a1d604
+Create Date: 2026-10-17 12:41:08.318265
+
+"""
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7b4e6c915'
+down_revision = 'c5e8f3a1d604'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('journal_day',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('entries', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'day', name='uq_journal_day_user_day')
+    )
+    op.create_table('journal_streak',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('last_day', sa.Date(), nullable=True),
+    sa.Column('current', sa.Integer(), nullable=False),
+    sa.Column('best', sa.Integer(), nullable=False),
+    sa.Column('days', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Backfill per-day counts; streak rows are derived from them (same as `flask rebuild-journal-streaks`)
+    op.execute(
+        "INSERT INTO journal_day (user_id, day, entries) "
+        "SELECT user_id, date(timestamp), COUNT(id) FROM journal_entry "
+        "GROUP BY user_id, date(timestamp)"
+    )
+    conn = op.get_bind()
+    days_by_user = {}
+    for uid, day in conn.execute(sa.text("SELECT user_id, day FROM journal_day ORDER BY user_id, day")):
+        days_by_user.setdefault(uid, []).append(date.fromisoformat(day) if isinstance(day, str) else day)
+    rows = []
+    for uid, days in days_by_user.items():
+        best = cur = 0
+        prev = None
+        for d in days:
+            cur = cur + 1 if prev is not None and (d - prev).days == 1 else 1
+            best = max(best, cur)
+            prev = d
+        rows.append({"user_id": uid, "last_day": days[-1], "current": cur, "best": best, "days": len(days)})
+    if rows:
+        streak = sa.table('journal_streak',
+            sa.column('user_id', sa.Integer()), sa.column('last_day', sa.Date()),
+            sa.column('current', sa.Integer()), sa.column('best', sa.Integer()), sa.column('days', sa.Integer()))
+        op.bulk_insert(streak, rows)
+
+
+def downgrade():
+    op.drop_table('journal_streak')
+    op.drop_table('journal_day')
@@ -0,0 +1,26 @@
+"""add task.outlook_payload_hash
+
+Revision ID: d5a9c2e4f873
+Revises: c3e7a1f9d482
+Create Date: 2026-10-17 20:05:31.552918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a9c2e4f873'
+down_revision = 'c3e7a1f9d482'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('outlook_payload_hash', sa.String(length=16), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('task', schema=None) as batch_op:
+        batch_op.drop_column('outlook_payload_hash')
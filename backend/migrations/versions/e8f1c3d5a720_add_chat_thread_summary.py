@@ -0,0 +1,30 @@
+"""add rolling summary columns to chat_thread
+
+Revision ID: e8f1c3d5a720
+Revises: d2a7b4e6c915
+Create Date: 2026-10-17 14:22:47.506112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8f1c3d5a720'
+down_revision = 'd2a7b4e6c915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat_thread', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('summary', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('summary_through_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('summary_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('chat_thread', schema=None) as batch_op:
+        batch_op.drop_column('summary_updated_at')
+        batch_op.drop_column('summary_through_id')
+        batch_op.drop_column('summary')
@@ -0,0 +1,52 @@
+"""add agent_step_log
+
+Revision ID: f4b2d8a6c131
+Revises: e8f1c3d5a720
+Create Date: 2026-10-17 16:40:12.318842
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4b2d8a6c131'
+down_revision = 'e8f1c3d5a720'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('agent_step_log',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('turn_id', sa.String(length=32), nullable=False),
+    sa.Column('source', sa.String(length=32), nullable=False),
+    sa.Column('kind', sa.String(length=8), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('step', sa.Integer(), nullable=False),
+    sa.Column('ms', sa.Float(), nullable=False),
+    sa.Column('input_tokens', sa.Integer(), nullable=False),
+    sa.Column('output_tokens', sa.Integer(), nullable=False),
+    sa.Column('cache_read_tokens', sa.Integer(), nullable=False),
+    sa.Column('cache_write_tokens', sa.Integer(), nullable=False),
+    sa.Column('result_bytes', sa.Integer(), nullable=True),
+    sa.Column('ok', sa.Boolean(), nullable=False),
+    sa.Column('error', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('agent_step_log', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_agent_step_log_turn_id'), ['turn_id'], unique=False)
+        batch_op.create_index('ix_agent_step_log_kind_name_created', ['kind', 'name', 'created_at'], unique=False)
+        batch_op.create_index('ix_agent_step_log_user_created', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('agent_step_log', schema=None) as batch_op:
+        batch_op.drop_index('ix_agent_step_log_user_created')
+        batch_op.drop_index('ix_agent_step_log_kind_name_created')
+        batch_op.drop_index(batch_op.f('ix_agent_step_log_turn_id'))
+
+    op.drop_table('agent_step_log')
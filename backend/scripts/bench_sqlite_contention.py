@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+SQLite read/write contention benchmark.
+
+Runs the same mixed workload (writer threads inserting usage_logs rows one commit
+at a time, reader threads running the dashboard-style COUNT queries) twice:
+once with SQLite defaults (rollback journal) and once with the engine profile
+from app/utils/sqlite_profile.py. Prints throughput and "database is locked" errors.
+
+Usage (from backend/):
+    python scripts/bench_sqlite_contention.py --seconds 10 --writers 4 --readers 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.utils.sqlite_profile import load_sqlite_profile, install_sqlite_profile  # noqa: E402
+
+EVENT_TYPES = ("journal_create", "chat_query", "calendar_sync", "notes_sync")
+
+
+def _setup(engine, seed_rows: int):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE usage_logs ("
+            " id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, event_type VARCHAR(64) NOT NULL,"
+            " event_metadata JSON, created_at DATETIME NOT NULL)"
+        ))
+        conn.execute(text("CREATE INDEX ix_usage_logs_user_id ON usage_logs (user_id)"))
+        conn.execute(text("CREATE INDEX ix_usage_logs_created_at ON usage_logs (created_at)"))
+        now = datetime.utcnow()
+        conn.execute(
+            text("INSERT INTO usage_logs (user_id, event_type, event_metadata, created_at) VALUES (:u, :e, '{}', :c)"),
+            [{"u": i % 50, "e": EVENT_TYPES[i % 4], "c": now - timedelta(minutes=i)} for i in range(seed_rows)],
+        )
+
+
+def _run(engine, seconds: float, writers: int, readers: int):
+    stop = threading.Event()
+    stats = {"writes": 0, "reads": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def bump(key):
+        with lock:
+            stats[key] += 1
+
+    def writer(n):
+        while not stop.is_set():
+            try:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text("INSERT INTO usage_logs (user_id, event_type, event_metadata, created_at) VALUES (:u, :e, '{}', :c)"),
+                        {"u": n % 50, "e": EVENT_TYPES[n % 4], "c": datetime.utcnow()},
+                    )
+                bump("writes")
+            except OperationalError:
+                bump("locked")
+
+    def reader(n):
+        since = datetime.utcnow() - timedelta(days=7)
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT event_type, COUNT(id) FROM usage_logs WHERE user_id = :u AND created_at >= :s GROUP BY event_type"),
+                        {"u": n % 50, "s": since},
+                    ).all()
+                bump("reads")
+            except OperationalError:
+                bump("locked")
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    return stats
+
+
+def bench(label: str, profiled: bool, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        # timeout=0 mirrors a busy handler-less default so lock errors surface instead of hiding in waits
+        engine = create_engine(
+            f"sqlite:///{path}",
+            connect_args={"timeout": 0, "check_same_thread": False},
+            pool_size=args.writers + args.readers,
+        )
+        if profiled:
+            install_sqlite_profile(engine, {**load_sqlite_profile(), "enabled": True})
+        _setup(engine, args.seed)
+        stats = _run(engine, args.seconds, args.writers, args.readers)
+        engine.dispose()
+
+    secs = float(args.seconds)
+    out = {
+        "label": label,
+        "writes_per_s": round(stats["writes"] / secs, 1),
+        "reads_per_s": round(stats["reads"] / secs, 1),
+        "locked_errors": stats["locked"],
+    }
+    print(f"{label:<10} writes/s={out['writes_per_s']:>9}  reads/s={out['reads_per_s']:>9}  locked={out['locked_errors']}")
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--seconds", type=float, default=5)
+    p.add_argument("--writers", type=int, default=4)
+    p.add_argument("--readers", type=int, default=8)
+    p.add_argument("--seed", type=int, default=20000, help="rows inserted before the run")
+    args = p.parse_args()
+
+    before = bench("default", False, args)
+    after = bench("profile", True, args)
+    if before["writes_per_s"]:
+        print(f"write throughput x{after['writes_per_s'] / before['writes_per_s']:.2f}")
+    if before["reads_per_s"]:
+        print(f"read throughput  x{after['reads_per_s'] / before['reads_per_s']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
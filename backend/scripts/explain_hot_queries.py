@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Print SQLite EXPLAIN QUERY PLAN for the per-user hot queries, to check that each
+route is served by its composite index rather than a scan + temp B-tree sort.
+
+Usage (from backend/):
+    python scripts/explain_hot_queries.py            # uses a throwaway temp DB
+    SQLALCHEMY_DATABASE_URI=sqlite:///slo.db python scripts/explain_hot_queries.py --live
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def _queries(db):
+    from sqlalchemy import func
+    from app.models.task import Task
+    from app.models.usage_log import UsageLog
+    from app.models.notification import Notification
+    from app.models.chat import ChatThread, ChatMessage
+    from app.models.journal import JournalEntry
+
+    uid = 1
+    now = datetime.utcnow()
+    since = now - timedelta(days=7)
+    return {
+        "tasks.list_tasks (status)": Task.query.filter_by(user_id=uid).filter(Task.status == "todo")
+            .order_by(Task.due_at.is_(None), Task.due_at.asc(), Task.created_at.desc()),
+        "notify.scan_user_tasks_for_reminders": db.session.query(Task)
+            .filter(Task.user_id == uid, Task.status != "done", Task.due_at != None, Task.due_at > now, Task.due_at <= now + timedelta(hours=24)),  # noqa: E711
+        "dashboard.metrics (counter)": db.session.query(func.count(UsageLog.id))
+            .filter_by(user_id=uid, event_type="journal_create").filter(UsageLog.created_at >= since),
+        "analytics.series_usage": db.session.query(UsageLog.event_type, func.date(UsageLog.created_at), func.count(UsageLog.id))
+            .filter(UsageLog.user_id == uid, UsageLog.created_at >= since, UsageLog.created_at <= now)
+            .group_by(func.date(UsageLog.created_at), UsageLog.event_type),
+        "notifications.unread": Notification.query.filter_by(user_id=uid).filter(Notification.read_at == None)  # noqa: E711
+            .order_by(Notification.created_at.desc()).limit(50),
+        "notifications.list_all": Notification.query.filter_by(user_id=uid).order_by(Notification.created_at.desc()).limit(20),
+        "notify._exists_by_key": db.session.query(Notification.id).filter_by(user_id=uid, unique_key="task_due_soon:1:2025-01-01"),
+        "chat.list_threads": ChatThread.query.filter_by(user_id=uid).order_by(ChatThread.updated_at.desc()),
+        "chat.list_messages": ChatMessage.query.filter_by(thread_id=1, user_id=uid).order_by(ChatMessage.created_at.asc()).limit(50),
+        "journal.get_journals": JournalEntry.query.filter_by(user_id=uid).order_by(JournalEntry.timestamp.desc()).limit(10),
+        "analytics.journal_streaks": db.session.query(func.date(JournalEntry.timestamp))
+            .filter(JournalEntry.user_id == uid).group_by(func.date(JournalEntry.timestamp)),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--live", action="store_true", help="explain against SQLALCHEMY_DATABASE_URI instead of a temp DB")
+    args = p.parse_args()
+
+    tmp = None
+    if not args.live:
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(tmp.name, 'explain.db')}"
+
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        if not args.live:
+            db.create_all()
+        dialect = db.engine.dialect
+        for label, q in _queries(db).items():
+            sql = str(q.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+            plan = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql}")).all()
+            print(f"\n== {label}")
+            for row in plan:
+                print(f"   {row[-1]}")
+
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -70,13 +70,31 @@ export type ReflectionResult = {
   actions: string[];
 };
 
-export async function fetchReflection(userGoals?: string): Promise<ReflectionResult> {
+type ReflectionJob = {
+  job_id: number;
+  status: "pending" | "running" | "done" | "error";
+  week: string;
+  result?: ReflectionResult;
+  error?: string;
+};
+
+// POST starts (or reuses) this week's reflection job; poll it until it finishes
+export async function fetchReflection(userGoals?: string, pollMs = 1000, timeoutMs = 90000): Promise<ReflectionResult> {
   const res = await axios.post(
     `${API_URL}/api/dashboard/reflection`,
     { user_goals: userGoals || "" },
     { headers: { ...authHeader(), "Content-Type": "application/json" } }
   );
-  return res.data.result as ReflectionResult;
+  let job = res.data as ReflectionJob;
+  const deadline = Date.now() + timeoutMs;
+  while (job.status === "pending" || job.status === "running") {
+    if (Date.now() > deadline) throw new Error("Reflection timed out");
+    await new Promise((resolve) => setTimeout(resolve, pollMs));
+    const poll = await axios.get(`${API_URL}/api/dashboard/reflection/${job.job_id}`, { headers: authHeader() });
+    job = poll.data as ReflectionJob;
+  }
+  if (job.status === "error") throw new Error(job.error || "Reflection failed");
+  return job.result as ReflectionResult;
 }
 
 // ---- Phase 4 additions ----
@@ -46,7 +46,7 @@ export const calendarStore = create<CalendarState>((set, get) => ({
   async sync() {
     set({ loading: true });
     try {
-      const { data } = await api.get('/api/calendar/sync');
+      const { data } = await api.get('/api/calendar/sync', { params: { refresh: true } });
       const events = (data?.events as CalendarEvent[]) || [];
       set({ events, connected: true, loading: false, lastSync: new Date().toISOString() });
     } catch (e) {